@@ -0,0 +1,107 @@
+# authentication/backends.py
+
+"""
+Email login.
+
+EmailBackend loads the user and their token in one joined query (instead of a lookup by email,
+another by username in ModelBackend, and a third for the token). Passwords stored with an
+older hasher are rehashed with the preferred one (PASSWORD_HASHERS[0]) on a successful login;
+Django's check_password does this through its setter.
+
+Password hashing is the expensive part of a login and blocks whatever thread runs it.
+`authenticate_async()` runs it in a bounded thread pool (LOGIN_HASHING['MAX_WORKERS']) so an
+async worker keeps serving other requests meanwhile; hashlib releases the GIL while hashing,
+so the pool threads hash in parallel. A rehash saves the user from the pool thread, so the
+database connection that thread opens is released afterwards (close_old_connections()), as
+request threads do when their request finishes.
+"""
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.db import close_old_connections
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    The thread pool hashing passwords for async logins, created on first use.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=getattr(settings, 'LOGIN_HASHING', {}).get('MAX_WORKERS', 4),
+                thread_name_prefix='password-hashing',
+            )
+        return _executor
+
+
+def _run_in_pool(func, *args):
+    """
+    Run `func` in a hashing pool thread, then close the thread's database connections that
+    are unusable or past CONN_MAX_AGE (all of them by default).
+    """
+    try:
+        return func(*args)
+    finally:
+        close_old_connections()
+
+
+class EmailBackend(ModelBackend):
+    """
+    Authenticate with `email` and `password`. The user comes with `auth_token` and its evaluator
+    profile already loaded (or known to be missing), so issuing the login token and serializing
+    the user cost no extra query.
+    """
+
+    def get_user_by_email(self, email):
+        UserModel = get_user_model()
+        try:
+            return UserModel._default_manager.select_related('auth_token', 'evaluatorprofile').get(email=email)
+        except UserModel.DoesNotExist:
+            return None
+
+    def check_credentials(self, user, password):
+        """
+        Check the password (rehashing it if needed). Runs the hasher even for unknown users,
+        so response times don't reveal which emails are registered.
+        """
+        if user is None:
+            get_user_model()().set_password(password)
+            return False
+        return user.check_password(password) and self.user_can_authenticate(user)
+
+    def authenticate(self, request, email=None, password=None, **kwargs):
+        if email is None or password is None:
+            return None
+
+        user = self.get_user_by_email(email)
+        return user if self.check_credentials(user, password) else None
+
+
+async def authenticate_async(email, password):
+    """
+    EmailBackend.authenticate for async views: the query runs through sync_to_async, the
+    password check in the hashing pool. Returns the user, or None.
+    """
+    if email is None or password is None:
+        return None
+
+    backend = EmailBackend()
+    user = await sync_to_async(backend.get_user_by_email)(email)
+
+    loop = asyncio.get_running_loop()
+    valid = await loop.run_in_executor(get_executor(), _run_in_pool, backend.check_credentials, user, password)
+    if not valid:
+        return None
+
+    user.backend = f'{EmailBackend.__module__}.{EmailBackend.__qualname__}'
+    return user
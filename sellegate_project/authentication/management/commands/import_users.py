@@ -0,0 +1,206 @@
+# authentication/management/commands/import_users.py
+
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+from rest_framework.authtoken.models import Token
+
+from authentication.models import User, username_validator
+from evaluation.models import EvaluatorProfile
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+
+
+def _setup_worker():
+    # Spawned workers (macOS, Windows) start without Django; forked ones already have it
+    django.setup()
+
+
+def _hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
+
+
+class Command(BaseCommand):
+    help = (
+        "Import users from a CSV (header: username,email,password[,is_evaluator][,bio]) or NDJSON "
+        "file. Passwords are hashed in a process pool; users, evaluator profiles (for evaluators "
+        "and rows with a bio) and optional tokens are inserted with bulk_create in chunks, without per-row signals."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="File to import, or '-' for standard input.")
+        parser.add_argument(
+            '--format', choices=['csv', 'ndjson'],
+            help="Input format (default: from the file extension, csv for standard input).",
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help="Users hashed and inserted per transaction (default: 2000).",
+        )
+        parser.add_argument(
+            '--workers', type=int, default=os.cpu_count() or 1,
+            help="Password hashing processes (default: number of CPUs).",
+        )
+        parser.add_argument(
+            '--tokens-output',
+            help="Create a token for every imported user and write them (email,token) to this CSV file.",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        if chunk_size <= 0 or options['workers'] <= 0:
+            raise CommandError("--chunk-size and --workers must be positive integers.")
+
+        path = options['path']
+        fmt = options['format'] or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'csv')
+
+        try:
+            stream = sys.stdin if path == '-' else open(path, newline='', encoding='utf-8')
+        except OSError as error:
+            raise CommandError(f"Can't read {path}: {error}")
+
+        tokens_file = open(options['tokens_output'], 'w', newline='', encoding='utf-8') if options['tokens_output'] else None
+        tokens_writer = csv.writer(tokens_file) if tokens_file else None
+        if tokens_writer:
+            tokens_writer.writerow(['email', 'token'])
+
+        self.imported = self.skipped = 0
+        started = time.monotonic()
+        try:
+            with ProcessPoolExecutor(max_workers=options['workers'], initializer=_setup_worker) as executor:
+                rows = self.read(stream, fmt)
+                while True:
+                    chunk = list(islice(rows, chunk_size))
+                    if not chunk:
+                        break
+                    self.import_chunk(chunk, executor, options['workers'], tokens_writer)
+
+                    elapsed = time.monotonic() - started
+                    self.stdout.write(
+                        f"Imported {self.imported} users, skipped {self.skipped} "
+                        f"({(self.imported + self.skipped) / elapsed:.0f} rows/s)"
+                    )
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+            if tokens_file:
+                tokens_file.close()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.imported} users in {elapsed:.1f}s "
+            f"({self.imported / elapsed if elapsed else 0:.0f} users/s), skipped {self.skipped} rows."
+        ))
+
+    def read(self, stream, fmt):
+        """
+        Yield (line number, cleaned fields) for every valid record; report and skip the others.
+        """
+        if fmt == 'csv':
+            reader = csv.DictReader(stream)
+            records = ((reader.line_num, row) for row in reader)
+        else:
+            records = (
+                (number, line)
+                for number, line in enumerate(stream, start=1)
+                if line.strip()
+            )
+
+        for number, record in records:
+            try:
+                if fmt == 'ndjson':
+                    record = json.loads(record)
+                yield number, self.clean(record)
+            except (ValueError, ValidationError) as error:
+                message = '; '.join(error.messages) if isinstance(error, ValidationError) else str(error)
+                self.stderr.write(f"Line {number}: {message}")
+                self.skipped += 1
+
+    def clean(self, record):
+        if not isinstance(record, dict):
+            raise ValueError("Expected an object.")
+
+        username = str(record.get('username') or '').strip()
+        email = str(record.get('email') or '').strip()
+        password = record.get('password')
+
+        if not username or len(username) > 150:
+            raise ValidationError("Username is required (150 characters or fewer).")
+        username_validator(username)
+        validate_email(email)
+        if not password:
+            raise ValidationError("Password is required.")
+
+        is_evaluator = record.get('is_evaluator', False)
+        if isinstance(is_evaluator, str):
+            is_evaluator = is_evaluator.strip().lower() in TRUE_VALUES
+
+        return {
+            'username': username,
+            'email': email,
+            'password': str(password),
+            'is_evaluator': bool(is_evaluator),
+            'bio': str(record.get('bio') or ''),
+        }
+
+    def import_chunk(self, chunk, executor, workers, tokens_writer):
+        # Drop rows clashing with existing users or with earlier rows of the chunk (one query)
+        usernames = [fields['username'] for _, fields in chunk]
+        emails = [fields['email'] for _, fields in chunk]
+        taken = set()
+        existing = User.objects.filter(Q(username__in=usernames) | Q(email__in=emails)).values_list('username', 'email')
+        for username, email in existing:
+            taken.update((('username', username), ('email', email)))
+
+        rows = []
+        for number, fields in chunk:
+            keys = (('username', fields['username']), ('email', fields['email']))
+            if any(key in taken for key in keys):
+                self.stderr.write(f"Line {number}: username or email already exists.")
+                self.skipped += 1
+                continue
+            taken.update(keys)
+            rows.append(fields)
+
+        if not rows:
+            return
+
+        # Hash in the process pool, a slice of the chunk per worker
+        slice_size = -(-len(rows) // workers)
+        passwords = [fields['password'] for fields in rows]
+        hashes = [
+            hashed
+            for batch in executor.map(_hash_passwords, [passwords[n:n + slice_size] for n in range(0, len(passwords), slice_size)])
+            for hashed in batch
+        ]
+
+        with transaction.atomic():
+            users = User.objects.bulk_create(
+                User(username=fields['username'], email=fields['email'], password=hashed, is_evaluator=fields['is_evaluator'])
+                for fields, hashed in zip(rows, hashes)
+            )
+            # bulk_create skips post_save: add the profiles create_evaluator_profile would, and
+            # those with a bio; the other users get theirs lazily like registered users
+            EvaluatorProfile.objects.bulk_create(
+                EvaluatorProfile(user=user, bio=fields['bio'])
+                for user, fields in zip(users, rows)
+                if fields['is_evaluator'] or fields['bio']
+            )
+            if tokens_writer:
+                tokens = Token.objects.bulk_create(Token(key=Token.generate_key(), user=user) for user in users)
+
+        if tokens_writer:
+            tokens_writer.writerows((user.email, token.key) for user, token in zip(users, tokens))
+        self.imported += len(users)
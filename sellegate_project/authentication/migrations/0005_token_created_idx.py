@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-17 19:02
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index authtoken_token.created, so the expired tokens purge_expired_tokens deletes are a
+    range scan. The Token model belongs to rest_framework.authtoken, hence the raw SQL.
+    """
+
+    dependencies = [
+        ('authentication', '0004_alter_user_username'),
+        ('authtoken', '0002_auto_20160226_1747'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql='CREATE INDEX IF NOT EXISTS "authtoken_token_created_idx" ON "authtoken_token" ("created");',
+            reverse_sql='DROP INDEX IF EXISTS "authtoken_token_created_idx";',
+        ),
+    ]
@@ -1,6 +1,6 @@
 from django.db import models
-from django.contrib.auth.models import AbstractUser
-from django.db.models.signals import post_save
+from django.contrib.auth.models import AbstractUser, UserManager as BaseUserManager
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.core.validators import RegexValidator
 
@@ -11,6 +11,17 @@ username_validator = RegexValidator(
     message="Username may only contain letters, numbers, underscores, periods, and spaces."
 )
 
+class UserQuerySet(models.QuerySet):
+    def for_serializer(self):
+        """
+        Fetch users ready for UserSerializer in a single query: the evaluator profile is joined
+        in (or known to be missing), so serializing a list costs no query per user.
+        """
+        return self.select_related('evaluatorprofile')
+
+class UserManager(BaseUserManager.from_queryset(UserQuerySet)):
+    pass
+
 class User(AbstractUser):
     # Override the default username field
     username = models.CharField(
@@ -23,14 +34,87 @@ class User(AbstractUser):
     email = models.EmailField(unique=True, blank=False)  # Email field with unique constraint and blank=False
     is_evaluator = models.BooleanField(default=False)  # Default evaluator status to False
 
-# Signal to create EvaluatorProfile when a new user is created
+    objects = UserManager()  # Adds User.objects.for_serializer()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the username and evaluator status as loaded, so save signals can tell
+        # whether they changed
+        instance._loaded_username = instance.__dict__.get('username')
+        instance._loaded_is_evaluator = instance.__dict__.get('is_evaluator')
+        return instance
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # post_save receivers have seen the change by now; the saved value is the new baseline
+        self._loaded_username = self.__dict__.get('username')
+        self._loaded_is_evaluator = self.__dict__.get('is_evaluator')
+
+    def username_changed(self):
+        """
+        Return True if the username differs from the value loaded from the database.
+        Instances that were not loaded from the database always count as changed.
+        """
+        if 'username' not in self.__dict__:
+            return False  # Deferred and never accessed, so it cannot have been modified
+        return getattr(self, '_loaded_username', None) != self.username
+
+    def became_evaluator(self):
+        """
+        Return True if `is_evaluator` is set and was not when loaded (or the user is new).
+        """
+        if 'is_evaluator' not in self.__dict__:
+            return False
+        return bool(self.is_evaluator) and not getattr(self, '_loaded_is_evaluator', None)
+
+class RefreshToken(models.Model):
+    """
+    Long-lived token minting signed access tokens (see authentication/signed_tokens.py).
+    Only a SHA-256 digest of the token is stored.
+    """
+    key_digest = models.CharField(max_length=64, unique=True)
+    user = models.ForeignKey(User, related_name='refresh_tokens', on_delete=models.CASCADE)
+    created = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)  # Range scans of purge_expired_tokens
+
+    def __str__(self):
+        return f"Refresh token of {self.user_id}"
+
+class RevokedAccessToken(models.Model):
+    """
+    Signed access tokens revoked before their expiry (logout). Rows are only needed until
+    `expires_at`; every process mirrors them in memory.
+    """
+    jti = models.BigIntegerField(unique=True)  # Token id claim
+    expires_at = models.DateTimeField(db_index=True)
+
+# Signal to create the EvaluatorProfile when a user becomes an evaluator. Other users get one
+# lazily, on their first profile update (see evaluation.models.get_evaluator_profile)
 @receiver(post_save, sender=User)  # Register the signal
 def create_evaluator_profile(sender, instance, created, **kwargs):
     from evaluation.models import EvaluatorProfile
 
-    if created:
-        # Create an empty EvaluatorProfile when a new user is created
-        EvaluatorProfile.objects.create(user=instance)  # Ensure EvaluatorProfile is created for the new user
+    if instance.became_evaluator():
+        profile, _ = EvaluatorProfile.objects.get_or_create(user=instance)
+        instance.evaluatorprofile = profile  # Cached for the response
+    elif created:
+        # A new user has no profile: remember it, so serializing the user needs no query
+        EvaluatorProfile.user.field.remote_field.set_cached_value(instance, None)
+
+
+# Signals keeping the token authentication cache (authentication/token_cache.py) in sync
+@receiver(post_save, sender='authtoken.Token')
+@receiver(post_delete, sender='authtoken.Token')  # Logout, and tokens deleted with their user
+def invalidate_cached_token(sender, instance, **kwargs):
+    from . import token_cache
 
+    token_cache.invalidate_tokens([instance.key])
 
+@receiver(post_save, sender=User)
+def invalidate_cached_user_tokens(sender, instance, created, **kwargs):
+    from . import token_cache
 
+    # The cached entries hold the user's columns (username, is_active, password, ...)
+    if not created:
+        token_cache.invalidate_user(instance.pk)
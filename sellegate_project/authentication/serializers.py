@@ -2,12 +2,13 @@
 
 from rest_framework import serializers
 from .models import User
+from evaluation.models import get_evaluator_profile
 from evaluation.serializers import EvaluatorProfileSerializer
 
 class UserSerializer(serializers.ModelSerializer):
     # Define a write-only password field
     password = serializers.CharField(write_only=True)
-    evaluatorProfile = EvaluatorProfileSerializer(source='evaluatorprofile', read_only=True)  # Nested serializer
+    evaluatorProfile = serializers.SerializerMethodField()  # Nested profile, the empty default if none exists yet
 
 
     class Meta:
@@ -17,17 +18,18 @@ class UserSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'date_joined')  # Immutable fields
 
 
+    def get_evaluatorProfile(self, user):
+        return EvaluatorProfileSerializer(get_evaluator_profile(user)).data
+
     def create(self, validated_data):
         # Extract and remove the password from the validated data
         password = validated_data.pop('password', None)
 
-        # Create the user without password first to avoid exposing it in the serialized output
-        user = User.objects.create(**validated_data)
-
-        # Set the password separately to trigger hashing
+        # Hash the password before the single INSERT (the plain password is never stored)
+        user = User(**validated_data)
         if password:
             user.set_password(password)
-            user.save()
+        user.save()
 
         return user
     
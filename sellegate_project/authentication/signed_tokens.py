@@ -0,0 +1,302 @@
+# authentication/signed_tokens.py
+
+"""
+Stateless signed access tokens (AUTH_TOKEN_MODE = 'signed').
+
+An access token carries its own claims and an HMAC signature made with SECRET_KEY:
+
+    <user id>:<is_evaluator 0|1>:<expiry, unix seconds>:<token id, hex>:<signature>
+
+so checking it needs no database access. Requests authenticate with
+`Authorization: Bearer <access token>`; `request.user` is a ClaimsUser answering the claims
+(id, is_evaluator) without a query and loading the user's row in a single query on first use of
+anything else. Writes always go through that row, so a stale claim is never saved.
+
+Access tokens are short-lived (SIGNED_TOKENS['ACCESS_LIFETIME']). A database-backed refresh
+token (RefreshToken) mints new ones through `token/refresh/`. Logging out deletes the refresh
+token and revokes the access token: its id goes to RevokedAccessToken, which every process
+mirrors in memory as integer id -> expiry. The mirror only holds tokens that have not expired
+yet, and picks up other processes' revocations every SIGNED_TOKENS['REVOCATION_SYNC_INTERVAL'] seconds.
+
+Revocation is the one part that is not free of database access: each process reads the new
+RevokedAccessToken rows (an indexed range scan, usually empty) at most once per sync interval,
+rather than on every request. A revoked token stays valid in other processes for up to that
+interval.
+"""
+
+import hashlib
+import secrets
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models import Model
+from django.db.models.base import ModelState
+from django.utils import timezone
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from .models import RefreshToken, RevokedAccessToken, User
+
+SALT = 'authentication.signed_tokens.access'
+
+
+def _config():
+    return getattr(settings, 'SIGNED_TOKENS', {})
+
+
+def get_mode():
+    return getattr(settings, 'AUTH_TOKEN_MODE', 'token')
+
+
+def get_access_lifetime():
+    return _config().get('ACCESS_LIFETIME', 15 * 60)
+
+
+def get_refresh_lifetime():
+    return timedelta(seconds=_config().get('REFRESH_LIFETIME', 30 * 24 * 60 * 60))
+
+
+def _signer():
+    return signing.Signer(salt=SALT, algorithm='sha256')
+
+
+class AccessToken:
+    """
+    Verified claims of a signed access token; set as `request.auth`.
+    """
+
+    def __init__(self, user_id, is_evaluator, expires_at, jti):
+        self.user_id = user_id
+        self.is_evaluator = is_evaluator
+        self.expires_at = expires_at  # Unix seconds
+        self.jti = jti
+
+    def remaining_lifetime(self):
+        return max(0, self.expires_at - int(time.time()))
+
+    def get_user(self):
+        return ClaimsUser(self)
+
+
+class ClaimsUser(SimpleLazyObject):
+    """
+    `request.user` of a signed access token. The claims, and what comparisons and queries need
+    (`pk`, `_meta`, `_state`, isinstance(), ==), answer without a query; anything else loads the
+    User from the database (one query) and goes to it, so `save()` never writes a claim.
+    """
+    is_authenticated = True
+    is_anonymous = False
+    _meta = User._meta
+
+    def __init__(self, claims):
+        self.__dict__['_claims'] = claims
+        state = ModelState()
+        state.db, state.adding = DEFAULT_DB_ALIAS, False
+        self.__dict__['_claims_state'] = state
+        super().__init__(lambda: User.objects.get(pk=claims.user_id))
+
+    def __getattr__(self, name):
+        # Building a query probes its values with hasattr() (resolve_expression, ...): answer
+        # what a User cannot have without loading the row
+        if self._wrapped is empty and not name.startswith('_') and not hasattr(User, name):
+            raise AttributeError(name)
+        return super().__getattr__(name)
+
+    @property
+    def __class__(self):
+        return User
+
+    @property
+    def pk(self):
+        return self._claims.user_id
+
+    id = pk
+
+    @property
+    def is_evaluator(self):
+        # The token's claim until the row is loaded, the row's value after
+        if self._wrapped is empty:
+            return self._claims.is_evaluator
+        return self._wrapped.is_evaluator
+
+    @property
+    def _state(self):
+        if self._wrapped is empty:
+            return self._claims_state
+        return self._wrapped._state
+
+    __eq__ = Model.__eq__
+    __ne__ = object.__ne__
+    __hash__ = Model.__hash__
+
+
+def issue_access_token(user):
+    """
+    Return a new signed access token for `user` and its claims.
+    """
+    token = AccessToken(
+        user_id=user.pk,
+        is_evaluator=bool(user.is_evaluator),
+        expires_at=int(time.time()) + get_access_lifetime(),
+        jti=secrets.randbits(63),  # Fits RevokedAccessToken.jti (signed 64-bit)
+    )
+    value = f'{token.user_id}:{int(token.is_evaluator)}:{token.expires_at}:{token.jti:x}'
+    return _signer().sign(value), token
+
+
+def verify_access_token(value):
+    """
+    Check the signature, expiry and revocation of an access token; return its claims.
+    Raises AuthenticationFailed.
+    """
+    try:
+        user_id, is_evaluator, expires_at, jti = _signer().unsign(value).split(':')
+        token = AccessToken(int(user_id), is_evaluator == '1', int(expires_at), int(jti, 16))
+    except (signing.BadSignature, ValueError):
+        raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+    if token.expires_at <= time.time():
+        raise exceptions.AuthenticationFailed(_('Token has expired.'))
+    if revocations.is_revoked(token.jti):
+        raise exceptions.AuthenticationFailed(_('Token has been revoked.'))
+    return token
+
+
+def _digest(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def issue_refresh_token(user):
+    """
+    Store a new refresh token for `user` and return its (only ever shown) key.
+    """
+    key = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(
+        key_digest=_digest(key),
+        user=user,
+        expires_at=timezone.now() + get_refresh_lifetime(),
+    )
+    return key
+
+
+def issue_credentials(user):
+    """
+    Login/registration response fields in signed mode.
+    """
+    access, claims = issue_access_token(user)
+    return {
+        'token_type': 'Bearer',
+        'access_token': access,
+        'access_expires_in': claims.remaining_lifetime(),  # Seconds
+        'refresh_token': issue_refresh_token(user),
+    }
+
+
+def refresh_access_token(key):
+    """
+    Mint a new access token from a refresh token key (one query). Raises AuthenticationFailed.
+    """
+    refresh = (
+        RefreshToken.objects.select_related('user')
+        .filter(key_digest=_digest(key or ''), expires_at__gt=timezone.now())
+        .first()
+    )
+    if refresh is None or not refresh.user.is_active:
+        raise exceptions.AuthenticationFailed(_('Invalid or expired refresh token.'))
+    return issue_access_token(refresh.user)
+
+
+def revoke(access_token=None, refresh_key=None, user=None):
+    """
+    Log out: revoke an access token and delete a refresh token (or all of `user`'s when no key
+    is given).
+    """
+    if access_token is not None:
+        expires_at = datetime.fromtimestamp(access_token.expires_at, tz=dt_timezone.utc)
+        RevokedAccessToken.objects.get_or_create(jti=access_token.jti, defaults={'expires_at': expires_at})
+        revocations.add(access_token.jti, access_token.expires_at)
+
+    if refresh_key is not None:
+        RefreshToken.objects.filter(key_digest=_digest(refresh_key)).delete()
+    elif user is not None:
+        RefreshToken.objects.filter(user=user).delete()
+
+
+class RevocationList:
+    """
+    In-memory mirror of RevokedAccessToken: token id -> expiry (unix seconds), dropped once
+    expired. New rows are read every REVOCATION_SYNC_INTERVAL seconds with a range scan of the
+    primary key, so verifying a token needs a query at most once per interval per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self._revoked = {}
+            self._last_id = 0
+            self._synced_at = None
+
+    def add(self, jti, expires_at):
+        with self._lock:
+            self._revoked[jti] = expires_at
+
+    def is_revoked(self, jti):
+        now = time.time()
+        if self._synced_at is None or now - self._synced_at >= _config().get('REVOCATION_SYNC_INTERVAL', 5):
+            self.sync(now)
+        return jti in self._revoked
+
+    def sync(self, now=None):
+        now = now or time.time()
+        rows = list(
+            RevokedAccessToken.objects.filter(id__gt=self._last_id)
+            .order_by('id')
+            .values_list('id', 'jti', 'expires_at')
+        )
+        with self._lock:
+            for row_id, jti, expires_at in rows:
+                self._revoked[jti] = expires_at.timestamp()
+                self._last_id = row_id
+            # Expired tokens are refused anyway; forget them
+            self._revoked = {jti: expires_at for jti, expires_at in self._revoked.items() if expires_at > now}
+            self._synced_at = now
+
+    def __len__(self):
+        return len(self._revoked)
+
+
+revocations = RevocationList()
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    `Authorization: Bearer <access token>`, verified without database access.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        try:
+            value = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        token = verify_access_token(value)
+        return (token.get_user(), token)
+
+    def authenticate_header(self, request):
+        return self.keyword
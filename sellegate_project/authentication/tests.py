@@ -1,12 +1,29 @@
 # tests.py
+import os
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
 from django.urls import reverse
+from rest_framework.request import Request
 from rest_framework.test import APIRequestFactory, APIClient
 from rest_framework import status
 from rest_framework.test import APITestCase
 from django.contrib.auth.models import User
 from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
 from rest_framework.authtoken.models import Token
 
+from authentication import signed_tokens, throttling, token_cache, tokens
+from authentication.models import RefreshToken
 from authentication.views import UserLogoutAPIView
 
 
@@ -26,6 +43,13 @@ class AuthenticationTests(APITestCase):
         # Set up the APIClient
         self.client = APIClient()  # Create an instance of APIClient for making requests
 
+        # Start every test with an empty token cache and no throttle counters
+        token_cache.local_store.clear()
+        token_cache.stats.reset()
+        cache.clear()
+        throttling.stats.reset()
+        signed_tokens.revocations.clear()
+
     def test_user_registration(self):
         # Test user registration with valid data
         data = {
@@ -168,6 +192,433 @@ class AuthenticationTests(APITestCase):
         # Assert that the response contains the expected user information (e.g., email)
         self.assertIn('email', response.data)
 
+    ### EVALUATOR PROFILE TESTS ###
+
+    def test_profiles_are_created_lazily(self):
+        from evaluation.models import EvaluatorProfile
+
+        data = {'username': 'lazyuser', 'email': 'lazyuser@example.com', 'password': 'LazyUserPass123'}
+        response = self.client.post(reverse('user-registration'), data, format='json')
+
+        # No profile row, but the default empty bio in the response
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['evaluatorProfile'], {'bio': ''})
+        self.assertFalse(EvaluatorProfile.objects.filter(user__username='lazyuser').exists())
+
+        # The first profile update creates it
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.patch(reverse('update-user'), {'evaluatorProfile': {'bio': 'Clocks'}}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['user']['evaluatorProfile'], {'bio': 'Clocks'})
+        self.assertEqual(EvaluatorProfile.objects.get(user=self.user).bio, 'Clocks')
+
+    def test_becoming_an_evaluator_creates_the_profile(self):
+        from evaluation.models import EvaluatorProfile
+
+        self.user.is_evaluator = True
+        self.user.save()
+        self.assertTrue(EvaluatorProfile.objects.filter(user=self.user).exists())
+
+        # Saving again doesn't look the profile up again
+        with CaptureQueriesContext(connection) as queries:
+            self.user.save()
+        self.assertFalse([query for query in queries if 'evaluatorprofile' in query['sql']])
+
+    def test_users_serialize_with_one_query(self):
+        from authentication.serializers import UserSerializer
+        from evaluation.models import EvaluatorProfile
+
+        for n in range(3):
+            User.objects.create_user(username=f'listuser{n}', email=f'listuser{n}@example.com', password='ListPass123')
+        EvaluatorProfile.objects.create(user=self.user, bio='Stamps')
+
+        with self.assertNumQueries(1):
+            data = UserSerializer(User.objects.for_serializer().order_by('id'), many=True).data
+        self.assertEqual([user['evaluatorProfile']['bio'] for user in data], ['Stamps', '', '', ''])
+
+    ### LOGIN TESTS ###
+
+    def test_login_loads_user_and_token_in_one_query(self):
+        data = {'email': 'testuser@example.com', 'password': 'TestPassword123'}
+
+        # User joined with the token and the evaluator profile
+        with self.assertNumQueries(1):
+            response = self.client.post(reverse('user-login'), data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['token'], self.token.key)
+
+    def test_login_rehashes_legacy_passwords(self):
+        User.objects.filter(id=self.user.id).update(password=make_password('TestPassword123', hasher='pbkdf2_sha256'))
+
+        data = {'email': 'testuser@example.com', 'password': 'TestPassword123'}
+        response = self.client.post(reverse('user-login'), data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.password.startswith('scrypt$'), "Password was not rehashed with the preferred hasher")
+
+    def test_async_login(self):
+        url = reverse('user-login-async')
+
+        response = self.client.post(url, {'email': 'testuser@example.com', 'password': 'TestPassword123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['token'], self.token.key)
+
+        response = self.client.post(url, {'email': 'unknown@example.com', 'password': 'TestPassword123'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(response.json()['error']['message'], 'Invalid credentials: Incorrect email or password.')
+
+    def test_async_login_releases_the_connections_of_the_hashing_pool(self):
+        # A rehash saves the user from the pool thread, opening a connection there
+        closing_threads = []
+
+        def close_old_connections():
+            closing_threads.append(threading.current_thread().name)
+
+        with mock.patch('authentication.backends.close_old_connections', close_old_connections):
+            data = {'email': 'testuser@example.com', 'password': 'TestPassword123'}
+            response = self.client.post(reverse('user-login-async'), data, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(closing_threads), 1)
+        self.assertTrue(closing_threads[0].startswith('password-hashing'))
+
+    ### THROTTLING TESTS ###
+
+    @override_settings(AUTH_THROTTLES={'RATES': {'login_ip': '10/min', 'login_email': '3/min'}})
+    def test_login_is_throttled_per_email_before_hashing(self):
+        url = reverse('user-login')
+        data = {'email': 'testuser@example.com', 'password': 'WrongPassword'}
+
+        for _ in range(3):
+            self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Refused without a query (so without a password hash either)
+        with self.assertNumQueries(0):
+            response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(response.data['error']['details']['retry_after'], int(response['Retry-After']))
+
+        # Another account from the same address is still allowed, up to the per-IP limit
+        other = {'email': 'other@example.com', 'password': 'WrongPassword'}
+        self.assertEqual(self.client.post(url, other, format='json').status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertEqual(throttling.stats.as_dict()['blocked'], {'login_email': 1})
+
+    @override_settings(AUTH_THROTTLES={'RATES': {'register_ip': '2/hour'}})
+    def test_registration_is_throttled_per_ip(self):
+        url = reverse('user-registration')
+        for n in range(2):
+            data = {'username': f'new{n}', 'email': f'new{n}@example.com', 'password': 'NewUserPass123'}
+            self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_201_CREATED)
+
+        data = {'username': 'new2', 'email': 'new2@example.com', 'password': 'NewUserPass123'}
+        response = self.client.post(url, data, format='json', REMOTE_ADDR='127.0.0.1')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+
+        # Counted per address
+        response = self.client.post(url, data, format='json', REMOTE_ADDR='10.0.0.2')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    @override_settings(AUTH_THROTTLES={'RATES': {'login_ip': '1/min'}})
+    def test_async_login_is_throttled(self):
+        url = reverse('user-login-async')
+        data = {'email': 'testuser@example.com', 'password': 'TestPassword123'}
+
+        self.assertEqual(self.client.post(url, data, format='json').status_code, status.HTTP_200_OK)
+        response = self.client.post(url, data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+        self.assertIn('Retry-After', response)
+
+    def test_sliding_window_weights_the_previous_window(self):
+        # 10 attempts/min; 10 in the previous window, a quarter into the current one: 7.5 still count
+        for _ in range(10):
+            self.assertIsNone(throttling.hit('test', 'ident', 10, 60, now=59))
+        self.assertIsNone(throttling.hit('test', 'ident', 10, 60, now=75))
+        self.assertIsNone(throttling.hit('test', 'ident', 10, 60, now=75))
+        wait = throttling.hit('test', 'ident', 10, 60, now=75)
+        self.assertIsNotNone(wait)
+
+        # Retry-After points at the moment the estimate leaves room again
+        self.assertIsNone(throttling.hit('test', 'ident', 10, 60, now=75 + wait))
+
+    def test_counter_expiring_between_add_and_incr_is_recreated(self):
+        counters = throttling.get_cache()
+        incr = counters.incr
+        expired = []
+
+        def expire_once(key, *args, **kwargs):
+            if not expired:
+                expired.append(key)
+                counters.delete(key)  # Expired right after add() found it
+            return incr(key, *args, **kwargs)
+
+        self.assertIsNone(throttling.hit('test', 'ident', 10, 60, now=0))
+        with mock.patch.object(counters, 'incr', expire_once):
+            self.assertIsNone(throttling.hit('test', 'ident', 10, 60, now=1))
+        self.assertEqual(counters.get(expired[0]), 1)
+
+    ### TOKEN CACHE TESTS ###
+
+    def test_token_lookups_are_cached(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        url = reverse('user_detail', args=[self.user.id])
+
+        # First request: token + user join, then the user joined with its evaluator profile
+        with self.assertNumQueries(2):
+            self.client.get(url)
+
+        # Later requests skip the token lookup
+        with self.assertNumQueries(1):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(token_cache.stats.as_dict()['hits'], 1)
+
+    def test_cached_entries_leave_out_the_password(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.get(reverse('token-status'))  # Caches the token and the user
+
+        entry = token_cache.local_store.get(self.token.key)
+        self.assertNotIn('password', entry[1])
+        self.assertNotIn(self.user.password, entry[2])
+
+        # Cached users load the hash on demand, and saving them keeps it
+        user = token_cache.get_token(self.token.key).user
+        self.assertEqual(user.get_deferred_fields(), {'password'})
+        user.email = 'updated@example.com'
+        user.save()
+        with self.assertNumQueries(1):
+            self.assertTrue(user.check_password('TestPassword123'))
+
+    def test_logout_invalidates_cached_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.get(reverse('token-status'))  # Caches the token
+
+        response = self.client.post(reverse('user-logout'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        response = self.client.get(reverse('token-status'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED, "Deleted token still accepted")
+
+    def test_user_changes_invalidate_cached_user(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.client.get(reverse('token-status'))  # Caches the token and the user
+
+        self.client.patch(reverse('update-user'), {'username': 'renameduser'}, format='json')
+        response = self.client.get(reverse('token-status'))
+        self.assertEqual(response.data['user_details']['username'], 'renameduser')
+
+        # Deactivated users are refused at once, not when the entry expires
+        self.user.refresh_from_db()
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.get(reverse('token-status'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_cache_stats_staff_only(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        response = self.client.get(reverse('token-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        User.objects.filter(id=self.user.id).update(is_staff=True)
+        token_cache.invalidate_user(self.user.id)  # UPDATE skips post_save
+        response = self.client.get(reverse('token-cache-stats'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['misses'], 2)
+
+    ### TOKEN EXPIRY TESTS ###
+
+    def test_expired_token_is_refused(self):
+        self._age_token(self.token, tokens.get_lifetime() + timedelta(seconds=1))
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+
+        response = self.client.get(reverse('token-status'))
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_token_renewal_is_sliding_and_throttled(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        url = reverse('token-status')
+
+        # Used within the renew interval: no write
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE')])
+
+        # Used after the interval: renewed once, back to a full lifetime
+        self._age_token(self.token, tokens.get_renew_interval() + timedelta(minutes=1))
+        response = self.client.get(url)
+        self.assertGreater(Token.objects.get(key=self.token.key).created, timezone.now() - timedelta(minutes=1))
+        self.assertAlmostEqual(response.data['token_expires_in'], tokens.get_lifetime().total_seconds(), delta=60)
+
+    def test_login_replaces_expired_token(self):
+        self._age_token(self.token, tokens.get_lifetime() + timedelta(seconds=1))
+
+        response = self.client.post(reverse('user-login'), {
+            'email': 'testuser@example.com',
+            'password': 'TestPassword123',
+        }, format='json')
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['token'], self.token.key)
+        self.assertFalse(Token.objects.filter(key=self.token.key).exists())
+
+    def test_purge_expired_tokens(self):
+        for n in range(5):
+            user = User.objects.create_user(username=f'stale{n}', email=f'stale{n}@example.com', password='StalePass123')
+            self._age_token(Token.objects.create(user=user), tokens.get_lifetime() + timedelta(days=1))
+
+        output = StringIO()
+        call_command('purge_expired_tokens', batch_size=2, pause=0, stdout=output)
+
+        self.assertIn('Purged 5 expired tokens', output.getvalue())
+        self.assertEqual(list(Token.objects.values_list('key', flat=True)), [self.token.key])
+
+    ### IMPORT TESTS ###
+
+    @override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])  # Fast hashes for the test
+    def test_import_users(self):
+        from evaluation.models import EvaluatorProfile
+
+        with tempfile.TemporaryDirectory() as directory:
+            source = os.path.join(directory, 'users.csv')
+            tokens_output = os.path.join(directory, 'tokens.csv')
+            with open(source, 'w', encoding='utf-8') as stream:
+                stream.write(
+                    "username,email,password,is_evaluator,bio\n"
+                    "alice,alice@example.com,AlicePass123,yes,Antiques\n"
+                    "bob,bob@example.com,BobPass123,no,\n"
+                    "bad name!,bad@example.com,BadPass123,no,\n"  # Invalid username
+                    "testuser,other@example.com,TestPass123,no,\n"  # Existing username
+                    "carol,carol@example.com,CarolPass123,no,\n"
+                )
+
+            output = StringIO()
+            with self.assertNumQueries(6):  # Existing users, then a savepoint around the users, profiles and tokens inserts
+                call_command(
+                    'import_users', source, workers=2, tokens_output=tokens_output,
+                    stdout=output, stderr=StringIO(),
+                )
+
+            with open(tokens_output, encoding='utf-8') as stream:
+                tokens_written = stream.read().splitlines()
+
+        self.assertIn('Imported 3 users', output.getvalue())
+        self.assertIn('skipped 2 rows', output.getvalue())
+
+        alice = User.objects.get(username='alice')
+        self.assertTrue(alice.is_evaluator)
+        self.assertTrue(alice.check_password('AlicePass123'))
+        self.assertEqual(EvaluatorProfile.objects.get(user=alice).bio, 'Antiques')
+        # Only evaluators and users with a bio get a profile upfront
+        self.assertEqual(EvaluatorProfile.objects.filter(user__username__in=['alice', 'bob', 'carol']).count(), 1)
+        self.assertEqual(len(tokens_written), 4)  # Header + one token per imported user
+        self.assertTrue(Token.objects.filter(user=alice).exists())
+
+    ### SIGNED TOKEN TESTS ###
+
+    @override_settings(AUTH_TOKEN_MODE='signed')
+    def test_signed_access_tokens_need_no_database(self):
+        response = self.client.post(reverse('user-login'), {
+            'email': 'testuser@example.com',
+            'password': 'TestPassword123',
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotIn('token', response.data)
+        access = response.data['access_token']
+
+        signed_tokens.revocations.sync()
+        request = Request(APIRequestFactory().get('/', HTTP_AUTHORIZATION='Bearer ' + access))
+        with self.assertNumQueries(0):
+            user, claims = signed_tokens.SignedTokenAuthentication().authenticate(request)
+            self.assertEqual((user.id, user.is_evaluator), (self.user.id, False))
+            # Comparisons and filters by the user need no column either
+            self.assertIsInstance(user, get_user_model())
+            self.assertEqual(user, self.user)
+            self.assertEqual(self.user, user)
+            self.assertIn(f'= {self.user.id}', str(RefreshToken.objects.filter(user=user).query))
+
+        # Other columns load together on first use
+        with self.assertNumQueries(1):
+            self.assertEqual((user.username, user.email), ('testuser', 'testuser@example.com'))
+        self.assertFalse(user.username_changed())
+
+        # The database Token flow keeps working side by side
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + access)
+        self.assertEqual(self.client.get(reverse('token-status')).data['token_type'], 'Bearer')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self.token.key)
+        self.assertEqual(self.client.get(reverse('token-status')).status_code, status.HTTP_200_OK)
+
+    def test_tampered_and_expired_access_tokens_are_refused(self):
+        access, _ = signed_tokens.issue_access_token(self.user)
+        tampered = f"{self.user.id + 1}:{access.split(':', 1)[1]}"  # Claims changed, signature kept
+
+        with override_settings(SIGNED_TOKENS={'ACCESS_LIFETIME': -1}):
+            expired, _ = signed_tokens.issue_access_token(self.user)
+
+        for token in (tampered, expired):
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + token)
+            self.assertEqual(self.client.get(reverse('token-status')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refresh_and_logout_with_signed_tokens(self):
+        credentials = signed_tokens.issue_credentials(self.user)
+
+        response = self.client.post(reverse('token-refresh'), {'refresh_token': credentials['refresh_token']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        access = response.data['access_token']
+
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + access)
+        response = self.client.post(reverse('user-logout'), {'refresh_token': credentials['refresh_token']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # The access token is revoked, the refresh token deleted
+        self.assertEqual(self.client.get(reverse('token-status')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.assertFalse(RefreshToken.objects.exists())
+        response = self.client.post(reverse('token-refresh'), {'refresh_token': credentials['refresh_token']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+        # Other processes see the revocation on their next sync
+        signed_tokens.revocations.clear()
+        signed_tokens.revocations.sync()
+        self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + access)
+        self.assertEqual(self.client.get(reverse('token-status')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    @override_settings(AUTH_TOKEN_MODE='signed')
+    def test_signed_token_claims_are_not_written_back(self):
+        evaluator = get_user_model().objects.create_user(
+            username='evaluator', email='evaluator@example.com', password='TestPassword123', is_evaluator=True,
+        )
+        user_access, _ = signed_tokens.issue_access_token(self.user)
+        evaluator_access, _ = signed_tokens.issue_access_token(evaluator)
+
+        # Deactivated and demoted after their access tokens were issued
+        get_user_model().objects.filter(pk=self.user.pk).update(is_active=False)
+        get_user_model().objects.filter(pk=evaluator.pk).update(is_evaluator=False)
+
+        for access, data in (
+            (user_access, {'email': 'changed@example.com'}),
+            (evaluator_access, {'password': 'NewPassword123'}),  # Saved without loading other columns first
+        ):
+            self.client.credentials(HTTP_AUTHORIZATION='Bearer ' + access)
+            response = self.client.patch(reverse('update-user'), data, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        self.user.refresh_from_db()
+        self.assertEqual((self.user.email, self.user.is_active), ('changed@example.com', False))
+        evaluator.refresh_from_db()
+        self.assertFalse(evaluator.is_evaluator)
+        self.assertTrue(evaluator.check_password('NewPassword123'))
+
+    ### HELPER FUNCTIONS ###
+
+    def _age_token(self, token, age):
+        """
+        Helper function to make a token look `age` old (last renewed `age` ago).
+        """
+        Token.objects.filter(key=token.key).update(created=timezone.now() - age)
+        token_cache.local_store.clear()  # UPDATE skips the save signals
+
 
 
 # 
\ No newline at end of file
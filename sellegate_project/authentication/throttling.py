@@ -0,0 +1,244 @@
+# authentication/throttling.py
+
+"""
+Sliding-window rate limits for the login and registration endpoints.
+
+Every attempt costs a password hash, so a burst of attempts can keep every worker busy. These
+throttles run in DRF's `check_throttles()`, before the view queries the database or hashes a
+password, and refuse attempts over AUTH_THROTTLES['RATES'] per client IP and per email.
+
+A sliding window is approximated from two fixed windows (the current one and the previous one,
+weighted by how much of it still overlaps the sliding window), so each check is a constant
+number of cache operations whatever the rate:
+
+    estimate = previous_count * (1 - elapsed / period) + current_count
+
+Counters live in a Django cache (AUTH_THROTTLES['ALIAS']): per process with the local-memory
+backend, shared by every worker with memcached or Redis.
+"""
+
+import hashlib
+import logging
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions, status
+from rest_framework.response import Response
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+COUNTER_KEY = 'throttle:{scope}:{ident}:{window}'
+PERIODS = {'s': 1, 'm': 60, 'h': 60 * 60, 'd': 24 * 60 * 60}
+
+
+def _config():
+    return getattr(settings, 'AUTH_THROTTLES', {})
+
+
+def is_enabled():
+    return _config().get('ENABLED', True)
+
+
+def get_cache():
+    return caches[_config().get('ALIAS', 'default')]
+
+
+def parse_rate(rate):
+    """
+    '5/min' -> (5, 60). Like DRF rates, only the first letter of the period counts.
+    """
+    if rate is None:
+        return None
+    count, period = rate.split('/')
+    return int(count), PERIODS[period[0]]
+
+
+class ThrottleStats:
+    """
+    Per-process counters of allowed and blocked attempts, per scope.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.allowed = {}
+            self.blocked = {}
+
+    def record(self, scope, blocked):
+        with self._lock:
+            counters = self.blocked if blocked else self.allowed
+            counters[scope] = counters.get(scope, 0) + 1
+
+    def as_dict(self):
+        with self._lock:
+            return {'allowed': dict(self.allowed), 'blocked': dict(self.blocked)}
+
+
+stats = ThrottleStats()
+
+
+def hit(scope, ident, limit, period, now=None):
+    """
+    Count one attempt of `ident` in `scope`. Returns None if it is allowed, otherwise the
+    seconds to wait before the next attempt would be (the refused attempt is not counted).
+    """
+    cache = get_cache()
+    now = time.time() if now is None else now
+    window = int(now // period)
+    elapsed = (now % period) / period
+    current_key = COUNTER_KEY.format(scope=scope, ident=ident, window=window)
+    previous_key = COUNTER_KEY.format(scope=scope, ident=ident, window=window - 1)
+
+    # Kept for two periods: one as the current window, one as the previous window
+    current = _incr(cache, current_key, timeout=2 * period)
+    previous = cache.get(previous_key, 0)
+
+    if previous * (1 - elapsed) + current <= limit:
+        return None
+
+    try:
+        cache.decr(current_key)
+    except ValueError:
+        pass  # Expired or evicted meanwhile: nothing left to give back
+    current -= 1
+    return _wait(previous, current, limit, period, elapsed)
+
+
+def _incr(cache, key, timeout):
+    """
+    Increment the counter `key`, creating it at 1 if missing. incr() raises ValueError when the
+    key expires or is evicted after add() saw it, so that case starts over.
+    """
+    while True:
+        if cache.add(key, 1, timeout=timeout):
+            return 1
+        try:
+            return cache.incr(key)
+        except ValueError:
+            continue
+
+
+def _wait(previous, current, limit, period, elapsed):
+    """
+    Seconds until the sliding estimate leaves room for one more attempt.
+    """
+    if current < limit:
+        # The previous window's weight has to fade to (limit - current - 1) / previous
+        needed = 1 - (limit - current - 1) / previous if previous else 0
+        return max(1, math.ceil((needed - elapsed) * period))
+
+    # The current window alone is full: wait for it to become the previous window, then fade
+    needed = 1 - (limit - 1) / current
+    return max(1, math.ceil((1 - elapsed + needed) * period))
+
+
+class SlidingWindowThrottle(BaseThrottle):
+    """
+    Base class: set `scope` (a key of AUTH_THROTTLES['RATES']) and override `get_cache_ident()`.
+    """
+    scope = None
+
+    def get_cache_ident(self, request):
+        return self.get_ident(request)  # Client IP, honouring NUM_PROXIES like DRF's throttles
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        rate = parse_rate(_config().get('RATES', {}).get(self.scope))
+        if not is_enabled() or rate is None:
+            return True
+
+        ident = self.get_cache_ident(request)
+        if not ident:
+            return True
+
+        self.retry_after = hit(self.scope, ident, *rate)
+        stats.record(self.scope, blocked=self.retry_after is not None)
+        if self.retry_after is not None:
+            logger.info("Throttled %s attempt from %s (retry after %ss)", self.scope, self.get_ident(request), self.retry_after)
+        return self.retry_after is None
+
+    def wait(self):
+        return self.retry_after
+
+
+class EmailThrottleMixin:
+    """
+    Identify attempts by the (normalized, hashed) email of the request body instead of the IP.
+    """
+
+    def get_cache_ident(self, request):
+        email = request.data.get('email') if hasattr(request.data, 'get') else None
+        if not isinstance(email, str) or not email.strip():
+            return None
+        return hashlib.sha256(email.strip().lower().encode('utf-8')).hexdigest()
+
+
+class LoginIPThrottle(SlidingWindowThrottle):
+    scope = 'login_ip'
+
+
+class LoginEmailThrottle(EmailThrottleMixin, SlidingWindowThrottle):
+    scope = 'login_email'
+
+
+class RegistrationIPThrottle(SlidingWindowThrottle):
+    scope = 'register_ip'
+
+
+class RegistrationEmailThrottle(EmailThrottleMixin, SlidingWindowThrottle):
+    scope = 'register_email'
+
+
+LOGIN_THROTTLES = [LoginIPThrottle, LoginEmailThrottle]
+REGISTRATION_THROTTLES = [RegistrationIPThrottle, RegistrationEmailThrottle]
+
+
+def throttled_error(wait):
+    """
+    Body and headers of a 429 response in the API error format.
+    """
+    wait = math.ceil(wait or 1)
+    body = {
+        "status": "error",
+        "error": {
+            "message": f"Too many attempts. Try again in {wait} seconds.",
+            "code": status.HTTP_429_TOO_MANY_REQUESTS,
+            "details": {"retry_after": wait},
+        },
+    }
+    return body, {'Retry-After': str(wait)}
+
+
+def throttled_response(wait):
+    body, headers = throttled_error(wait)
+    return Response(body, status=status.HTTP_429_TOO_MANY_REQUESTS, headers=headers)
+
+
+def check_throttles(request, throttle_classes):
+    """
+    Run the throttles outside of an APIView (async views). Returns the longest wait, or None.
+    """
+    waits = [
+        throttle.wait()
+        for throttle in (throttle_class() for throttle_class in throttle_classes)
+        if not throttle.allow_request(request, None)
+    ]
+    return max(waits) if waits else None
+
+
+class ThrottledResponseMixin:
+    """
+    APIView mixin answering throttled requests in the API error format instead of DRF's default.
+    """
+
+    def handle_exception(self, exc):
+        if isinstance(exc, exceptions.Throttled):
+            return throttled_response(exc.wait)
+        return super().handle_exception(exc)
@@ -0,0 +1,252 @@
+# authentication/token_cache.py
+
+"""
+Cached token authentication.
+
+DRF's TokenAuthentication loads the token and its user (one joined query) on every
+authenticated request, which makes it the most frequent query of the API. CachedTokenAuthentication
+keeps token key -> (token, user) in a bounded LRU with a TTL instead, or in a Django cache
+when TOKEN_AUTH_CACHE['ALIAS'] is set (shared by every process, so logouts are seen everywhere).
+
+Entries hold the column values, not model instances: every request gets fresh Token and User
+objects, so a view modifying `request.user` never alters what other requests see. Entries are
+dropped when the token is deleted (logout) or saved, and when its user is saved or deleted
+(profile updates, deactivation, password changes). The TTL bounds how long a change made
+outside the ORM (raw SQL, another process with the local backend) can go unnoticed.
+
+The password hash is never cached (a shared cache is readable by anything that can reach it):
+cached users leave it deferred, loaded by a query in the rare views that check a password.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connection, transaction
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+SHARED_KEY = 'auth:token:{}'
+
+# User columns left out of the entries
+UNCACHED_USER_FIELDS = frozenset({'password'})
+
+
+def _config():
+    return getattr(settings, 'TOKEN_AUTH_CACHE', {})
+
+
+def is_enabled():
+    return _config().get('ENABLED', True)
+
+
+class TokenCacheStats:
+    """
+    Per-process counters of the token cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.invalidations = 0
+
+    def record(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+class LocalTokenStore:
+    """
+    Per-process, thread-safe LRU of at most TOKEN_AUTH_CACHE['MAX_ENTRIES'] entries, each
+    expiring TOKEN_AUTH_CACHE['TIMEOUT'] seconds after it was stored.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (expires_at, value), least recently used first
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value):
+        config = _config()
+        with self._lock:
+            self._entries[key] = (time.monotonic() + config.get('TIMEOUT', 60), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > config.get('MAX_ENTRIES', 10000):
+                self._entries.popitem(last=False)
+                stats.record('evictions')
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SharedTokenStore:
+    """
+    Store backed by a Django cache (TOKEN_AUTH_CACHE['ALIAS']); the backend handles expiry
+    and eviction.
+    """
+
+    def __init__(self, alias):
+        self.alias = alias
+
+    @property
+    def cache(self):
+        return caches[self.alias]
+
+    def get(self, key):
+        return self.cache.get(SHARED_KEY.format(key))
+
+    def set(self, key, value):
+        self.cache.set(SHARED_KEY.format(key), value, _config().get('TIMEOUT', 60))
+
+    def delete_many(self, keys):
+        self.cache.delete_many([SHARED_KEY.format(key) for key in keys])
+
+
+stats = TokenCacheStats()
+local_store = LocalTokenStore()
+
+
+def get_store():
+    alias = _config().get('ALIAS')
+    return SharedTokenStore(alias) if alias else local_store
+
+
+def _dump(token):
+    """
+    Column values of a token and its user, but for UNCACHED_USER_FIELDS.
+    """
+    user = token.user
+    user_fields = [
+        field.attname for field in user._meta.concrete_fields
+        if field.attname not in UNCACHED_USER_FIELDS and field.attname in user.__dict__
+    ]
+    return token.created, user_fields, [getattr(user, name) for name in user_fields]
+
+
+def _load(key, entry):
+    """
+    Build fresh Token and User instances from a cached entry, as if loaded from the database
+    with UNCACHED_USER_FIELDS deferred.
+    """
+    created, user_fields, user_values = entry
+    user = Token._meta.get_field('user').related_model.from_db(DEFAULT_DB_ALIAS, user_fields, user_values)
+    token = Token.from_db(DEFAULT_DB_ALIAS, ['key', 'user_id', 'created'], [key, user.pk, created])
+    token.user = user
+    Token._meta.get_field('user').remote_field.set_cached_value(user, token)  # user.auth_token
+    return token
+
+
+def get_token(key):
+    """
+    Return the token with the given key and its user, from the cache when possible.
+    Raises Token.DoesNotExist for unknown keys (those are not cached).
+    """
+    store = get_store()
+    entry = store.get(key)
+    if entry is not None:
+        stats.record('hits')
+        return _load(key, entry)
+
+    stats.record('misses')
+    token = Token.objects.select_related('user').get(key=key)
+    store.set(key, _dump(token))
+    return token
+
+
+def refresh(token):
+    """
+    Store the current values of a token (and its loaded user) after an UPDATE that skipped
+    the save signals, e.g. a sliding renewal.
+    """
+    if is_enabled():
+        get_store().set(token.key, _dump(token))
+
+
+def invalidate_tokens(keys):
+    """
+    Drop the given token keys from the cache. Inside a transaction they are dropped right away
+    and again on commit, so a request caching the pre-commit rows in between is not kept.
+    """
+    keys = list(keys)
+    if not keys:
+        return
+
+    def drop():
+        get_store().delete_many(keys)
+        stats.record('invalidations')
+
+    drop()
+    if connection.in_atomic_block:
+        transaction.on_commit(drop)
+
+
+def invalidate_user(user_id):
+    invalidate_tokens(Token.objects.filter(user_id=user_id).values_list('key', flat=True))
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication reading tokens through the token cache, and refusing expired tokens.
+    Same `Authorization: Token <key>` header and same errors as TokenAuthentication.
+    """
+
+    def authenticate_credentials(self, key):
+        from . import tokens
+
+        if is_enabled():
+            try:
+                token = get_token(key)
+            except Token.DoesNotExist:
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+
+            if not token.user.is_active:
+                raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+        else:
+            token = super().authenticate_credentials(key)[1]
+
+        # Expiry with sliding renewal (see authentication/tokens.py)
+        if tokens.is_expired(token):
+            raise exceptions.AuthenticationFailed(_('Token has expired.'))
+        tokens.renew(token)
+
+        return (token.user, token)
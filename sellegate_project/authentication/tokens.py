@@ -0,0 +1,102 @@
+# authentication/tokens.py
+
+"""
+Expiring authentication tokens with sliding renewal.
+
+DRF tokens never expire on their own. Here a token is valid for TOKEN_EXPIRY['LIFETIME'] seconds
+after `Token.created`, and using it slides that window forward: `created` is moved to "now" by
+a conditional UPDATE, at most once per TOKEN_EXPIRY['RENEW_INTERVAL'], so authenticated
+requests don't write to the token table each time. Tokens left unused past their lifetime are
+refused, and removed by `manage.py purge_expired_tokens`.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework.authtoken.models import Token
+
+
+def _config():
+    return getattr(settings, 'TOKEN_EXPIRY', {})
+
+
+def is_enabled():
+    return _config().get('ENABLED', True)
+
+
+def get_lifetime():
+    return timedelta(seconds=_config().get('LIFETIME', 14 * 24 * 60 * 60))
+
+
+def get_renew_interval():
+    return timedelta(seconds=_config().get('RENEW_INTERVAL', 60 * 60))
+
+
+def expires_at(token):
+    return token.created + get_lifetime()
+
+
+def remaining_lifetime(token, now=None):
+    """
+    Seconds left before the token expires (0 once expired), or None if tokens don't expire.
+    """
+    if not is_enabled():
+        return None
+    now = now or timezone.now()
+    return max(0, int((expires_at(token) - now).total_seconds()))
+
+
+def is_expired(token, now=None):
+    if not is_enabled():
+        return False
+    return expires_at(token) <= (now or timezone.now())
+
+
+def expired_tokens(now=None):
+    """
+    Tokens whose lifetime is over (a range scan of the `created` index).
+    """
+    return Token.objects.filter(created__lte=(now or timezone.now()) - get_lifetime())
+
+
+def renew(token, now=None):
+    """
+    Slide the token's expiry forward if its last renewal is more than RENEW_INTERVAL old.
+    Returns True if this call renewed it.
+    """
+    from . import token_cache
+
+    if not is_enabled():
+        return False
+
+    now = now or timezone.now()
+    if now - token.created < get_renew_interval():
+        return False
+
+    # Conditional on the value we read, so concurrent requests renew the token only once
+    renewed = Token.objects.filter(key=token.key, created=token.created).update(created=now)
+    if renewed:
+        token.created = now
+        token_cache.refresh(token)
+    else:
+        token_cache.invalidate_tokens([token.key])  # Renewed (or deleted) meanwhile; reload it
+    return bool(renewed)
+
+
+def get_or_create_token(user):
+    """
+    Return the user's token, replacing it with a new one if it has expired.
+    Used on registration and login instead of Token.objects.get_or_create().
+    """
+    try:
+        token, created = user.auth_token, False  # No query when loaded by EmailBackend
+    except Token.DoesNotExist:
+        token, created = Token.objects.get_or_create(user=user)
+    token.user = user  # Already loaded; spares a query when the renewed token is re-cached
+    if not created and is_expired(token):
+        Token.objects.filter(key=token.key).delete()
+        token, _ = Token.objects.get_or_create(user=user)  # A concurrent login may have replaced it already
+    else:
+        renew(token)
+    return token
@@ -4,21 +4,29 @@ from django.urls import path
 from authentication.views import (
     UserRegistrationAPIView,
     UserLoginAPIView, 
+    UserLoginAsyncView,
     UserLogoutAPIView, 
     UserDetailAPIView, 
     UpdateUserAPIView,
     TokenStatusAPIView,
+    TokenCacheStatsAPIView,
+    ThrottleStatsAPIView,
+    TokenRefreshAPIView,
 )
 
 urlpatterns = [
 
     path('register/', UserRegistrationAPIView.as_view(), name='user-registration'),
     path('login/', UserLoginAPIView.as_view(), name='user-login'),
+    path('login/async/', UserLoginAsyncView.as_view(), name='user-login-async'),  # Same login, hashing off the event loop (ASGI)
     path('logout/', UserLogoutAPIView.as_view(), name='user-logout'),
+    path('token/refresh/', TokenRefreshAPIView.as_view(), name='token-refresh'),  # New signed access token (AUTH_TOKEN_MODE 'signed')
     path('user/<int:id>/', UserDetailAPIView.as_view(), name='user_detail'),  # New API endpoint
     path('update-user/', UpdateUserAPIView.as_view(), name='update-user'),
 
     path('token-status/', TokenStatusAPIView.as_view(), name='token-status'),  # URL pattern for the token status endpoint
+    path('token-cache-stats/', TokenCacheStatsAPIView.as_view(), name='token-cache-stats'),  # Token cache hit/miss counters (staff only)
+    path('throttle-stats/', ThrottleStatsAPIView.as_view(), name='throttle-stats'),  # Login/registration throttle counters (staff only)
 
 
 ]
\ No newline at end of file
@@ -3,17 +3,33 @@
 from rest_framework import status
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework.exceptions import AuthenticationFailed, ParseError
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
 from rest_framework.authtoken.models import Token
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
 from django.core.exceptions import PermissionDenied, ObjectDoesNotExist
 from rest_framework.authentication import TokenAuthentication
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAdminUser
 
+from datetime import datetime, timezone as dt_timezone
+
+from asgiref.sync import sync_to_async
 from django.contrib.auth import authenticate, login, logout
+from django.http import JsonResponse
+from django.views import View
 from .models import User
 from .serializers import UserSerializer
-from evaluation.models import EvaluatorProfile
+from .backends import authenticate_async
+from .throttling import ThrottledResponseMixin
+from . import throttling
+from .token_cache import CachedTokenAuthentication
+from .signed_tokens import SignedTokenAuthentication
+from . import signed_tokens
+from . import token_cache
+from . import tokens
+from evaluation.models import EvaluatorProfile, get_evaluator_profile
 from evaluation.serializers import EvaluatorProfileSerializer
 
 
@@ -35,13 +51,27 @@ class TokenStatusAPIView(APIView):
     API endpoint to return user details if the token is valid.
     """
     permission_classes = [IsAuthenticated]  # Require authentication to access the endpoint
+    query_budget = 3  # Token, renewal when it is due, evaluator profile
 
     def get(self, request):
         # Get the current user from the request
         user = request.user
         
-        # Find the token for the current user
-        token = Token.objects.filter(user=user).first()
+        if isinstance(request.auth, signed_tokens.AccessToken):
+            # Signed access token: its claims are all there is to report
+            return Response(
+                {
+                    "message": "Token is valid.",
+                    "user_details": UserSerializer(user).data,
+                    "token_type": "Bearer",
+                    "token_expires_at": datetime.fromtimestamp(request.auth.expires_at, tz=dt_timezone.utc),
+                    "token_expires_in": request.auth.remaining_lifetime(),  # Seconds, not renewed: use token/refresh/
+                },
+                status=status.HTTP_200_OK
+            )
+
+        # The token the request was authenticated with (renewed already if it was due)
+        token = request.auth if isinstance(request.auth, Token) else Token.objects.filter(user=user).first()
 
         if token:
             # If the token exists, return user details and the token
@@ -53,6 +83,8 @@ class TokenStatusAPIView(APIView):
                 {
                     "message": "Token is valid.",
                     "user_details": response_data,
+                    "token_expires_at": tokens.expires_at(token) if tokens.is_enabled() else None,
+                    "token_expires_in": tokens.remaining_lifetime(token),  # Seconds, renewed as the token is used
                 },
                 status=status.HTTP_200_OK
             )
@@ -65,6 +97,7 @@ class TokenStatusAPIView(APIView):
 class UserDetailAPIView(APIView):
     # Require authentication
     permission_classes = [IsAuthenticated] #Currently any authenticated user can get any other user. We can add more constrains later
+    query_budget = 2  # Token, user with profile
 
     def get(self, request, id):
         """
@@ -104,7 +137,7 @@ class UserDetailAPIView(APIView):
             }
             """
         # Retrieve the user by ID, or return 404 if not found
-        user = get_object_or_404(User, id=id)
+        user = get_object_or_404(User.objects.for_serializer(), id=id)
         
         # Serialize user details for the response
         user_serializer = UserSerializer(user)
@@ -178,7 +211,7 @@ class UpdateUserAPIView(APIView):
 
         # Handle updates for evaluator profile
         if evaluator_profile_data:
-            evaluator_profile = user.evaluatorprofile  # Get the evaluator profile instance
+            evaluator_profile = get_evaluator_profile(user)  # Unsaved until this first write if the user has none
             evaluator_profile_serializer = EvaluatorProfileSerializer(
                 evaluator_profile,
                 data=evaluator_profile_data,
@@ -208,12 +241,13 @@ class UpdateUserAPIView(APIView):
             status=status.HTTP_200_OK,
         )
 
-class UserRegistrationAPIView(APIView):
+class UserRegistrationAPIView(ThrottledResponseMixin, APIView):
     """
     API endpoint to create a new user (sign-up) and return a token.
     """
     permission_classes = [AllowAny]  # Allow public access for registration
     authentication_classes = []  # No authentication required
+    throttle_classes = throttling.REGISTRATION_THROTTLES  # Per IP and per email, checked before any query
 
     def post(self, request):
         # Use the serializer to validate and create the user
@@ -223,17 +257,8 @@ class UserRegistrationAPIView(APIView):
             # Save the user and ensure any necessary signals (like profile creation) are triggered
             user = serializer.save()
 
-            # Create a token for the new user
-            token, created = Token.objects.get_or_create(user=user)
-
-            # Serialize the user to get the structured response
-            user_serializer = UserSerializer(user)
-
-            # Construct the response data including the token
-            response_data = user_serializer.data
-            response_data['token'] = token.key  # Include the generated token
-
-            return Response(response_data, status=status.HTTP_201_CREATED)
+            # Serialize the user with a token (or access/refresh tokens in signed mode)
+            return Response(login_response_data(user), status=status.HTTP_201_CREATED)
 
         # Handle validation errors
         error_response = {
@@ -246,9 +271,33 @@ class UserRegistrationAPIView(APIView):
 
         return Response(error_response, status=status.HTTP_400_BAD_REQUEST)
 
-class UserLoginAPIView(APIView):
+def login_response_data(user):
+    """
+    Login and registration response body: the serialized user and their token (a new one if it
+    had expired), or a signed access token and a refresh token when AUTH_TOKEN_MODE is 'signed'.
+    """
+    if signed_tokens.get_mode() == 'signed':
+        return {**UserSerializer(user).data, **signed_tokens.issue_credentials(user)}
+
+    token = tokens.get_or_create_token(user)
+    return {
+        **UserSerializer(user).data,
+        'token': token.key  # Add the token to the response
+    }
+
+# Same message whether the email or the password is wrong, so logins don't reveal registered emails
+INVALID_CREDENTIALS = {
+    'status': 'error',
+    'error': {
+        'message': 'Invalid credentials: Incorrect email or password.',
+        'code': status.HTTP_401_UNAUTHORIZED,
+    }
+}
+
+class UserLoginAPIView(ThrottledResponseMixin, APIView):
     permission_classes = [AllowAny]  # Allow public access, no token required
     authentication_classes = []
+    throttle_classes = throttling.LOGIN_THROTTLES  # Per IP and per email, checked before any query or hashing
 
 
     def post(self, request):
@@ -256,54 +305,99 @@ class UserLoginAPIView(APIView):
         email = request.data.get('email')
         password = request.data.get('password')
 
-        # Fetch the user by email
+        # EmailBackend: one query for the user and their token, then the password check
+        authenticated_user = authenticate(request, email=email, password=password)
+
+        if authenticated_user is not None:
+            # Return success response with the serialized user data and token
+            return Response(login_response_data(authenticated_user), status=status.HTTP_200_OK)
+
+        else:
+            # Return error response if authentication fails
+            return Response(INVALID_CREDENTIALS, status=status.HTTP_401_UNAUTHORIZED)
+
+class UserLoginAsyncView(View):
+    """
+    Async version of UserLoginAPIView, for ASGI workers: the password is hashed in the bounded
+    LOGIN_HASHING pool, so the worker serves other requests meanwhile. Same request, responses
+    and throttles as `login/`.
+    """
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Token API like the DRF views; Django 4.2's csrf_exempt() can't wrap async views
+        view.csrf_exempt = True
+        return view
+
+    async def post(self, request):
+        request = Request(request, parsers=[parser() for parser in api_settings.DEFAULT_PARSER_CLASSES])
         try:
-            user = User.objects.get(email=email)
-        except User.DoesNotExist:
-            # Return error response if the user with the provided email does not exist
-            return Response(
-                {
-                    'status': 'error',
-                    'error': {
-                        'message': 'Invalid credentials: User with the provided email does not exist.'
-                    }
-                },
-                status=status.HTTP_401_UNAUTHORIZED
+            data = request.data
+        except ParseError as error:
+            return JsonResponse(
+                {'status': 'error', 'error': {'message': str(error.detail), 'code': status.HTTP_400_BAD_REQUEST}},
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Authenticate the user with the provided password
-        authenticated_user = authenticate(username=user.username, password=password)
+        # Same limits as `login/`, before any query or hashing
+        wait = throttling.check_throttles(request, throttling.LOGIN_THROTTLES)
+        if wait is not None:
+            body, headers = throttling.throttled_error(wait)
+            return JsonResponse(body, status=status.HTTP_429_TOO_MANY_REQUESTS, headers=headers)
 
-        if authenticated_user is not None:
-            # Create or get a token for the authenticated user
-            token, _ = Token.objects.get_or_create(user=authenticated_user)
+        user = await authenticate_async(data.get('email'), data.get('password'))
+        if user is None:
+            return JsonResponse(INVALID_CREDENTIALS, status=status.HTTP_401_UNAUTHORIZED)
 
-            # Serialize the user data
-            serialized_user = UserSerializer(authenticated_user)
+        return JsonResponse(await sync_to_async(login_response_data)(user), status=status.HTTP_200_OK)
 
-            # Include the token in the serialized data
-            response_data = {
-                **serialized_user.data,
-                'token': token.key  # Add the token to the response
-            }
+class TokenRefreshAPIView(APIView):
+    """
+    API endpoint minting a new signed access token from a refresh token (AUTH_TOKEN_MODE 'signed').
+    """
+    permission_classes = [AllowAny]  # The refresh token is the credential
+    authentication_classes = []
 
-            # Return success response with the serialized user data and token
-            return Response(response_data, status=status.HTTP_200_OK)
+    def post(self, request):
+        """
+        ### Refreshing an Access Token with Postman
 
-        else:
-            # Return error response if authentication fails
+        1. **Set the HTTP Method to POST** and use `http://localhost:8000/token/refresh/`.
+
+        2. **Set the Request Body**:
+            - `refresh_token`: The refresh token returned by `login/` or `register/`.
+
+        3. **Send the Request**:
+        - If successful, you'll receive a `200 OK` response with a new `access_token`, to send as
+          `Authorization: Bearer <access_token>`.
+        - **401 Unauthorized**: If the refresh token is unknown, expired or was logged out.
+        """
+        try:
+            access, claims = signed_tokens.refresh_access_token(request.data.get('refresh_token'))
+        except AuthenticationFailed as error:
             return Response(
                 {
-                    'status': 'error',
-                    'error': {
-                        'message': 'Invalid credentials: Incorrect password.'
-                    }
+                    "status": "error",
+                    "error": {
+                        "message": str(error.detail),
+                        "code": status.HTTP_401_UNAUTHORIZED,
+                    },
                 },
-                status=status.HTTP_401_UNAUTHORIZED
+                status=status.HTTP_401_UNAUTHORIZED,
             )
-    
+
+        return Response(
+            {
+                "token_type": "Bearer",
+                "access_token": access,
+                "access_expires_in": claims.remaining_lifetime(),  # Seconds
+            },
+            status=status.HTTP_200_OK,
+        )
+
 class UserLogoutAPIView(APIView):
-    authentication_classes = [TokenAuthentication]
+    authentication_classes = [CachedTokenAuthentication, SignedTokenAuthentication]  # Deleting the token drops its cache entry
     permission_classes = [IsAuthenticated]
 
 
@@ -313,8 +407,16 @@ class UserLogoutAPIView(APIView):
             # Get the user's email
             user_email = request.user.email
             
-            # Attempt to delete the token
-            request.user.auth_token.delete()
+            if isinstance(request.auth, signed_tokens.AccessToken):
+                # Signed mode: revoke the access token, delete the given refresh token (or all of them)
+                signed_tokens.revoke(
+                    access_token=request.auth,
+                    refresh_key=request.data.get('refresh_token'),
+                    user=request.user,
+                )
+            else:
+                # Attempt to delete the token (post_delete also drops it from the token cache)
+                request.user.auth_token.delete()
             
             # Return a success response upon successful logout, including the user's email
             return Response({"detail": f"Logout successful for user {user_email}."}, status=status.HTTP_200_OK)
@@ -335,3 +437,29 @@ class UserLogoutAPIView(APIView):
         # is deleted, effectively logging them out. Since tokens are stateless and used
         # for authentication, deleting the token invalidates the user's session,
         # requiring them to authenticate again for future requests.
+
+
+class TokenCacheStatsAPIView(APIView):
+    """
+    API endpoint returning the counters of the token authentication cache.
+    Counters are per process and reset on restart.
+    """
+    permission_classes = [IsAdminUser]  # Staff only
+
+    def get(self, request):
+        data = token_cache.stats.as_dict()
+        store = token_cache.get_store()
+        if store is token_cache.local_store:
+            data['entries'] = len(store)
+        return Response(data, status=status.HTTP_200_OK)
+
+
+class ThrottleStatsAPIView(APIView):
+    """
+    API endpoint returning the allowed/blocked counters of the login and registration throttles.
+    Counters are per process and reset on restart.
+    """
+    permission_classes = [IsAdminUser]  # Staff only
+
+    def get(self, request):
+        return Response(throttling.stats.as_dict(), status=status.HTTP_200_OK)
@@ -0,0 +1,183 @@
+# benchmarks/load.py
+
+"""
+HTTP load driver for bench_load: a weighted mix of real endpoint calls, replayed by concurrent
+clients against a running server, with per-endpoint latency statistics.
+
+Every call goes through a real HTTP connection (keep-alive, one per client thread), so the
+numbers include the server's request parsing, middleware and response encoding.
+"""
+
+import http.client
+import json
+import random
+import threading
+import time
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+
+from django.urls import reverse
+
+# Relative weight, method, path builder, body builder (or None), who calls it ('anonymous', 'user' or 'evaluator')
+Endpoint = namedtuple('Endpoint', 'weight method path body caller')
+
+SEARCH_TERMS = ('lamp', 'vintage clock', 'brass', 'oak chair', 'porcelain vase', 'rare', 'leather', 'globe')
+
+
+def default_mix():
+    """
+    name -> Endpoint. `data` holds the ids sampled from the database (see Driver).
+    """
+    def url(name, *args, **params):
+        return reverse(name, args=args) + ('?' + urlencode(params) if params else '')
+
+    def cart_line(rng, data):
+        return {'item_id': rng.choice(data['unsold_ids']), 'quantity': 1}
+
+    return {
+        'items: list': Endpoint(20, 'GET', lambda rng, data: url('get-all-items', page_size=50), None, 'anonymous'),
+        'items: detail': Endpoint(20, 'GET', lambda rng, data: url('get-item-by-id', rng.choice(data['item_ids'])), None, 'anonymous'),
+        'items: search': Endpoint(10, 'GET', lambda rng, data: url('item-search', query=rng.choice(SEARCH_TERMS)), None, 'anonymous'),
+        'items: explore': Endpoint(15, 'GET', lambda rng, data: url('get-items-to-explore'), None, 'user'),
+        'items: my payments': Endpoint(5, 'GET', lambda rng, data: url('get-user-payments'), None, 'user'),
+        'cart: add': Endpoint(8, 'POST', lambda rng, data: url('add_to_cart'), cart_line, 'user'),
+        'items: buy': Endpoint(3, 'POST', lambda rng, data: url('buy-item', rng.choice(data['unsold_ids'])), None, 'user'),
+        'evaluations: mine': Endpoint(5, 'GET', lambda rng, data: url('my-evaluations'), None, 'evaluator'),
+        'evaluations: items': Endpoint(4, 'GET', lambda rng, data: url('search-items-to-evaluate'), None, 'evaluator'),
+        'auth: token status': Endpoint(5, 'GET', lambda rng, data: url('token-status'), None, 'user'),
+    }
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return None
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(latencies, statuses, errors, seconds):
+    """
+    Statistics of one endpoint: latencies in ms of the answered requests (5xx excluded),
+    statuses as {code: count}.
+    """
+    latencies = sorted(latencies)
+    return {
+        'requests': sum(statuses.values()),  # Responses, 5xx included
+        'throughput': round(len(latencies) / seconds, 2),  # Answered (non-5xx) requests per second
+        'p50_ms': _round(percentile(latencies, 0.50)),
+        'p95_ms': _round(percentile(latencies, 0.95)),
+        'p99_ms': _round(percentile(latencies, 0.99)),
+        'max_ms': _round(latencies[-1] if latencies else None),
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'errors': errors,  # Connection failures and 5xx responses
+    }
+
+
+def _round(value):
+    return None if value is None else round(value, 3)
+
+
+class Driver:
+    """
+    Replay `mix` against `base_url` from `concurrency` threads for `duration` seconds.
+    `data` holds 'item_ids', 'unsold_ids', 'user_tokens' and 'evaluator_tokens'.
+    """
+
+    def __init__(self, base_url, mix, data, concurrency, duration, warmup=0, seed=42):
+        self.base_url = urlsplit(base_url)
+        self.mix = mix
+        self.data = data
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.seed = seed
+
+    def connect(self):
+        connection_class = http.client.HTTPSConnection if self.base_url.scheme == 'https' else http.client.HTTPConnection
+        return connection_class(self.base_url.hostname, self.base_url.port, timeout=30)
+
+    def call(self, connection, rng, endpoint):
+        headers = {'Accept': 'application/json'}
+        token_key = {'user': 'user_tokens', 'evaluator': 'evaluator_tokens'}.get(endpoint.caller)
+        if token_key:
+            headers['Authorization'] = 'Token ' + rng.choice(self.data[token_key])
+        body = None
+        if endpoint.body:
+            body = json.dumps(endpoint.body(rng, self.data))
+            headers['Content-Type'] = 'application/json'
+
+        connection.request(endpoint.method, self.base_url.path.rstrip('/') + endpoint.path(rng, self.data), body, headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status
+
+    def run(self):
+        """
+        Returns ({endpoint name: statistics}, overall statistics).
+        """
+        names = list(self.mix)
+        weights = [self.mix[name].weight for name in names]
+        results = []
+        lock = threading.Lock()
+        start = threading.Barrier(self.concurrency + 1)
+        timing = {}
+
+        def client(n):
+            rng = random.Random(self.seed + n)
+            local = {name: ([], {}, 0) for name in names}
+            connection = self.connect()
+            start.wait()
+            try:
+                while True:
+                    now = time.perf_counter()
+                    if now >= timing['end']:
+                        break
+                    name = rng.choices(names, weights)[0]
+                    started = time.perf_counter()
+                    try:
+                        code = self.call(connection, rng, self.mix[name])
+                    except (OSError, http.client.HTTPException):
+                        connection.close()
+                        connection = self.connect()
+                        code = None
+                    elapsed = (time.perf_counter() - started) * 1000
+
+                    if started < timing['measure_from']:
+                        continue  # Warm-up
+                    latencies, statuses, errors = local[name]
+                    if code is not None:
+                        statuses[code] = statuses.get(code, 0) + 1
+                    if code is None or code >= 500:
+                        errors += 1  # A failing server answers fast; its latencies would flatter the run
+                    else:
+                        latencies.append(elapsed)
+                    local[name] = (latencies, statuses, errors)
+            finally:
+                connection.close()
+                with lock:
+                    results.append(local)
+
+        threads = [threading.Thread(target=client, args=(n,), daemon=True) for n in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+        now = time.perf_counter()
+        timing['measure_from'] = now + self.warmup
+        timing['end'] = now + self.warmup + self.duration
+        start.wait()
+        for thread in threads:
+            thread.join()
+
+        endpoints = {}
+        all_latencies, all_statuses, all_errors = [], {}, 0
+        for name in names:
+            latencies, statuses, errors = [], {}, 0
+            for local in results:
+                latencies.extend(local[name][0])
+                for code, count in local[name][1].items():
+                    statuses[code] = statuses.get(code, 0) + count
+                errors += local[name][2]
+            endpoints[name] = summarize(latencies, statuses, errors, self.duration)
+            all_latencies.extend(latencies)
+            for code, count in statuses.items():
+                all_statuses[code] = all_statuses.get(code, 0) + count
+            all_errors += errors
+        return endpoints, summarize(all_latencies, all_statuses, all_errors, self.duration)
@@ -0,0 +1,99 @@
+# benchmarks/management/commands/bench_auth.py
+
+import random
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from authentication import signed_tokens, token_cache
+from authentication.models import User
+from benchmarks.seed import BENCH_PASSWORD
+from benchmarks.utils import measure, scratch_database
+
+# name -> (authenticator, kind of credential it reads)
+AUTHENTICATORS = {
+    'uncached': (TokenAuthentication, 'Token'),  # DRF's TokenAuthentication, the previous default
+    'cached': (token_cache.CachedTokenAuthentication, 'Token'),
+    'signed': (signed_tokens.SignedTokenAuthentication, 'Bearer'),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the per-request cost of token authentication on a scratch database, with DRF's "
+        "TokenAuthentication, CachedTokenAuthentication and signed access tokens."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users', type=int, default=10_000,
+            help="Number of users (each with a token) to seed (default: 10000).",
+        )
+        parser.add_argument(
+            '--active', type=int, default=1_000,
+            help="Number of distinct tokens the simulated requests use (default: 1000).",
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=20_000,
+            help="Authenticated requests per authenticator (default: 20000).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['users'], options['active'], options['repeat']) <= 0:
+            raise CommandError("--users, --active and --repeat must be positive integers.")
+        if options['active'] > options['users']:
+            raise CommandError("--active can't exceed --users.")
+
+        with scratch_database() as path:
+            self.stdout.write(f"Scratch database: {path}")
+            users, keys = self.seed(options['users'])
+
+            rng = random.Random(42)
+            active = rng.sample(range(len(users)), options['active'])
+            factory = APIRequestFactory()
+            requests = {
+                'Token': [factory.get('/token-status/', HTTP_AUTHORIZATION=f'Token {keys[n]}') for n in active],
+                'Bearer': [
+                    factory.get('/token-status/', HTTP_AUTHORIZATION=f'Bearer {signed_tokens.issue_access_token(users[n])[0]}')
+                    for n in active
+                ],
+            }
+
+            token_cache.local_store.clear()
+            token_cache.stats.reset()
+            signed_tokens.revocations.clear()
+
+            for name, (authenticator_class, kind) in AUTHENTICATORS.items():
+                authenticator = authenticator_class()
+
+                def authenticate():
+                    authenticator.authenticate(Request(rng.choice(requests[kind])))
+
+                with CaptureQueriesContext(connection) as queries:
+                    timings = measure(authenticate, options['repeat'])
+
+                self.stdout.write('')
+                self.stdout.write(self.style.MIGRATE_HEADING(name))
+                self.stdout.write(
+                    f"  median {timings['median_ms'] * 1000:.1f}µs, p95 {timings['p95_ms'] * 1000:.1f}µs, "
+                    f"min {timings['min_ms'] * 1000:.1f}µs per request, "
+                    f"{len(queries) / (options['repeat'] + 1):.3f} queries per request"
+                )
+
+            self.stdout.write('')
+            self.stdout.write(f"Token cache: {token_cache.stats.as_dict()}")
+
+    def seed(self, count):
+        users = User.objects.bulk_create(
+            User(username=f'bench_user_{n}', email=f'bench_user_{n}@example.com', password=BENCH_PASSWORD)
+            for n in range(count)
+        )
+        tokens = Token.objects.bulk_create(
+            Token(key=Token.generate_key(), user=user) for user in users
+        )
+        return users, [token.key for token in tokens]
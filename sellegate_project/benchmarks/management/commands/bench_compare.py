@@ -0,0 +1,114 @@
+# benchmarks/management/commands/bench_compare.py
+
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+# Statistic -> True when higher is better
+STATISTICS = {'throughput': True, 'p50_ms': False, 'p95_ms': False, 'p99_ms': False}
+
+
+def failure_rate(stats):
+    """
+    Share of the calls that failed: connection failures and responses other than 2xx and 4xx.
+    """
+    statuses = {int(code): count for code, count in stats.get('statuses', {}).items()}
+    errors = stats.get('errors', 0)  # Connection failures and 5xx
+    connection_failures = errors - sum(count for code, count in statuses.items() if code >= 500)
+    failed = connection_failures + sum(count for code, count in statuses.items() if code // 100 not in (2, 4))
+    calls = connection_failures + sum(statuses.values())
+    return failed / calls if calls else 0
+
+
+def change(before, after):
+    """
+    Relative change in percent, or None when it can't be computed.
+    """
+    if before is None or after is None or before == 0:
+        return None
+    return (after - before) / before * 100
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare two bench_load JSON results endpoint by endpoint (throughput, p50/p95/p99, failed "
+        "calls) and flag the regressions larger than --threshold percent, and any rise in failures."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('baseline', help="Results of the reference run.")
+        parser.add_argument('candidate', help="Results of the run to check.")
+        parser.add_argument(
+            '--threshold', type=float, default=10,
+            help="Change in percent counted as a regression (default: 10).",
+        )
+        parser.add_argument(
+            '--fail-on-regression', action='store_true',
+            help="Exit with an error when a regression is found (for CI).",
+        )
+
+    def handle(self, *args, **options):
+        baseline, candidate = self.load(options['baseline']), self.load(options['candidate'])
+        threshold = options['threshold']
+
+        self.stdout.write(f"{baseline.get('label')} -> {candidate.get('label')}")
+        header = f"{'endpoint':<22}" + ''.join(f'{name:>22}' for name in STATISTICS) + f"{'failures':>22}"
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+
+        rows = dict(baseline['endpoints'], total=baseline['total'])
+        candidate_rows = dict(candidate['endpoints'], total=candidate['total'])
+        regressions = []
+        for name, before in rows.items():
+            after = candidate_rows.get(name)
+            if after is None:
+                self.stdout.write(f"{name:<22}  missing from {options['candidate']}")
+                continue
+
+            cells = []
+            for statistic, higher_is_better in STATISTICS.items():
+                delta = change(before.get(statistic), after.get(statistic))
+                cell = f"{_format(before.get(statistic))} -> {_format(after.get(statistic))}"
+                if delta is None:
+                    cells.append(f'{cell:>22}')
+                    continue
+                cell = f'{cell} {delta:+.0f}%'
+                worse = -delta if higher_is_better else delta
+                if worse > threshold:
+                    regressions.append(f"{name} {statistic} {delta:+.1f}%")
+                    cells.append(self.style.ERROR(f'{cell:>22}'))
+                elif -worse > threshold:
+                    cells.append(self.style.SUCCESS(f'{cell:>22}'))
+                else:
+                    cells.append(f'{cell:>22}')
+
+            # Errors and unexpected statuses: any rise is a regression, whatever the threshold
+            failed_before, failed_after = failure_rate(before), failure_rate(after)
+            cell = f'{failed_before:.1%} -> {failed_after:.1%}'
+            if failed_after > failed_before:
+                regressions.append(f"{name} failures {failed_before:.1%} -> {failed_after:.1%}")
+                cells.append(self.style.ERROR(f'{cell:>22}'))
+            else:
+                cells.append(f'{cell:>22}')
+            self.stdout.write(f'{name:<22}' + ''.join(cells))
+
+        if not regressions:
+            self.stdout.write(self.style.SUCCESS(f"No regression above {threshold:g}% and no new failures"))
+            return
+        message = f"{len(regressions)} regression(s): " + ', '.join(regressions)
+        if options['fail_on_regression']:
+            raise CommandError(message)
+        self.stdout.write(self.style.WARNING(message))
+
+    def load(self, path):
+        try:
+            with open(path) as stream:
+                results = json.load(stream)
+        except (OSError, ValueError) as error:
+            raise CommandError(f"Can't read {path}: {error}")
+        if 'endpoints' not in results or 'total' not in results:
+            raise CommandError(f"{path} is not a bench_load result.")
+        return results
+
+
+def _format(value):
+    return '-' if value is None else f'{value:.1f}'
@@ -0,0 +1,136 @@
+# benchmarks/management/commands/bench_indexes.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.operations import AddConstraint, AddIndex, RemoveConstraint, RemoveIndex
+
+from benchmarks.seed import seed_marketplace
+from benchmarks.utils import measure, scratch_database
+from cart.models import CartItem
+from evaluation.models import EvaluationRequest
+from item_management.models import Item, Payment
+
+# Migrations adding the indexes under test; the benchmark undoes and replays their operations
+INDEX_MIGRATIONS = [
+    ('item_management', '0026_item_query_indexes'),
+    ('evaluation', '0008_evaluationrequest_item_state_idx'),
+    ('cart', '0005_cartitem_unique_cart_item'),
+]
+
+
+def query_patterns(sample):
+    """
+    (name, queryset, how to evaluate it) for each query pattern the indexes are meant for.
+    """
+    cart_id, cart_item_id = sample['sample_cart_line']
+    explore = Item.objects.filter(is_sold=False).exclude(seller_id=sample['sample_user_id'])
+    return [
+        ('explore: first page', explore.order_by('created_at', 'id')[:51], list),
+        ('explore: total count', explore, lambda queryset: queryset.count()),
+        ('evaluator: pending items', Item.objects.filter(delegation_state='Pending').values_list('id', flat=True), list),
+        ('item: pending requests', EvaluationRequest.objects.filter(item_id=sample['sample_pending_item_id'], state='Pending'), list),
+        ('item: approved exists', EvaluationRequest.objects.filter(item_id=sample['sample_approved_item_id'], state='Approved'), lambda queryset: queryset.exists()),
+        ('buyer: payments', Payment.objects.filter(buyer_id=sample['sample_user_id']), list),
+        ('cart: line lookup', CartItem.objects.filter(cart_id=cart_id, item_id=cart_item_id), list),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed a scratch database and compare EXPLAIN QUERY PLAN output and latency of the main "
+        "query patterns without and with the composite indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items', type=int, default=1_000_000,
+            help="Number of items to seed (default: 1000000).",
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help="Timed runs per query and phase (default: 50).",
+        )
+        parser.add_argument(
+            '--database-path',
+            help="Scratch SQLite file to use instead of a temporary one (kept afterwards).",
+        )
+
+    def handle(self, *args, **options):
+        if options['items'] <= 0 or options['repeat'] <= 0:
+            raise CommandError("--items and --repeat must be positive integers.")
+
+        path = options['database_path']
+        with scratch_database(path, keep=bool(path)) as path:
+            self.stdout.write(f"Scratch database: {path}")
+
+            started = time.monotonic()
+            sample = seed_marketplace(options['items'], progress=self.stdout.write)
+            self.stdout.write(f"Seeded in {time.monotonic() - started:.1f}s")
+
+            forwards = self.index_operations()
+            backwards = [(app_label, self.inverse(operation)) for app_label, operation in reversed(forwards)]
+
+            state = MigrationLoader(connection).project_state()
+            state = self.apply(backwards, state)
+            before = self.run_phase('before', query_patterns(sample), options['repeat'])
+
+            self.apply(forwards, state)
+            after = self.run_phase('after', query_patterns(sample), options['repeat'])
+
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Summary ({options['items']} items, median ms)"))
+        for name in before:
+            speedup = before[name]['median_ms'] / after[name]['median_ms'] if after[name]['median_ms'] else float('inf')
+            self.stdout.write(
+                f"  {name:<28} {before[name]['median_ms']:>10.3f} -> {after[name]['median_ms']:>10.3f}  (x{speedup:.1f})"
+            )
+
+    def index_operations(self):
+        """
+        Return the (app_label, operation) pairs of the index migrations, minus data migrations.
+        """
+        loader = MigrationLoader(connection)
+        operations = []
+        for app_label, name in INDEX_MIGRATIONS:
+            for operation in loader.get_migration(app_label, name).operations:
+                if isinstance(operation, (AddIndex, AddConstraint)):
+                    operations.append((app_label, operation))
+        return operations
+
+    def inverse(self, operation):
+        if isinstance(operation, AddIndex):
+            return RemoveIndex(operation.model_name, operation.index.name)
+        return RemoveConstraint(operation.model_name, operation.constraint.name)
+
+    def apply(self, operations, state):
+        """
+        Run migration operations against the scratch database, like `migrate` would.
+        """
+        with connection.schema_editor() as schema_editor:
+            for app_label, operation in operations:
+                new_state = state.clone()
+                operation.state_forwards(app_label, new_state)
+                operation.database_forwards(app_label, schema_editor, state, new_state)
+                state = new_state
+
+        # Refresh the planner statistics for the indexes that now exist
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return state
+
+    def run_phase(self, phase, patterns, repeat):
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(f"{phase.capitalize()} the composite indexes"))
+
+        results = {}
+        for name, queryset, evaluate in patterns:
+            timings = measure(lambda: evaluate(queryset.all()), repeat)
+            results[name] = timings
+
+            self.stdout.write(f"  {name}: median {timings['median_ms']:.3f} ms, p95 {timings['p95_ms']:.3f} ms")
+            for line in queryset.explain().splitlines():
+                self.stdout.write(f"      {line}")
+        return results
@@ -0,0 +1,200 @@
+# benchmarks/management/commands/bench_load.py
+
+import json
+import logging
+import os
+import random
+import subprocess
+import threading
+from contextlib import ExitStack, contextmanager
+from datetime import datetime, timezone
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.core.wsgi import get_wsgi_application
+from rest_framework.authtoken.models import Token
+
+from authentication.models import User
+from benchmarks.load import Driver, default_mix
+from benchmarks.seed import seed_marketplace
+from benchmarks.utils import scratch_database
+from item_management.models import Item
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass  # One line per request would dominate the run
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    daemon_threads = True
+
+
+@contextmanager
+def local_server():
+    """
+    Serve the project from a threaded wsgiref server on a free local port; yields its URL.
+    """
+    server = make_server('127.0.0.1', 0, get_wsgi_application(), ThreadingWSGIServer, QuietRequestHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextmanager
+def quiet_logger(name, level=logging.WARNING):
+    logger = logging.getLogger(name)
+    previous = logger.level
+    logger.setLevel(level)
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a weighted mix of real endpoint calls (item lists and details, search, explore, "
+        "cart, purchases, evaluations, token status) over HTTP from concurrent clients and report "
+        "throughput and p50/p95/p99 latencies per endpoint. Results can be saved as JSON and "
+        "compared between commits with bench_compare. Exits with an error if any call failed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database-path',
+            help="Database seeded by bench_seed. Without it, a temporary one is seeded with --items.",
+        )
+        parser.add_argument(
+            '--items', type=int, default=10_000,
+            help="Number of items to seed without --database-path (default: 10000).",
+        )
+        parser.add_argument(
+            '--url',
+            help="Load an already running server instead (it must serve the database given by --database-path).",
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help="Concurrent clients, each with its own keep-alive connection (default: 8).",
+        )
+        parser.add_argument(
+            '--duration', type=float, default=10,
+            help="Measured seconds (default: 10).",
+        )
+        parser.add_argument(
+            '--warmup', type=float, default=2,
+            help="Seconds of load before measuring (default: 2).",
+        )
+        parser.add_argument(
+            '--output',
+            help="Write the results as JSON to this file.",
+        )
+        parser.add_argument(
+            '--label',
+            help="Name of the run in the JSON results (default: the current git commit).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['items'], options['concurrency']) <= 0 or options['duration'] <= 0 or options['warmup'] < 0:
+            raise CommandError("--items, --concurrency and --duration must be positive, --warmup can't be negative.")
+        path = options['database_path']
+        if path and not os.path.exists(path):
+            raise CommandError(f"{path} doesn't exist; create it with bench_seed first.")
+        if options['url'] and not path:
+            raise CommandError("--url needs the --database-path the server runs on, to pick ids and tokens.")
+
+        with ExitStack() as stack:
+            stack.enter_context(scratch_database(path, keep=bool(path)))
+            if not path:
+                seed_marketplace(options['items'], progress=self.stdout.write)
+                call_command('rebuild_search_index', verbosity=0)
+            data = self.sample_data(options['concurrency'])
+
+            base_url = options['url'] or stack.enter_context(local_server())
+            stack.enter_context(quiet_logger('sellegate_project.server_timing'))
+            stack.enter_context(quiet_logger('django.request', logging.ERROR))  # 4xx of sold items
+            self.stdout.write(
+                f"Loading {base_url} with {options['concurrency']} clients for {options['duration']:g}s "
+                f"(+{options['warmup']:g}s warm-up)"
+            )
+            driver = Driver(
+                base_url, default_mix(), data, options['concurrency'], options['duration'], options['warmup'],
+            )
+            endpoints, total = driver.run()
+
+        self.report(endpoints, total)
+
+        if options['output']:
+            commit = git_commit()
+            results = {
+                'label': options['label'] or commit,
+                'commit': commit,
+                'created_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+                'config': {
+                    key: options[key] for key in ('database_path', 'items', 'url', 'concurrency', 'duration', 'warmup')
+                },
+                'endpoints': endpoints,
+                'total': total,
+            }
+            with open(options['output'], 'w') as stream:
+                json.dump(results, stream, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+        # Failed calls are left out of the latencies, so a run with errors can't be trusted
+        if total['errors']:
+            raise CommandError(
+                f"{total['errors']} call(s) failed (connection errors or 5xx); the latencies only cover the others."
+            )
+
+    def sample_data(self, concurrency, size=200):
+        """
+        Ids and tokens the clients pick from: one token per sampled user and evaluator.
+        """
+        rng = random.Random(42)
+        item_ids = list(Item.objects.filter(is_visible=True).values_list('id', flat=True))
+        unsold_ids = list(Item.objects.filter(is_visible=True, is_sold=False).values_list('id', flat=True))
+        user_ids = list(User.objects.filter(is_evaluator=False, is_active=True).values_list('id', flat=True))
+        evaluator_ids = list(User.objects.filter(is_evaluator=True, is_active=True).values_list('id', flat=True))
+        if not (item_ids and unsold_ids and user_ids and evaluator_ids):
+            raise CommandError("The database needs visible unsold items, users and evaluators; seed it with bench_seed.")
+
+        def tokens(ids):
+            sample = rng.sample(ids, min(len(ids), max(size, concurrency)))
+            return [Token.objects.get_or_create(user_id=user_id)[0].key for user_id in sample]
+
+        return {
+            'item_ids': rng.sample(item_ids, min(len(item_ids), 10 * size)),
+            'unsold_ids': rng.sample(unsold_ids, min(len(unsold_ids), 10 * size)),
+            'user_tokens': tokens(user_ids),
+            'evaluator_tokens': tokens(evaluator_ids),
+        }
+
+    def report(self, endpoints, total):
+        header = f"{'endpoint':<22}{'requests':>9}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}  statuses"
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(header))
+        for name, stats in list(endpoints.items()) + [('total', total)]:
+            statuses = ' '.join(f'{code}:{count}' for code, count in stats['statuses'].items())
+            self.stdout.write(
+                f"{name:<22}{stats['requests']:>9}{stats['throughput']:>9.1f}"
+                f"{_ms(stats['p50_ms']):>9}{_ms(stats['p95_ms']):>9}{_ms(stats['p99_ms']):>9}{stats['errors']:>8}  {statuses}"
+            )
+
+
+def _ms(value):
+    return '-' if value is None else f'{value:.1f}'
@@ -0,0 +1,141 @@
+# benchmarks/management/commands/bench_login.py
+
+import asyncio
+import time
+
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIRequestFactory
+
+from authentication import backends
+from authentication.models import User
+from authentication.serializers import UserSerializer
+from authentication.views import UserLoginAPIView, UserLoginAsyncView
+from benchmarks.utils import scratch_database
+
+PASSWORD = 'BenchPass123'
+
+HASHERS = {
+    'pbkdf2_sha256': 'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'django.contrib.auth.hashers.ScryptPasswordHasher',
+}
+
+
+def legacy_login(email, password):
+    """
+    The login path UserLoginAPIView used before EmailBackend: user by email, user again by
+    username in ModelBackend, then the token.
+    """
+    user = User.objects.get(email=email)
+    user = authenticate(username=user.username, password=password)
+    token, _ = Token.objects.get_or_create(user=user)
+    return {**UserSerializer(user).data, 'token': token.key}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure logins per second of one worker on a scratch database: the previous login path, "
+        "the EmailBackend login, and the async login hashing in the LOGIN_HASHING pool, for "
+        "PBKDF2 and scrypt password hashes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--logins', type=int, default=40,
+            help="Logins per path and hasher (default: 40).",
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help="Concurrent logins in flight on the async path (default: 8).",
+        )
+        parser.add_argument(
+            '--hasher', choices=['all'] + list(HASHERS), default='all',
+            help="Password hasher to benchmark (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['logins'], options['concurrency']) <= 0:
+            raise CommandError("--logins and --concurrency must be positive integers.")
+
+        hashers = list(HASHERS) if options['hasher'] == 'all' else [options['hasher']]
+        factory = APIRequestFactory()
+
+        with scratch_database() as path:
+            self.stdout.write(f"Scratch database: {path}")
+
+            for name in hashers:
+                # Only the hasher under test, so no login rehashes the password on the way;
+                # every login comes from the same address, so the login throttles are off
+                with override_settings(PASSWORD_HASHERS=[HASHERS[name]], AUTH_THROTTLES={'ENABLED': False}):
+                    emails = self.seed(name, options['logins'])
+
+                    def requests():
+                        return [
+                            factory.post('/login/', {'email': email, 'password': PASSWORD}, format='json')
+                            for email in emails
+                        ]
+
+                    self.stdout.write('')
+                    self.stdout.write(self.style.MIGRATE_HEADING(f"{name} ({len(emails)} logins)"))
+
+                    view = UserLoginAPIView.as_view()
+                    self.report('legacy (3 lookups)', *self.run_sync(
+                        [lambda email=email: legacy_login(email, PASSWORD) for email in emails]))
+                    self.report('sync EmailBackend', *self.run_sync(
+                        [lambda request=request: view(request) for request in requests()]))
+                    self.report(
+                        f"async, {options['concurrency']} in flight, {backends.get_executor()._max_workers} hashing threads",
+                        *self.run_async(UserLoginAsyncView.as_view(), requests(), options['concurrency']),
+                    )
+
+    def seed(self, name, count):
+        """
+        Create `count` users with a token, sharing one password hash made by the hasher.
+        """
+        password = make_password(PASSWORD)
+        users = User.objects.bulk_create(
+            User(username=f'bench_{name}_{n}', email=f'bench_{name}_{n}@example.com', password=password)
+            for n in range(count)
+        )
+        Token.objects.bulk_create(Token(key=Token.generate_key(), user=user) for user in users)
+        return [user.email for user in users]
+
+    def run_sync(self, logins):
+        """
+        Run the logins one after the other, like a synchronous worker.
+        """
+        with CaptureQueriesContext(connection) as queries:
+            started = time.perf_counter()
+            for login in logins:
+                login()
+            elapsed = time.perf_counter() - started
+        return len(logins), elapsed, len(queries)
+
+    def run_async(self, view, requests, concurrency):
+        """
+        Run the logins on one event loop, `concurrency` at a time, like an async worker.
+        """
+        async def main():
+            limit = asyncio.Semaphore(concurrency)
+
+            async def login(request):
+                async with limit:
+                    response = await view(request)
+                    assert response.status_code == 200, response.content
+
+            await asyncio.gather(*(login(request) for request in requests))
+
+        started = time.perf_counter()
+        asyncio.run(main())
+        return len(requests), time.perf_counter() - started, None
+
+    def report(self, title, logins, elapsed, queries):
+        per_login = f", {queries / logins:.1f} queries per login" if queries is not None else ''
+        self.stdout.write(
+            f"  {title}: {logins / elapsed:.1f} logins/s ({elapsed / logins * 1000:.0f} ms per login{per_login})"
+        )
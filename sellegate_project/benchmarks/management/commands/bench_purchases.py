@@ -0,0 +1,155 @@
+# benchmarks/management/commands/bench_purchases.py
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.db.models import Count
+
+from authentication.models import User
+from benchmarks.seed import BENCH_PASSWORD
+from benchmarks.utils import scratch_database
+from item_management import purchases
+from item_management.models import Item, Payment
+
+
+def legacy_buy_item(item_id, buyer):
+    """
+    The purchase path BuyItemAPIView used before the conditional UPDATE: read the item, check
+    it in Python, then save. Kept to show the double sells it allows.
+    """
+    item = Item.objects.get(id=item_id)
+    if item.is_sold or not item.is_visible or item.seller_id == buyer.id:
+        return None
+
+    item.is_sold = True
+    item.is_visible = False
+    item.save()
+    return Payment.objects.create(item=item, buyer=buyer, total_price=item.price)
+
+
+MODES = {
+    'conditional': purchases.buy_item,
+    'legacy': legacy_buy_item,
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Fire parallel buyers at one item and at many items on a scratch database, and report "
+        "throughput and correctness (double sells) of the purchase path."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--buyers', type=int, default=16,
+            help="Number of concurrent buyers (threads) (default: 16).",
+        )
+        parser.add_argument(
+            '--rounds', type=int, default=50,
+            help="Hot-item scenario: items fought over, one after the other (default: 50).",
+        )
+        parser.add_argument(
+            '--items', type=int, default=2000,
+            help="Spread scenario: number of items buyers pick from at random (default: 2000).",
+        )
+        parser.add_argument(
+            '--mode', choices=['all'] + list(MODES), default='all',
+            help="Purchase path to benchmark (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['buyers'], options['rounds'], options['items']) <= 0:
+            raise CommandError("--buyers, --rounds and --items must be positive integers.")
+
+        modes = list(MODES) if options['mode'] == 'all' else [options['mode']]
+
+        with scratch_database() as path:
+            self.stdout.write(f"Scratch database: {path}")
+            seller = User.objects.create(username='bench_seller', email='bench_seller@example.com', password=BENCH_PASSWORD)
+            buyers = User.objects.bulk_create(
+                User(username=f'bench_buyer_{n}', email=f'bench_buyer_{n}@example.com', password=BENCH_PASSWORD)
+                for n in range(options['buyers'])
+            )
+
+            for mode in modes:
+                # Hot item: every buyer tries every item, one item at a time
+                item_ids = self.create_items(seller, options['rounds'])
+                plans = [[item_id for item_id in item_ids] for _ in buyers]
+                self.report(f"{mode}: one hot item x {options['rounds']} rounds", self.run(mode, buyers, plans), item_ids)
+
+                # Spread: every buyer tries a random sample of a larger catalog
+                item_ids = self.create_items(seller, options['items'])
+                rng = random.Random(42)
+                attempts = max(1, options['items'] // len(buyers) * 2)
+                plans = [rng.sample(item_ids, min(attempts, len(item_ids))) for _ in buyers]
+                self.report(f"{mode}: {options['items']} items", self.run(mode, buyers, plans), item_ids)
+
+    def create_items(self, seller, count):
+        items = Item.objects.bulk_create(
+            Item(
+                title=f'Bench item {n}',
+                description='Contended item',
+                price=Decimal('10.00'),
+                seller=seller,
+                delegation_state='Independent',
+                is_visible=True,
+            )
+            for n in range(count)
+        )
+        return [item.pk for item in items]
+
+    def run(self, mode, buyers, plans):
+        """
+        Run one thread per buyer, each attempting the item ids of its plan in order.
+        """
+        buy = MODES[mode]
+        start = threading.Barrier(len(buyers))
+
+        def worker(buyer, item_ids):
+            counts = {'attempts': 0, 'purchases': 0, 'errors': 0}
+            start.wait()  # Release all buyers at once
+            try:
+                for item_id in item_ids:
+                    counts['attempts'] += 1
+                    try:
+                        if buy(item_id, buyer) is not None:
+                            counts['purchases'] += 1
+                    except DatabaseError:
+                        counts['errors'] += 1  # e.g. "database is locked" after the busy timeout
+            finally:
+                connection.close()  # Each thread has its own connection
+            return counts
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=len(buyers)) as executor:
+            results = list(executor.map(worker, buyers, plans))
+        elapsed = time.perf_counter() - started
+
+        totals = {key: sum(result[key] for result in results) for key in ('attempts', 'purchases', 'errors')}
+        totals['elapsed'] = elapsed
+        return totals
+
+    def report(self, title, totals, item_ids):
+        payments = Payment.objects.filter(item_id__in=item_ids)
+        double_sold = payments.values('item_id').annotate(n=Count('id')).filter(n__gt=1).count()
+        sold = Item.objects.filter(id__in=item_ids, is_sold=True).count()
+        paid = payments.values('item_id').distinct().count()
+
+        self.stdout.write('')
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        self.stdout.write(
+            f"  {totals['attempts']} attempts in {totals['elapsed']:.2f}s "
+            f"({totals['attempts'] / totals['elapsed']:.0f} attempts/s, "
+            f"{totals['purchases'] / totals['elapsed']:.0f} purchases/s), {totals['errors']} errors"
+        )
+
+        style = self.style.SUCCESS if not double_sold and sold == paid else self.style.ERROR
+        self.stdout.write(style(
+            f"  {totals['purchases']} purchases, {payments.count()} payments, "
+            f"{double_sold} items sold more than once, {sold} sold items / {paid} paid items"
+        ))
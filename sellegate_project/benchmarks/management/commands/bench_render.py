@@ -0,0 +1,96 @@
+# benchmarks/management/commands/bench_render.py
+
+import io
+import json
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+
+from authentication.models import User
+from benchmarks.seed import ADJECTIVES, CONDITIONS, MATERIALS, OBJECTS
+from benchmarks.utils import measure
+from item_management.models import Item
+from item_management.serializers import ItemSerializer
+from sellegate_project import fast_json
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the JSON rendering and parsing of an item list response (1000 items by default) "
+        "with DRF's JSONRenderer/JSONParser and with FastJSONRenderer/FastJSONParser."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items', type=int, default=1000,
+            help="Items in the payload (default: 1000).",
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help="Timed runs per renderer and parser (default: 50).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['items'], options['repeat']) <= 0:
+            raise CommandError("--items and --repeat must be positive.")
+
+        data = ItemSerializer(self.build_items(options['items']), many=True).data
+        self.stdout.write(f"{options['items']} items, FastJSON backend: {fast_json.backend()}")
+
+        baseline, fast = JSONRenderer(), fast_json.FastJSONRenderer()
+        body = baseline.render(data)
+        if json.loads(fast.render(data)) != json.loads(body):
+            raise CommandError("FastJSONRenderer and JSONRenderer disagree on the payload.")
+        self.stdout.write(f"Payload: {len(body) / 1024:.0f} KiB")
+
+        results = {
+            'render: JSONRenderer': measure(lambda: baseline.render(data), options['repeat']),
+            'render: FastJSONRenderer': measure(lambda: fast.render(data), options['repeat']),
+            'parse: JSONParser': measure(lambda: JSONParser().parse(io.BytesIO(body)), options['repeat']),
+            'parse: FastJSONParser': measure(lambda: fast_json.FastJSONParser().parse(io.BytesIO(body)), options['repeat']),
+        }
+        for name, timings in results.items():
+            self.stdout.write(
+                f"  {name:<26} median {timings['median_ms']:7.2f} ms, "
+                f"p95 {timings['p95_ms']:7.2f} ms, min {timings['min_ms']:7.2f} ms"
+            )
+
+        for kind, baseline_name, fast_name in (
+            ('Rendering', 'render: JSONRenderer', 'render: FastJSONRenderer'),
+            ('Parsing', 'parse: JSONParser', 'parse: FastJSONParser'),
+        ):
+            speedup = results[baseline_name]['median_ms'] / results[fast_name]['median_ms']
+            self.stdout.write(self.style.SUCCESS(f"{kind} is {speedup:.1f}x faster"))
+
+    def build_items(self, count):
+        """
+        Unsaved items like those of a list page: the seller and evaluator are set, so the
+        serializer reads their usernames without queries.
+        """
+        rng = random.Random(42)
+        sellers = [User(id=n, username=f'seller{n}') for n in range(1, 51)]
+        evaluators = [User(id=n, username=f'evaluator{n}') for n in range(51, 56)]
+        now = timezone.now()
+
+        items = []
+        for n in range(1, count + 1):
+            title = f'{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(OBJECTS)}'
+            items.append(Item(
+                id=n,
+                title=title,
+                description=f'{title}, {rng.choice(CONDITIONS)}. Collected over the years, shipped carefully.',
+                price=Decimal(rng.randint(500, 500_000)) / 100,
+                thumbnail_url=f'https://images.example.com/items/{n}.jpg',
+                seller=rng.choice(sellers),
+                evaluator=rng.choice(evaluators) if n % 3 == 0 else None,
+                delegation_state=rng.choice(['Independent', 'Pending', 'Approved']),
+                created_at=now - timedelta(minutes=n),
+                is_visible=True,
+                is_sold=False,
+            ))
+        return items
@@ -0,0 +1,70 @@
+# benchmarks/management/commands/bench_seed.py
+
+import os
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+
+from benchmarks.seed import seed_marketplace
+from benchmarks.utils import scratch_database
+
+
+class Command(BaseCommand):
+    help = (
+        "Create a synthetic marketplace (users, evaluators, items, evaluation requests, payments "
+        "and carts) in a new SQLite file, from 10k to 10M rows, for bench_load and the other "
+        "benchmarks. The real database is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('database_path', help="SQLite file to create (must not exist yet).")
+        parser.add_argument(
+            '--items', type=int, default=100_000,
+            help="Number of items (default: 100000).",
+        )
+        parser.add_argument(
+            '--users', type=int,
+            help="Number of users (default: one per 100 items, at least 10).",
+        )
+        parser.add_argument(
+            '--cart-lines', type=int, default=5,
+            help="Lines in every user's cart (default: 5).",
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help="Rows per INSERT (default: 5000).",
+        )
+        parser.add_argument(
+            '--seed', type=int, default=42,
+            help="Random seed; the same seed and sizes give the same data (default: 42).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['items'], options['batch_size']) <= 0 or options['cart_lines'] < 0:
+            raise CommandError("--items and --batch-size must be positive, --cart-lines can't be negative.")
+        if options['users'] is not None and options['users'] <= 0:
+            raise CommandError("--users must be a positive integer.")
+
+        path = options['database_path']
+        if os.path.exists(path):
+            raise CommandError(f"{path} already exists; bench_seed only creates new databases.")
+
+        started = time.monotonic()
+        with scratch_database(path, keep=True):
+            counts = seed_marketplace(
+                options['items'],
+                users=options['users'],
+                cart_lines=options['cart_lines'],
+                batch_size=options['batch_size'],
+                seed=options['seed'],
+                progress=self.stdout.write,
+            )
+            call_command('rebuild_search_index', verbosity=0)
+            self.stdout.write("Rebuilt the search index")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {counts['users']} users, {counts['items']} items, {counts['evaluation_requests']} "
+            f"evaluation requests and {counts['payments']} payments into {path} "
+            f"in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,134 @@
+# benchmarks/management/commands/bench_sqlite.py
+
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connection
+from django.db.models import F
+from django.test import override_settings
+
+from authentication.models import User
+from benchmarks.seed import seed_marketplace
+from benchmarks.utils import scratch_database
+from cart.models import CartItem
+from item_management import purchases
+from item_management.models import Item
+from sellegate_project.sqlite_tuning import PROFILES
+
+
+def percentile(timings, fraction):
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))] if timings else 0
+
+
+class Command(BaseCommand):
+    help = (
+        "Run a mixed read/write load (explore pages, cart reads, purchases, cart updates) from "
+        "concurrent threads on a scratch database, once per SQLITE_TUNING profile, and report "
+        "throughput, latencies and 'database is locked' errors."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--items', type=int, default=20_000,
+            help="Number of items to seed (default: 20000).",
+        )
+        parser.add_argument(
+            '--threads', type=int, default=8,
+            help="Concurrent clients, each with its own connection (default: 8).",
+        )
+        parser.add_argument(
+            '--seconds', type=float, default=5,
+            help="Duration of the load per profile (default: 5).",
+        )
+        parser.add_argument(
+            '--write-ratio', type=float, default=0.2,
+            help="Share of the operations that write (default: 0.2).",
+        )
+        parser.add_argument(
+            '--profile', choices=['all'] + list(PROFILES), default='all',
+            help="Profile to benchmark (default: all).",
+        )
+
+    def handle(self, *args, **options):
+        if min(options['items'], options['threads']) <= 0 or options['seconds'] <= 0:
+            raise CommandError("--items, --threads and --seconds must be positive.")
+        if not 0 <= options['write_ratio'] <= 1:
+            raise CommandError("--write-ratio must be between 0 and 1.")
+
+        profiles = list(PROFILES) if options['profile'] == 'all' else [options['profile']]
+
+        for name in profiles:
+            # A fresh database per profile: the journal mode is stored in the file
+            tuning = {'PROFILE': name, 'OPTIMIZE_INTERVAL': None}
+            with override_settings(SQLITE_TUNING=tuning), scratch_database() as path:
+                seed_marketplace(options['items'])
+                with connection.cursor() as cursor:
+                    cursor.execute('PRAGMA journal_mode')
+                    journal_mode = cursor.fetchone()[0]
+
+                self.stdout.write('')
+                self.stdout.write(self.style.MIGRATE_HEADING(f"{name} (journal_mode={journal_mode}, {path})"))
+                self.report(self.run(options))
+
+    def run(self, options):
+        """
+        Run `threads` clients for `seconds`, each picking a read or a write at random.
+        """
+        buyers = list(User.objects.order_by('id')[:options['threads']])
+        item_ids = list(Item.objects.filter(is_sold=False).values_list('id', flat=True))
+        line_ids = list(CartItem.objects.values_list('id', flat=True))
+        start = threading.Barrier(len(buyers))
+
+        def read(rng, buyer):
+            list(Item.objects.for_serializer().available_to(buyer).order_by('-created_at')[:50])
+            list(CartItem.objects.filter(cart__user=buyer).select_related('item'))
+
+        def write(rng, buyer):
+            if rng.random() < 0.5:
+                purchases.buy_item(rng.choice(item_ids), buyer)
+            else:
+                CartItem.objects.filter(id=rng.choice(line_ids)).update(quantity=F('quantity') + 1)
+
+        def worker(n, buyer):
+            rng = random.Random(n)
+            timings = {'read': [], 'write': []}
+            errors = 0
+            start.wait()  # Release all clients at once
+            deadline = time.perf_counter() + options['seconds']
+            try:
+                while time.perf_counter() < deadline:
+                    kind = 'write' if rng.random() < options['write_ratio'] else 'read'
+                    started = time.perf_counter()
+                    try:
+                        (write if kind == 'write' else read)(rng, buyer)
+                    except DatabaseError:
+                        errors += 1  # "database is locked"
+                        continue
+                    timings[kind].append((time.perf_counter() - started) * 1000)
+            finally:
+                connection.close()  # Each thread has its own connection
+            return timings, errors
+
+        with ThreadPoolExecutor(max_workers=len(buyers)) as executor:
+            results = list(executor.map(worker, range(len(buyers)), buyers))
+
+        totals = {'read': [], 'write': [], 'errors': 0, 'seconds': options['seconds']}
+        for timings, errors in results:
+            totals['read'].extend(timings['read'])
+            totals['write'].extend(timings['write'])
+            totals['errors'] += errors
+        return totals
+
+    def report(self, totals):
+        for kind in ('read', 'write'):
+            timings = sorted(totals[kind])
+            self.stdout.write(
+                f"  {kind}s: {len(timings) / totals['seconds']:.0f}/s, "
+                f"median {percentile(timings, 0.5):.1f} ms, p95 {percentile(timings, 0.95):.1f} ms, "
+                f"p99 {percentile(timings, 0.99):.1f} ms"
+            )
+        style = self.style.SUCCESS if not totals['errors'] else self.style.ERROR
+        self.stdout.write(style(f"  {totals['errors']} operations failed (database is locked)"))
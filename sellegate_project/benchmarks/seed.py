@@ -0,0 +1,152 @@
+# benchmarks/seed.py
+
+"""
+Deterministic marketplace data for the benchmarks.
+
+Rows are written with bulk_create in batches, so no signals run: the search index and the
+response cache are not touched (run `rebuild_search_index` to search the seeded items). The
+shape roughly follows a live catalog: titles are drawn from a small vocabulary, most older
+items are sold, a few percent are waiting for an evaluator, one user in EVALUATOR_EVERY is an
+evaluator (with a profile), and every user has a cart with a handful of lines.
+"""
+
+import random
+from datetime import timedelta
+
+from django.utils import timezone
+
+from authentication.models import User
+from cart.models import Cart, CartItem
+from evaluation.models import EvaluationRequest, EvaluatorProfile
+from item_management.models import Item, Payment
+
+# (delegation_state, weight)
+DELEGATION_STATES = (('Independent', 80), ('Pending', 5), ('Approved', 10), ('Rejected', 5))
+
+BENCH_PASSWORD = '!'  # Unusable password hash; benchmarks that log in set real passwords
+
+EVALUATOR_EVERY = 50  # One user in 50 is an evaluator
+
+# Item titles: '<adjective> <material> <object>'
+ADJECTIVES = ('Vintage', 'Antique', 'Handmade', 'Rare', 'Restored', 'Signed', 'Victorian', 'Modern', 'Art deco', 'Rustic')
+MATERIALS = ('brass', 'oak', 'silver', 'porcelain', 'leather', 'glass', 'walnut', 'bronze', 'ceramic', 'wool')
+OBJECTS = ('lamp', 'clock', 'vase', 'chair', 'mirror', 'camera', 'guitar', 'watch', 'teapot', 'desk', 'rug', 'globe')
+CONDITIONS = ('mint', 'excellent', 'good', 'fair', 'worn')
+
+
+def _batches(total, batch_size):
+    for start in range(0, total, batch_size):
+        yield start, min(start + batch_size, total)
+
+
+def seed_marketplace(items, users=None, cart_lines=5, batch_size=5000, seed=42, progress=None):
+    """
+    Create `users` users (default: one per 100 items) and `items` items with their evaluation
+    requests, payments and carts. Returns a dict with row counts and a few sample ids that
+    benchmarks can use as query parameters.
+    """
+    rng = random.Random(seed)
+    users = users or max(items // 100, 10)
+    progress = progress or (lambda message: None)
+    states, weights = zip(*DELEGATION_STATES)
+
+    # Users
+    user_ids = []
+    for start, end in _batches(users, batch_size):
+        created = User.objects.bulk_create(
+            User(
+                username=f'bench_user_{n}',
+                email=f'bench_user_{n}@example.com',
+                password=BENCH_PASSWORD,
+                is_evaluator=n % EVALUATOR_EVERY == 0,
+            )
+            for n in range(start, end)
+        )
+        user_ids.extend(user.pk for user in created)
+    evaluator_ids = user_ids[::EVALUATOR_EVERY]
+    for start, end in _batches(len(evaluator_ids), batch_size):
+        EvaluatorProfile.objects.bulk_create(
+            EvaluatorProfile(user_id=user_id, bio='Seeded evaluator') for user_id in evaluator_ids[start:end]
+        )
+    progress(f"Created {users} users ({len(evaluator_ids)} evaluators)")
+
+    # Items, oldest first; 90% of the oldest 80% are sold, almost nothing recent is
+    first_created = timezone.now() - timedelta(seconds=items)
+    pending_ids, approved_ids, sold_ids = [], [], []
+    for start, end in _batches(items, batch_size):
+        batch = []
+        for n in range(start, end):
+            title = f'{rng.choice(ADJECTIVES)} {rng.choice(MATERIALS)} {rng.choice(OBJECTS)}'
+            batch.append(Item(
+                title=title,
+                description=f'{title} in {rng.choice(CONDITIONS)} condition, seeded item number {n}.',
+                price=rng.randint(100, 100000) / 100,
+                seller_id=user_ids[n % users],
+                delegation_state=rng.choices(states, weights)[0],
+                created_at=first_created + timedelta(seconds=n),
+                is_visible=True,
+                is_sold=rng.random() < (0.9 if n < items * 0.8 else 0.05),
+            ))
+        for item in Item.objects.bulk_create(batch):
+            if item.delegation_state == 'Pending':
+                pending_ids.append(item.pk)
+            elif item.delegation_state == 'Approved':
+                approved_ids.append(item.pk)
+            if item.is_sold:
+                sold_ids.append(item.pk)
+        progress(f"Created {end}/{items} items")
+
+    # Two pending evaluation requests per pending item, one approved request per approved item
+    requests = [(item_id, 'Pending') for item_id in pending_ids for _ in range(2)]
+    requests += [(item_id, 'Approved') for item_id in approved_ids]
+    for start, end in _batches(len(requests), batch_size):
+        EvaluationRequest.objects.bulk_create(
+            EvaluationRequest(
+                item_id=item_id,
+                evaluator_id=rng.choice(evaluator_ids),
+                name='Bench evaluation',
+                message='Seeded evaluation request',
+                price=10,
+                state=state,
+            )
+            for item_id, state in requests[start:end]
+        )
+    progress(f"Created {len(requests)} evaluation requests")
+
+    # A payment for every tenth sold item
+    paid_ids = sold_ids[::10]
+    for start, end in _batches(len(paid_ids), batch_size):
+        Payment.objects.bulk_create(
+            Payment(item_id=item_id, buyer_id=rng.choice(user_ids), total_price=10)
+            for item_id in paid_ids[start:end]
+        )
+    progress(f"Created {len(paid_ids)} payments")
+
+    # One cart per user with `cart_lines` distinct items
+    cart_ids = []
+    for start, end in _batches(users, batch_size):
+        created = Cart.objects.bulk_create(Cart(user_id=user_id) for user_id in user_ids[start:end])
+        cart_ids.extend(cart.pk for cart in created)
+
+    first_item_id = Item.objects.order_by('id').values_list('id', flat=True).first()
+    sample_cart_line = None
+    for start, end in _batches(len(cart_ids), batch_size):
+        lines = []
+        for cart_id in cart_ids[start:end]:
+            for offset in rng.sample(range(items), min(cart_lines, items)):
+                lines.append(CartItem(cart_id=cart_id, item_id=first_item_id + offset, quantity=1))
+        CartItem.objects.bulk_create(lines)
+        sample_cart_line = sample_cart_line or (lines[0].cart_id, lines[0].item_id)
+    progress(f"Created {len(cart_ids)} carts")
+
+    return {
+        'users': users,
+        'items': items,
+        'evaluation_requests': len(requests),
+        'payments': len(paid_ids),
+        'sample_user_id': user_ids[len(user_ids) // 2],
+        'sample_evaluator_id': evaluator_ids[len(evaluator_ids) // 2],
+        'sample_pending_item_id': pending_ids[len(pending_ids) // 2] if pending_ids else first_item_id,
+        'sample_approved_item_id': approved_ids[len(approved_ids) // 2] if approved_ids else first_item_id,
+        'sample_cart_line': sample_cart_line,
+    }
@@ -0,0 +1,69 @@
+# benchmarks/utils.py
+
+"""
+Helpers shared by the bench_* management commands.
+"""
+
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.db import connections
+
+
+@contextmanager
+def scratch_database(path=None, keep=False, using='default'):
+    """
+    Point the `using` database at a freshly migrated scratch SQLite file for the duration of
+    the block, so benchmarks can seed millions of rows without touching the real database.
+
+    Every thread opening a connection inside the block gets the scratch database too. The file
+    is created in a temporary directory unless `path` is given, and removed afterwards unless
+    `keep` is True (an existing `path` is reused as is, which skips re-seeding).
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        raise CommandError("Benchmarks run on a scratch SQLite database; the configured database is not SQLite.")
+
+    temp_dir = None
+    if path is None:
+        temp_dir = tempfile.mkdtemp(prefix='sellegate-bench-')
+        path = os.path.join(temp_dir, 'bench.sqlite3')
+
+    original_name = connection.settings_dict['NAME']
+    connection.close()
+    connection.settings_dict['NAME'] = str(path)  # Shared with the connections of other threads
+
+    try:
+        call_command('migrate', database=using, interactive=False, verbosity=0)
+        yield path
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = original_name
+        if temp_dir and not keep:
+            shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+def measure(func, repeat):
+    """
+    Call `func` `repeat` times (after one warm-up call) and return latency statistics in ms.
+    """
+    func()  # Warm up the page cache and the statement cache
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+
+    timings.sort()
+    return {
+        'median_ms': statistics.median(timings),
+        'p95_ms': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+        'min_ms': timings[0],
+    }
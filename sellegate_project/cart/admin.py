@@ -6,9 +6,11 @@ from .models import Cart, CartItem
 class CartItemInline(admin.TabularInline):
     model = CartItem
     extra = 1
+    raw_id_fields = ['item']  # Id input instead of a <select> of every item
 
 # @admin.register(Cart)
 class CartAdmin(admin.ModelAdmin):
     list_display = ['id', 'user']
+    list_select_related = ['user']  # Join the user shown on every row
     inlines = [CartItemInline]
 
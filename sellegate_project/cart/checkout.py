@@ -0,0 +1,103 @@
+# cart/checkout.py
+
+"""
+Checkout: buy everything in a cart at once, in a constant number of queries.
+
+    1. load the cart lines with their items (one SELECT ... JOIN)
+    2. claim every available item with one conditional UPDATE (see item_management/purchases.py)
+    3. re-read the prices of the claimed items (one SELECT)
+    4. create all payments (price * quantity of each line) with one bulk INSERT
+    5. remove the purchased lines with one DELETE
+
+If the UPDATE claims fewer rows than expected, another buyer got one of the items between
+steps 1 and 2: the attempt is rolled back and retried with a fresh view of the cart. Prices are
+read again after the claim because a seller may have changed one since step 1.
+"""
+
+from collections import namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+
+from item_management import cache as response_cache
+from item_management import purchases
+from item_management.models import Item, Payment
+from .models import CartItem
+
+ALL_OR_NOTHING = 'all_or_nothing'  # Buy every item or none of them
+BEST_EFFORT = 'best_effort'  # Buy whatever is still available
+MODES = (ALL_OR_NOTHING, BEST_EFFORT)
+
+MAX_ATTEMPTS = 3
+
+Receipt = namedtuple('Receipt', ['payments', 'unavailable', 'total_price'])
+
+
+class CheckoutError(Exception):
+    """
+    Raised when nothing was bought. `unavailable` holds the cart lines that could not be bought.
+    """
+
+    def __init__(self, message, unavailable=()):
+        super().__init__(message)
+        self.message = message
+        self.unavailable = list(unavailable)
+
+
+class EmptyCartError(CheckoutError):
+    """
+    Raised when there is nothing to check out.
+    """
+
+
+class _ClaimConflict(Exception):
+    """
+    Another buyer claimed one of the items meanwhile; rolls back the attempt.
+    """
+
+
+def checkout(user, mode=ALL_OR_NOTHING):
+    """
+    Buy the items in `user`'s cart and return a Receipt (payments, unavailable lines, total).
+    Raises CheckoutError if nothing was bought.
+    """
+    for _ in range(MAX_ATTEMPTS):
+        lines = list(CartItem.objects.filter(cart__user=user).select_related('item'))
+        if not lines:
+            raise EmptyCartError("Your cart is empty.")
+
+        available, unavailable = [], []
+        for line in lines:
+            (available if purchases.is_available_to(line.item, user) else unavailable).append(line)
+
+        if unavailable and mode == ALL_OR_NOTHING:
+            raise CheckoutError("Some items in your cart are no longer available.", unavailable)
+        if not available:
+            raise CheckoutError("None of the items in your cart are available.", unavailable)
+
+        item_ids = [line.item_id for line in available]
+        try:
+            with transaction.atomic():
+                claimed = Item.objects.filter(id__in=item_ids).available_to(user).mark_sold()
+                if claimed != len(item_ids):
+                    raise _ClaimConflict()
+
+                # The rows are ours now (and write-locked until commit), so their prices can't change under us
+                prices = dict(Item.objects.filter(id__in=item_ids).values_list('id', 'price'))
+
+                # Every line becomes one payment of price * quantity, the subtotal the cart shows
+                payments = Payment.objects.bulk_create(
+                    Payment(item=line.item, buyer=user, total_price=prices[line.item_id] * line.quantity)
+                    for line in available
+                )
+                CartItem.objects.filter(id__in=[line.id for line in available]).delete()
+        except _ClaimConflict:
+            continue
+
+        # UPDATE skips the post_save signal, so invalidate the cached item responses here
+        response_cache.invalidate_items(item_ids)
+
+        total_price = sum((payment.total_price for payment in payments), Decimal('0.00'))
+        return Receipt(payments=payments, unavailable=unavailable, total_price=total_price)
+
+    raise CheckoutError("Items in your cart are being bought by someone else. Please try again.")
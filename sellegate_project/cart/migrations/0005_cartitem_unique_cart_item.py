@@ -0,0 +1,39 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:56
+
+from django.db import migrations, models
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_cart_items(apps, schema_editor):
+    """
+    Merge duplicate (cart, item) rows into the oldest one, adding up their quantities,
+    so the unique constraint can be created.
+    """
+    CartItem = apps.get_model('cart', 'CartItem')
+    using = schema_editor.connection.alias
+
+    duplicates = (
+        CartItem.objects.using(using)
+        .values('cart_id', 'item_id')
+        .annotate(rows=Count('id'), keep_id=Min('id'), total_quantity=Sum('quantity'))
+        .filter(rows__gt=1)
+    )
+    for duplicate in duplicates:
+        rows = CartItem.objects.using(using).filter(cart_id=duplicate['cart_id'], item_id=duplicate['item_id'])
+        rows.filter(id=duplicate['keep_id']).update(quantity=duplicate['total_quantity'])
+        rows.exclude(id=duplicate['keep_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('cart', '0004_alter_cartitem_quantity'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_cart_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='cartitem',
+            constraint=models.UniqueConstraint(fields=('cart', 'item'), name='cartitem_unique_cart_item'),
+        ),
+    ]
@@ -1,4 +1,7 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, Prefetch, Sum
 from authentication.models import User
 from item_management.models import Item
 from django.utils import timezone
@@ -6,17 +9,101 @@ from django.utils import timezone
 
 # Create your models here.
 
+PRICE_FIELD = DecimalField(max_digits=12, decimal_places=2)  # Output type of computed prices
+
+
+class CartQuerySet(models.QuerySet):
+    def with_contents(self):
+        """
+        Load carts ready for CartSerializer in two queries, whatever the number of lines:
+        the cart with its `total_price` annotation, then its lines with their items and
+        `subtotal_price` annotations.
+        """
+        lines = CartItem.objects.select_related('item').annotate(
+            subtotal_price=ExpressionWrapper(F('quantity') * F('item__price'), output_field=PRICE_FIELD),
+        ).order_by('created_at', 'id')
+
+        return self.annotate(
+            total_price=Sum(F('items__quantity') * F('items__item__price'), output_field=PRICE_FIELD, default=Decimal('0.00')),
+        ).prefetch_related(Prefetch('items', queryset=lines))
+
+
+class CartItemQuerySet(models.QuerySet):
+    # Attempts before giving up when concurrent requests keep changing the same line
+    MAX_ATTEMPTS = 3
+
+    def add_quantity(self, cart, item, quantity):
+        """
+        Add `quantity` units of `item` to `cart` without a read-modify-write:
+        `UPDATE ... SET quantity = quantity + n`, or an INSERT if the line doesn't exist yet.
+        Returns True if a new line was created.
+        """
+        for _ in range(self.MAX_ATTEMPTS):
+            if self.filter(cart=cart, item=item).update(quantity=F('quantity') + quantity):
+                return False
+
+            try:
+                with transaction.atomic():
+                    self.create(cart=cart, item=item, quantity=quantity)
+                return True
+            except IntegrityError:
+                continue  # A concurrent request inserted the line first; add to it instead
+
+        raise IntegrityError(f"Could not add item {item.pk} to cart {cart.pk}.")
+
+    def remove_quantity(self, user, item_id, quantity):
+        """
+        Remove `quantity` units of an item from `user`'s cart with a conditional UPDATE, or a
+        conditional DELETE when nothing would be left. Returns 'lowered', 'removed', or None
+        if the item is not in the cart.
+        """
+        lines = self.filter(cart__user=user, item_id=item_id)
+
+        for _ in range(self.MAX_ATTEMPTS):
+            if lines.filter(quantity__gt=quantity).update(quantity=F('quantity') - quantity):
+                return 'lowered'
+
+            deleted, _ = lines.filter(quantity__lte=quantity).delete()
+            if deleted:
+                return 'removed'
+
+            if not lines.exists():
+                return None
+            # The quantity changed between the two statements; try again
+
+        return None
+
+
 class Cart(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = CartQuerySet.as_manager()  # Adds Cart.objects.with_contents()
+
+    def total(self):
+        # Computed by the database when loaded through Cart.objects.with_contents()
+        if hasattr(self, 'total_price'):
+            return self.total_price
+        return sum((line.subtotal() for line in self.items.all()), Decimal('0.00'))
+
 class CartItem(models.Model):
     cart = models.ForeignKey(Cart, related_name='items', on_delete=models.CASCADE)
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     quantity = models.PositiveIntegerField(default = 0)
     created_at = models.DateTimeField(default=timezone.now)
 
+    objects = CartItemQuerySet.as_manager()  # Adds CartItem.objects.add_quantity()/remove_quantity()
+
+    class Meta:
+        constraints = [
+            # One row per item and cart; adding an item again increases its quantity
+            models.UniqueConstraint(fields=['cart', 'item'], name='cartitem_unique_cart_item'),
+        ]
+
     def subtotal(self):
+        # Computed by the database when loaded through Cart.objects.with_contents()
+        if hasattr(self, 'subtotal_price'):
+            return self.subtotal_price
         return self.quantity * self.item.price
     
     def __str__(self):
@@ -1,31 +1,31 @@
 from rest_framework import serializers
 from .models import Cart, CartItem
-from item_management.serializers import ItemSerializer
+from item_management.serializers import ItemSerializer, ItemSummarySerializer
 from item_management.models import Item
 
 
 class CartItemSerializer(serializers.ModelSerializer):
-    subtotal = serializers.SerializerMethodField()  # Define SerializerMethodField for subtotal
+    # CartItem.subtotal(); rendered like the prices ("10.00"), whatever type the database returns
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
+    item = ItemSummarySerializer(read_only=True)  # Embedded item summary (title, price, ...)
     # item_title = serializers.ReadOnlyField(source='item.title')  # Add item_title field to display item title
 
     class Meta:
         model = CartItem
         # fields = ['id', 'cart_id', 'item_id', 'item_title', 'quantity', 'created_at']
-        fields = ['id', 'item_id', 'quantity', 'subtotal']
+        fields = ['id', 'item_id', 'item', 'quantity', 'subtotal']
         read_only_fields = ['cart', 'created_at']  # These fields are read-only
 
-    def get_subtotal(self, obj):
-        """
-        Method to get the subtotal for the cart item from the model's subtotal method.
-        """
-        return obj.subtotal()  # Call the model's subtotal method
-
 class CartSerializer(serializers.ModelSerializer):
+    """
+    Load carts with Cart.objects.with_contents() to serialize them in two queries.
+    """
     items = CartItemSerializer(many=True, read_only=True)  # Serializer for cart items
+    total = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)  # Cart.total()
 
     class Meta:
         model = Cart
-        fields = ['id', 'user_id', 'items']
+        fields = ['id', 'user_id', 'items', 'total']
         read_only_fields = ['user', 'created_at', 'items']  # These fields are read-only
 
     
@@ -1,3 +1,247 @@
-from django.test import TestCase
+# cart/tests.py
+
+import threading
+import time
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APITestCase, APIClient
+
+from item_management import purchases
+from item_management.models import Item, Payment
+from sellegate_project.testing import MarketplaceTestMixin
+from .models import Cart, CartItem
+
+User = get_user_model()
+
+
+class CartTests(MarketplaceTestMixin, APITestCase):
+
+    def setUp(self):
+        # Create a seller with an item, and a buyer with a token
+        self.seller = User.objects.create_user(
+            username='seller',
+            email='seller@example.com',
+            password='SellerPass123'
+        )
+        self.buyer = User.objects.create_user(
+            username='buyer',
+            email='buyer@example.com',
+            password='BuyerPass123'
+        )
+        self.item = Item.objects.create(
+            title='Cart Item',
+            description='Item to put in carts',
+            price=Decimal('10.00'),
+            seller=self.seller,
+            delegation_state='Independent',
+            is_visible=True,
+        )
+
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.buyer))
+
+    def test_adding_an_item_twice_keeps_one_line(self):
+        url = reverse('add_to_cart')
+
+        response = self.client.post(url, {'item_id': self.item.id, 'quantity': 1})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        response = self.client.post(url, {'item_id': self.item.id, 'quantity': 2})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # A single (cart, item) line holding the total quantity
+        line = CartItem.objects.get(cart__user=self.buyer, item=self.item)
+        self.assertEqual(line.quantity, 3)
+
+    def test_duplicate_cart_lines_are_rejected(self):
+        cart = Cart.objects.create(user=self.buyer)
+        CartItem.objects.create(cart=cart, item=self.item, quantity=1)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CartItem.objects.create(cart=cart, item=self.item, quantity=1)
+
+    def test_cart_response_has_totals_and_item_summaries(self):
+        other = self._create_item('Second Item', price=Decimal('2.50'))
+        self._fill_cart(self.item)
+
+        response = self.client.post(reverse('add_to_cart'), {'item_id': other.id, 'quantity': 2})
+
+        # Money renders like the prices: "10.00", not 10.0
+        cart = response.json()['data']
+        self.assertEqual(cart['total'], '15.00')
+        self.assertEqual([line['subtotal'] for line in cart['items']], ['10.00', '5.00'])
+        self.assertEqual(cart['items'][1]['item']['title'], 'Second Item')
+
+    @override_settings(TOKEN_AUTH_CACHE={'ENABLED': False})  # Count the token lookup of every request
+    def test_cart_query_count_does_not_grow(self):
+        counts = {}
+        lines = 0
+        for size in (1, 10, 100):
+            self._fill_cart(*[self._create_item(f'Filler {size}-{n}') for n in range(size - lines)])
+            lines = size
+            extra = self._create_item(f'Extra {size}')
+
+            with CaptureQueriesContext(connection) as add_queries:
+                self.client.post(reverse('add_to_cart'), {'item_id': extra.id})
+            with CaptureQueriesContext(connection) as remove_queries:
+                response = self.client.post(reverse('remove_from_cart'), {'item_id': extra.id})
+
+            self.assertEqual(len(response.data['data']['items']), CartItem.objects.count())
+            counts[size] = (len(add_queries), len(remove_queries))
+
+        self.assertEqual(len(set(counts.values())), 1, f"Cart responses issue a query per line: {counts}")
+
+    ### CHECKOUT TESTS ###
+
+    def test_checkout_buys_the_whole_cart(self):
+        other = self._create_item('Second Item', price=Decimal('5.50'))
+        self._fill_cart(self.item, other)
+
+        response = self.client.post(reverse('checkout'))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['receipt']['total_price'], '15.50')
+        self.assertEqual(len(response.data['receipt']['payments']), 2)
+        self.assertEqual(Item.objects.filter(is_sold=True).count(), 2)
+        self.assertFalse(CartItem.objects.exists(), "Cart was not cleared")
+
+    def test_checkout_all_or_nothing(self):
+        sold = self._create_item('Sold Item', is_sold=True)
+        self._fill_cart(self.item, sold)
+
+        response = self.client.post(reverse('checkout'))
+
+        # Nothing is bought and the cart is left untouched
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['error']['details']['unavailable'][0]['item_id'], sold.id)
+        self.assertFalse(Payment.objects.exists())
+        self.assertEqual(CartItem.objects.count(), 2)
+
+    def test_checkout_best_effort(self):
+        sold = self._create_item('Sold Item', is_sold=True)
+        self._fill_cart(self.item, sold)
+
+        response = self.client.post(reverse('checkout'), {'mode': 'best_effort'})
+
+        # The available item is bought, the sold one is reported and stays in the cart
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([payment['item_id'] for payment in response.data['receipt']['payments']], [self.item.id])
+        self.assertEqual(response.data['receipt']['unavailable'][0]['reason'], 'Item is already sold.')
+        self.assertEqual(list(CartItem.objects.values_list('item_id', flat=True)), [sold.id])
+
+    @override_settings(QUERY_INSPECTOR={'ENABLED': False})  # The seller's UPDATE runs inside the request
+    def test_checkout_charges_the_price_at_purchase_time(self):
+        self._fill_cart(self.item)
+        is_available_to = purchases.is_available_to
+
+        def repriced(item, buyer):
+            # The seller changes the price after the cart was read, before the items are claimed
+            Item.objects.filter(id=item.id).update(price=Decimal('12.00'))
+            return is_available_to(item, buyer)
+
+        with mock.patch('cart.checkout.purchases.is_available_to', repriced):
+            response = self.client.post(reverse('checkout'))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['receipt']['total_price'], '12.00')
+        self.assertEqual(Payment.objects.get().total_price, Decimal('12.00'))
+
+    def test_checkout_charges_the_cart_total(self):
+        response = self.client.post(reverse('add_to_cart'), {'item_id': self.item.id, 'quantity': 3})
+        shown = response.data['data']['total']
+
+        response = self.client.post(reverse('checkout'))
+
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['receipt']['total_price'], shown)
+        self.assertEqual(Payment.objects.get().total_price, Decimal('30.00'))
+
+    def test_checkout_empty_cart(self):
+        response = self.client.post(reverse('checkout'))
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(TOKEN_AUTH_CACHE={'ENABLED': False})  # Count the token lookup of every request
+    def test_checkout_query_count_does_not_grow(self):
+        for size in (1, 10, 100):
+            self._fill_cart(*[self._create_item(f'Bulk Item {n}') for n in range(size)])
+
+            # token + cart lines + UPDATE + prices + INSERT + DELETE, plus the savepoint pair
+            with self.assertNumQueries(8):
+                response = self.client.post(reverse('checkout'))
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+            self.assertEqual(len(response.data['receipt']['payments']), size)
+
+    ### HELPER FUNCTIONS ###
+
+    def _fill_cart(self, *items):
+        """
+        Helper function to put items in the buyer's cart.
+        """
+        cart, _ = Cart.objects.get_or_create(user=self.buyer)
+        for item in items:
+            CartItem.objects.create(cart=cart, item=item, quantity=1)
+
+
+class CartConcurrencyTests(TransactionTestCase):
+    """
+    Real threads, each with its own database connection, hitting the same cart line.
+    """
+
+    def test_concurrent_adds_are_not_lost(self):
+        seller = User.objects.create_user(username='seller', email='seller@example.com', password='SellerPass123')
+        buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='BuyerPass123')
+        item = Item.objects.create(
+            title='Popular Item',
+            description='Everyone adds it',
+            price=Decimal('10.00'),
+            seller=seller,
+            delegation_state='Independent',
+            is_visible=True,
+        )
+        cart = Cart.objects.create(user=buyer)
+
+        threads, adds_per_thread, max_attempts = 8, 25, 200
+        start = threading.Barrier(threads)
+        errors = []
+
+        def add_repeatedly():
+            try:
+                start.wait()
+                for _ in range(adds_per_thread):
+                    # The shared-cache in-memory test database may report a locked table under
+                    # contention (busy_timeout doesn't apply to it); the add is retried, a bounded
+                    # number of times
+                    for attempt in range(max_attempts):
+                        try:
+                            CartItem.objects.add_quantity(cart, item, 1)
+                            break
+                        except OperationalError:
+                            if attempt == max_attempts - 1:
+                                raise
+                            time.sleep(0.001)
+            except Exception as error:  # Reported by the main thread
+                errors.append(error)
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=add_repeatedly) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(CartItem.objects.get(cart=cart, item=item).quantity, threads * adds_per_thread)
+
+        # Removing everything and more deletes the line exactly once
+        self.assertEqual(CartItem.objects.remove_quantity(buyer, item.id, threads * adds_per_thread - 1), 'lowered')
+        self.assertEqual(CartItem.objects.remove_quantity(buyer, item.id, 5), 'removed')
+        self.assertIsNone(CartItem.objects.remove_quantity(buyer, item.id, 1))
 
-# Create your tests here.
@@ -4,4 +4,5 @@ from . import views
 urlpatterns = [
     path('add/', views.AddToCartAPIView.as_view(), name='add_to_cart'),
     path('remove/', views.RemoveFromCartAPIView.as_view(), name='remove_from_cart'),
+    path('checkout/', views.CheckoutAPIView.as_view(), name='checkout'),
 ]
\ No newline at end of file
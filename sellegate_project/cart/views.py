@@ -6,6 +6,9 @@ from rest_framework import status
 from .models import Cart, CartItem
 from .serializers import CartSerializer, CartItemSerializer
 from item_management.models import Item
+from item_management.purchases import rejection_reason
+from item_management.serializers import PaymentSerializer
+from . import checkout
 
 # Create your views here.
 
@@ -17,6 +20,7 @@ AddToCartAPIView:
 This API view is responsible for adding an item to the user's cart. 
 """
     permission_classes = [IsAuthenticated]
+    query_budget = 12  # Token, cart (created on the first add), item, line upsert, cart and its lines, savepoints
 
     def post(self, request):
         """
@@ -48,7 +52,7 @@ This API view is responsible for adding an item to the user's cart.
             - If there's an error, check the response for details.
 
             6. **Common Error Responses**:
-            - **400 Bad Request**: If `item_id` or `quantity` cannot be converted to an integer, or if the item's delegation state is not "Independent" or "Approved".
+            - **400 Bad Request**: If `item_id` or `quantity` cannot be converted to an integer, `quantity` is below 1, or if the item's delegation state is not "Independent" or "Approved".
             - **404 Not Found**: If the specified item does not exist.
             """
 
@@ -62,11 +66,14 @@ This API view is responsible for adding an item to the user's cart.
         except (TypeError, ValueError):
             return Response({"error": "Invalid quantity. It must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
 
+        if quantity < 1:
+            return Response({"error": "Invalid quantity. It must be at least 1."}, status=status.HTTP_400_BAD_REQUEST)
+
         # Retrieve the authenticated user's cart
         cart, created = Cart.objects.get_or_create(user=request.user)
 
         try:
-            item = Item.objects.get(id=item_id)  # Get the item based on the provided ID
+            item = Item.objects.only('delegation_state').get(id=item_id)  # Get the item based on the provided ID
         except Item.DoesNotExist:
             return Response({"error": "Item not found"}, status=status.HTTP_404_NOT_FOUND)
         
@@ -74,13 +81,11 @@ This API view is responsible for adding an item to the user's cart.
         if item.delegation_state not in ["Independent", "Approved"]:
             return Response({"error": f"Item cannot be added to the cart due to its delegation state - {item.delegation_state}."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Create or update the cart item
-        cart_item, created = CartItem.objects.get_or_create(cart=cart, item=item)
-        cart_item.quantity += int(quantity)
-        cart_item.save()
+        # Create or update the cart item in a single statement (no lost updates on concurrent adds)
+        created = CartItem.objects.add_quantity(cart, item, quantity)
 
-        # Serialize the entire cart including its items
-        cart_serializer = CartSerializer(cart)
+        # Serialize the entire cart including its items (two queries, whatever its size)
+        cart_serializer = CartSerializer(Cart.objects.with_contents().get(pk=cart.pk))
 
         if created:
             message = "Item added to the cart successfully"
@@ -99,6 +104,7 @@ class RemoveFromCartAPIView(APIView):
     This API view is responsible for removing an item from the user's cart.
     """
     permission_classes = [IsAuthenticated]
+    query_budget = 5  # Token, conditional UPDATE/DELETE, cart and its lines
 
     def post(self, request):
         """
@@ -122,7 +128,7 @@ class RemoveFromCartAPIView(APIView):
         - Choose `form-data`.
         - Add the following key-value pairs to remove an item from the cart:
             - `item_id`: `1`  # ID of the item to remove
-            - `quantity`: `1`  # Optional, defaults to 1. If not provided, removes the entire item.
+            - `quantity`: `1`  # Optional, defaults to 1. The item is removed once its quantity reaches 0.
 
         5. **Send the Request**:
         - Click "Send" to submit the request.
@@ -130,7 +136,7 @@ class RemoveFromCartAPIView(APIView):
         - If the request fails, check the response for error details.
 
         6. **Common Error Responses**:
-        - **400 Bad Request**: If `item_id` or `quantity` cannot be converted to an integer, or if `item_id` is not provided.
+        - **400 Bad Request**: If `item_id` or `quantity` cannot be converted to an integer, `quantity` is below 1, or if `item_id` is not provided.
         - **404 Not Found**: If the item doesn't exist in the user's cart.
         """
 
@@ -149,29 +155,118 @@ class RemoveFromCartAPIView(APIView):
         if not item_id:
             return Response({"error": "item_id is required"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Get the cart item
-        try:
-            cart_item = CartItem.objects.get(cart__user=request.user, item_id=item_id)
-        except CartItem.DoesNotExist:
-            return Response({"error": "Item not found in the user's cart"}, status=status.HTTP_404_NOT_FOUND)
+        if quantity < 1:
+            return Response({"error": "Invalid quantity. It must be at least 1."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Lower the quantity, or delete the line if nothing would be left (conditional UPDATE/DELETE)
+        result = CartItem.objects.remove_quantity(request.user, item_id, quantity)
 
-        # If quantity is not provided, remove the entire cart item
-        if quantity is None:
-            cart_item.delete()
+        if result is None:
+            return Response({"error": "Item not found in the user's cart"}, status=status.HTTP_404_NOT_FOUND)
+        elif result == 'removed':
             message = "Item removed from the cart successfully"
         else:
-            # Lower the quantity of the cart item
-            if int(quantity) >= cart_item.quantity:
-                cart_item.delete()
-                message = "Item removed from the cart successfully"
-            else:
-                cart_item.quantity -= int(quantity)
-                cart_item.save()
-                message = "Item quantity lowered in the cart successfully"
-
-        # Serialize the entire cart including its items
-        cart = cart_item.cart
+            message = "Item quantity lowered in the cart successfully"
+
+        # Serialize the entire cart including its items (two queries, whatever its size)
+        cart = Cart.objects.with_contents().get(user=request.user)
         cart_serializer = CartSerializer(cart)
 
         # Return response with serialized data and message
-        return Response({"message": message, "data": cart_serializer.data}, status=status.HTTP_200_OK)
\ No newline at end of file
+        return Response({"message": message, "data": cart_serializer.data}, status=status.HTTP_200_OK)
+
+
+class CheckoutAPIView(APIView):
+    """
+CheckoutAPIView:
+----------------
+This API view buys every item in the user's cart in one transaction and returns a receipt.
+The number of queries does not depend on the number of items in the cart (see cart/checkout.py).
+"""
+    permission_classes = [IsAuthenticated]
+    query_budget = 8  # Token, cart lines, UPDATE, prices, INSERT, DELETE and a savepoint pair
+
+    def post(self, request):
+        """
+        ### Checking Out the Cart with Postman (Form Data)
+
+        To buy everything in the cart in Postman, follow these steps:
+
+        1. **Set the HTTP Method to POST**:
+        - Select `POST` from the method dropdown.
+
+        2. **Enter the Endpoint URL**:
+        - Use the endpoint for checking out. Example: `http://localhost:8000/cart/checkout/`.
+
+        3. **Set the Headers**:
+        - Add the `Authorization` header with your token:
+            - `Authorization`: `Token <your_token_here>`  # Replace with your actual token
+
+        4. **Set the Request Body**:
+        - Click on the "Body" tab.
+        - Choose `form-data`.
+        - Optionally add:
+            - `mode`: `all_or_nothing` (default) to buy every item or none of them,
+              or `best_effort` to buy whatever is still available.
+
+        5. **Send the Request**:
+        - Click "Send" to submit the request.
+        - If successful, you should get a 201 Created response with a receipt: the payments,
+          the total price and the cart items that could not be bought (best effort only).
+        - Purchased items are removed from the cart.
+
+        6. **Common Error Responses**:
+        - **400 Bad Request**: If the cart is empty or `mode` is invalid.
+        - **409 Conflict**: If items are no longer available (all or nothing), none of them are (best effort),
+          or other buyers kept claiming them. `details.unavailable` lists the affected items.
+        """
+        mode = request.data.get('mode', checkout.ALL_OR_NOTHING)
+        if mode not in checkout.MODES:
+            return Response(
+                {
+                    "status": "error",
+                    "error": {
+                        "message": f"Invalid mode. Choose one of: {', '.join(checkout.MODES)}.",
+                        "code": status.HTTP_400_BAD_REQUEST,
+                        "details": {},
+                    },
+                },
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        try:
+            receipt = checkout.checkout(request.user, mode=mode)
+        except checkout.CheckoutError as error:
+            # An empty cart is the client's mistake; anything else is a conflict with other buyers
+            code = status.HTTP_400_BAD_REQUEST if isinstance(error, checkout.EmptyCartError) else status.HTTP_409_CONFLICT
+            return Response(
+                {
+                    "status": "error",
+                    "error": {
+                        "message": error.message,
+                        "code": code,
+                        "details": {"unavailable": self.unavailable_data(error.unavailable, request.user)},
+                    },
+                },
+                status=code,
+            )
+
+        return Response(
+            {
+                "message": "Checkout completed successfully.",
+                "receipt": {
+                    "mode": mode,
+                    "payments": PaymentSerializer(receipt.payments, many=True).data,
+                    "total_price": str(receipt.total_price),
+                    "unavailable": self.unavailable_data(receipt.unavailable, request.user),
+                },
+            },
+            status=status.HTTP_201_CREATED,
+        )
+
+    def unavailable_data(self, lines, user):
+        return [
+            {"item_id": line.item_id, "item_name": line.item.title, "reason": rejection_reason(line.item, user)}
+            for line in lines
+        ]
+
@@ -11,6 +11,12 @@ class EvaluationRequestAdmin(admin.ModelAdmin):
     # List of fields to display in the admin interface
     list_display = ['id', 'item', 'evaluator', 'name', 'price', 'state', 'created_at']
 
+    # Join the item and evaluator shown on every row (and used by EvaluationRequest.__str__)
+    list_select_related = ['item', 'evaluator']
+
+    # Id inputs instead of a <select> of every item and user
+    raw_id_fields = ['item', 'evaluator']
+
     # Fields to search by in the admin interface
     search_fields = ['name', 'evaluator__username', 'item__title']  # Search by evaluator and item name
 
@@ -30,6 +36,7 @@ class EvaluationRequestAdmin(admin.ModelAdmin):
 @admin.register(EvaluatorProfile)
 class EvaluatorProfileAdmin(admin.ModelAdmin):
     list_display = ('id', 'user')  # Display these fields in the list view
+    list_select_related = ('user',)  # Join the user shown on every row
     search_fields = ('user__username', 'bio')  # Enable searching by these fields
 
 
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 17:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluation', '0007_oldevaluationrequest_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='evaluationrequest',
+            index=models.Index(fields=['item', 'state'], name='evalreq_item_state_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:07
+
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def reject_extra_approvals(apps, schema_editor):
+    """
+    Keep only the most recent approved request of each item (the one the item was last
+    updated from) and reject the others, so the unique constraint can be created.
+    """
+    EvaluationRequest = apps.get_model('evaluation', 'EvaluationRequest')
+    using = schema_editor.connection.alias
+
+    duplicates = (
+        EvaluationRequest.objects.using(using)
+        .filter(state='Approved')
+        .values('item_id')
+        .annotate(approved=Count('id'), keep_id=Max('id'))
+        .filter(approved__gt=1)
+    )
+    for duplicate in duplicates:
+        (
+            EvaluationRequest.objects.using(using)
+            .filter(item_id=duplicate['item_id'], state='Approved')
+            .exclude(id=duplicate['keep_id'])
+            .update(state='Rejected')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('evaluation', '0008_evaluationrequest_item_state_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(reject_extra_approvals, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='evaluationrequest',
+            constraint=models.UniqueConstraint(condition=models.Q(('state', 'Approved')), fields=('item',), name='evalreq_one_approved_per_item'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-17 18:40
+
+from django.conf import settings
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def drop_empty_profiles(apps, schema_editor):
+    """
+    Profiles are now created lazily: delete the empty ones registration used to create for
+    every user. Evaluators keep theirs.
+    """
+    EvaluatorProfile = apps.get_model('evaluation', 'EvaluatorProfile')
+    using = schema_editor.connection.alias
+
+    EvaluatorProfile.objects.using(using).filter(bio='', user__is_evaluator=False).delete()
+
+
+def restore_empty_profiles(apps, schema_editor):
+    """
+    Give every user without a profile an empty one again.
+    """
+    EvaluatorProfile = apps.get_model('evaluation', 'EvaluatorProfile')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    using = schema_editor.connection.alias
+
+    user_ids = (
+        User.objects.using(using)
+        .filter(evaluatorprofile__isnull=True)
+        .values_list('id', flat=True)
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    EvaluatorProfile.objects.using(using).bulk_create(
+        (EvaluatorProfile(user_id=user_id) for user_id in user_ids),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('evaluation', '0009_evalreq_one_approved_per_item'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_empty_profiles, restore_empty_profiles),
+    ]
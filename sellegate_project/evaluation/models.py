@@ -29,6 +29,20 @@ class EvaluationRequest(models.Model):
     )
     created_at = models.DateTimeField(default=timezone.now)  # Timestamp of the request
 
+    class Meta:
+        indexes = [
+            # Requests are always looked up per item and state (pending list, approval checks)
+            models.Index(fields=['item', 'state'], name='evalreq_item_state_idx'),
+        ]
+        constraints = [
+            # At most one approved request per item (see evaluation/transitions.py)
+            models.UniqueConstraint(
+                fields=['item'],
+                condition=models.Q(state='Approved'),
+                name='evalreq_one_approved_per_item',
+            ),
+        ]
+
     def __str__(self):
         return f"Assessment Request: {self.name} by {self.evaluator.username}"
 
@@ -43,6 +57,18 @@ class EvaluatorProfile(models.Model):
     def __str__(self):
         # Return a string representation using the username of the associated User
         return f"{self.user.username}"
+
+
+def get_evaluator_profile(user):
+    """
+    Return the user's profile, or an unsaved empty one if they have none yet (profiles are
+    created on first write). No query when the profile was joined in
+    (User.objects.for_serializer()) or is already known to be missing.
+    """
+    try:
+        return user.evaluatorprofile
+    except EvaluatorProfile.DoesNotExist:
+        return EvaluatorProfile(user=user)
 # OLD \/\/\/\/\/\/\/\/\
 class OLDEvaluationRequest(models.Model):
     # Define status choices for the evaluation request
@@ -0,0 +1,117 @@
+# evaluation/queue.py
+
+"""
+Leased work queue handing pending items to evaluators.
+
+Instead of every evaluator reading the full list of pending items (and racing on the same
+popular ones), each evaluator claims a page of items. A claim is a time-limited lease stored
+on the item (`claimed_by`, `lease_expires_at`); while it runs, no other evaluator is handed
+the item. Every operation is a single conditional UPDATE, so claims never overlap however many
+evaluators call the queue at once:
+
+    - reclaim: UPDATE ... SET claimed_by = NULL WHERE lease_expires_at < now
+               OR (claimed_by = evaluator AND the item is no longer pending or is sold)
+      (range scans of the lease_expires_at and claimed_by indexes, touching only those rows)
+    - renew:   UPDATE ... SET lease_expires_at = new expiry WHERE claimed_by = evaluator
+               AND the item is still pending and unsold
+    - claim:   UPDATE ... SET claimed_by = evaluator, lease_expires_at = new expiry
+               WHERE claimed_by IS NULL AND id IN (SELECT ... oldest free items LIMIT n)
+    - release: UPDATE ... SET claimed_by = NULL WHERE id = %s AND claimed_by = evaluator
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+
+from item_management.models import Item
+from .models import EvaluationRequest
+
+# Queue orderings: name -> ORDER BY
+ORDERINGS = {
+    'oldest': ('created_at', 'id'),  # Items waiting the longest first (default)
+    'price': ('-price', 'created_at', 'id'),  # Most valuable items first
+}
+
+
+# Items waiting in the queue: an evaluator only ever holds leases on these
+QUEUED = Q(delegation_state='Pending', is_sold=False)
+
+
+def _config():
+    return getattr(settings, 'EVALUATION_QUEUE', {})
+
+
+def get_page_size(requested=None):
+    """
+    Return the requested page size, falling back to the default and capped at the maximum.
+    """
+    config = _config()
+    try:
+        size = int(requested)
+    except (TypeError, ValueError):
+        return config.get('PAGE_SIZE', 20)
+
+    if size <= 0:
+        return config.get('PAGE_SIZE', 20)
+    return min(size, config.get('MAX_PAGE_SIZE', 100))
+
+
+def claimable_items(evaluator):
+    """
+    Pending, unsold items without a lease, that `evaluator` neither sells nor already evaluated.
+    """
+    return (
+        Item.objects.filter(QUEUED, claimed_by__isnull=True)
+        .exclude(seller=evaluator)
+        .exclude(id__in=EvaluationRequest.objects.filter(evaluator=evaluator).values('item_id'))
+    )
+
+
+def reclaim_expired(now=None, evaluator=None):
+    """
+    Free every item whose lease has run out, and `evaluator`'s leases on items that left the
+    queue since they were claimed (sold, evaluated, taken back by the seller). Returns the
+    number of items freed.
+    """
+    now = now or timezone.now()
+    freed = Q(lease_expires_at__lt=now)
+    if evaluator is not None:
+        freed |= Q(claimed_by=evaluator) & ~QUEUED
+    return Item.objects.filter(freed).update(claimed_by=None, lease_expires_at=None)
+
+
+def claim(evaluator, limit=None, ordering='oldest'):
+    """
+    Top up `evaluator`'s leases to `limit` items and renew the ones they already hold.
+    Returns the evaluator's leased items (ready for ItemSerializer) and the lease expiry.
+    """
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=_config().get('LEASE_SECONDS', 900))
+    limit = get_page_size(limit)
+
+    reclaim_expired(now, evaluator)
+
+    # Renew what the evaluator already holds; only the remainder of the page is claimed
+    held = Item.objects.filter(QUEUED, claimed_by=evaluator).update(lease_expires_at=expires_at)
+
+    if held < limit:
+        candidates = claimable_items(evaluator).order_by(*ORDERINGS[ordering]).values('id')[:limit - held]
+        # The outer claimed_by filter makes the UPDATE skip items claimed by someone else meanwhile
+        Item.objects.filter(id__in=candidates, claimed_by__isnull=True).update(
+            claimed_by=evaluator,
+            lease_expires_at=expires_at,
+        )
+
+    items = Item.objects.for_serializer().filter(QUEUED, claimed_by=evaluator).order_by(*ORDERINGS[ordering])
+    return items, expires_at
+
+
+def release(evaluator, item_id):
+    """
+    Give up the lease on an item. Returns False if the evaluator held no lease on it.
+    """
+    return bool(
+        Item.objects.filter(id=item_id, claimed_by=evaluator).update(claimed_by=None, lease_expires_at=None)
+    )
@@ -1,16 +1,24 @@
 # evaluation/tests.py
 
-from django.urls import reverse
+from django.db import IntegrityError, connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth import get_user_model
 from item_management.models import Item
+from authentication import token_cache
+from sellegate_project import query_inspector
+from sellegate_project.testing import MarketplaceTestMixin
 from .models import EvaluationRequest, EvaluatorProfile
+from datetime import timedelta
 from decimal import Decimal
+from django.utils import timezone
 
 User = get_user_model()
 
-class EvaluationTests(APITestCase):
+class EvaluationTests(MarketplaceTestMixin, APITestCase):
 
     def setUp(self):
         # Create test users and items
@@ -154,12 +162,259 @@ class EvaluationTests(APITestCase):
         self.assertEqual(refreshed_item.delegation_state, 'Approved', "Item's delegation state was not updated correctly")
 
 
+    @override_settings(TOKEN_AUTH_CACHE={'ENABLED': False})  # Count the token lookup of every request
+    def test_accept_evaluation_query_count_does_not_grow(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.seller))
+
+        for bids in (1, 50):
+            item = Item.objects.create(
+                title='Popular Item',
+                description='Many evaluators want it',
+                price=Decimal('10.00'),
+                seller=self.seller,
+                delegation_state='Pending',
+                is_visible=True,
+            )
+            requests = [self._create_request(item, price=Decimal(20 + n)) for n in range(bids)]
+            chosen = requests[-1]
+
+            # token + request/item + approve + reject others + item update, plus the savepoint pair
+            with self.assertNumQueries(7):
+                response = self.client.patch(reverse('accept-evaluation', args=[chosen.id]), format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+            item.refresh_from_db()
+            self.assertEqual((item.price, item.evaluator_id, item.delegation_state), (chosen.price, self.evaluator.id, 'Approved'))
+            states = EvaluationRequest.objects.filter(item=item).values_list('state', flat=True)
+            self.assertEqual(sorted(states), ['Approved'] + ['Rejected'] * (bids - 1))
+
+    def test_accept_evaluation_only_once(self):
+        first = self._create_request(self.test_item)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.seller))
+        self.client.patch(reverse('accept-evaluation', args=[first.id]), format='json')
+
+        # A request sent after the approval can't be approved too
+        late = self._create_request(self.test_item)
+        response = self.client.patch(reverse('accept-evaluation', args=[late.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['error']['message'], 'An evaluation has already been approved for this item.')
+
+        # Rejected requests can't be accepted, and the database refuses a second approval outright
+        response = self.client.patch(reverse('reject-evaluation', args=[late.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.patch(reverse('accept-evaluation', args=[late.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            EvaluationRequest.objects.filter(id=late.id).update(state='Approved')
+
+    def test_reject_evaluation_states_and_messages(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.seller))
+        url = reverse('reject-evaluation', args=[999999])
+        response = self.client.patch(url, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(response.data['error']['message'], 'Assessment request not found.')
+
+        # Rejecting twice succeeds, as it always has
+        rejected = self._create_request(self.test_item)
+        for _ in range(2):
+            response = self.client.patch(reverse('reject-evaluation', args=[rejected.id]), format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        # An approved request was already applied to the item: rejecting it is refused
+        approved = self._create_request(self.test_item)
+        self.client.patch(reverse('accept-evaluation', args=[approved.id]), format='json')
+        response = self.client.patch(reverse('reject-evaluation', args=[approved.id]), format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        self.assertEqual(response.data['error']['message'], 'Evaluation request is already approved.')
+        approved.refresh_from_db()
+        self.assertEqual(approved.state, 'Approved')
+
+    @override_settings(TOKEN_AUTH_CACHE={'ENABLED': False})  # Count the token lookup of every request
+    def test_search_items_to_evaluate_query_count_does_not_grow(self):
+        # Authenticate as the evaluator
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        url = reverse('search-items-to-evaluate')
+
+        for size in (1, 10, 100):
+            while Item.objects.filter(delegation_state='Pending').count() < size:
+                Item.objects.create(
+                    title='Pending Item',
+                    description='Waiting for an evaluator',
+                    price=Decimal('20.00'),
+                    seller=self.seller,
+                    evaluator=self.evaluator,
+                    delegation_state='Pending',
+                    is_visible=True,
+                )
+
+            # Token lookup + exists() + one joined query for the items, whatever their number
+            with self.assertNumQueries(3):
+                response = self.client.get(url, format='json')
+
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(len(response.data['items']), size)
+
+    def test_evaluation_request_lists_stay_within_their_query_budget(self):
+        # (user, url name, query params)
+        endpoints = [
+            (self.evaluator, 'my-evaluations', {}),
+            (self.seller, 'product-evaluations', {'item_id': self.test_item.id}),
+        ]
+
+        counts = {}
+        for size in (1, 10, 100):
+            while EvaluationRequest.objects.count() < size:
+                self._create_request(self.test_item)
+
+            for user, name, params in endpoints:
+                with self.subTest(endpoint=name, size=size):
+                    self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(user))
+                    url = reverse(name)
+                    token_cache.local_store.clear()  # Count the token lookup every time
+
+                    # QueryInspectorMiddleware fails the request on an N+1 or over the budget
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertLessEqual(len(queries), query_inspector.get_query_budget(resolve(url).func))
+                    # The same number of queries for 1, 10 and 100 requests
+                    self.assertEqual(len(queries), counts.setdefault(name, len(queries)))
+
+    ### EVALUATION QUEUE TESTS ###
+
+    def test_evaluators_claim_disjoint_items(self):
+        other_evaluator = User.objects.create_user(
+            username='evaluator2',
+            email='evaluator2@example.com',
+            password='EvaluatorPass123',
+            is_evaluator=True
+        )
+        self._create_pending_items(3)  # 4 pending items with the one from setUp
+        url = reverse('claim-evaluation-queue')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        first = self.client.post(url, {'limit': 2}, format='json')
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(other_evaluator))
+        second = self.client.post(url, {'limit': 5}, format='json')
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        first_ids = {item['id'] for item in first.data['items']}
+        second_ids = {item['id'] for item in second.data['items']}
+        self.assertEqual(len(first_ids), 2)
+        self.assertEqual(len(second_ids), 2, "Leased items were handed out twice")
+        self.assertFalse(first_ids & second_ids)
+
+        # The oldest items go first; claiming again renews the same page
+        self.assertIn(self.test_item.id, first_ids)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        again = self.client.post(url, {'limit': 2}, format='json')
+        self.assertEqual({item['id'] for item in again.data['items']}, first_ids)
+
+    def test_expired_leases_are_reclaimed(self):
+        other_evaluator = User.objects.create_user(
+            username='evaluator2',
+            email='evaluator2@example.com',
+            password='EvaluatorPass123',
+            is_evaluator=True
+        )
+        Item.objects.filter(id=self.test_item.id).update(
+            claimed_by=other_evaluator,
+            lease_expires_at=timezone.now() - timedelta(seconds=1),
+        )
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        response = self.client.post(reverse('claim-evaluation-queue'), format='json')
+
+        self.assertEqual([item['id'] for item in response.data['items']], [self.test_item.id])
+        self.assertEqual(Item.objects.get(id=self.test_item.id).claimed_by, self.evaluator)
+
+    def test_release_and_evaluate_free_the_lease(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        self.client.post(reverse('claim-evaluation-queue'), format='json')
+
+        url = reverse('release-evaluation-queue-item', args=[self.test_item.id])
+        self.assertEqual(self.client.post(url, format='json').status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.post(url, format='json').status_code, status.HTTP_404_NOT_FOUND)
+
+        # Sending the evaluation hands the lease back too, and the item leaves the evaluator's queue
+        self.client.post(reverse('claim-evaluation-queue'), format='json')
+        self.client.post(reverse('new-evaluation'), {
+            'item_id': self.test_item.id,
+            'name': 'Evaluation',
+            'message': 'Looks good.',
+            'price': '60.00',
+        }, format='json')
+        self.assertIsNone(Item.objects.get(id=self.test_item.id).claimed_by)
+        response = self.client.post(reverse('claim-evaluation-queue'), format='json')
+        self.assertEqual(response.data['items'], [])
+
+    def test_items_leaving_the_queue_drop_their_lease(self):
+        buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='BuyerPass123')
+        self._create_pending_items(2)
+        url = reverse('claim-evaluation-queue')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        claimed = self.client.post(url, {'limit': 1}, format='json').data['items']
+        self.assertEqual([item['id'] for item in claimed], [self.test_item.id])
+
+        # Sold while leased: the lease goes with the sale and the next claim fills the page
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(buyer))
+        self.assertEqual(self.client.post(reverse('buy-item', args=[self.test_item.id])).status_code, status.HTTP_201_CREATED)
+        self.assertIsNone(Item.objects.get(id=self.test_item.id).claimed_by)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        claimed = self.client.post(url, {'limit': 1}, format='json').data['items']
+        self.assertEqual(len(claimed), 1)
+        self.assertNotEqual(claimed[0]['id'], self.test_item.id)
+
+        # Taken out of evaluation without going through the queue: dropped on the next claim
+        Item.objects.filter(id=claimed[0]['id']).update(delegation_state='Rejected')
+        again = self.client.post(url, {'limit': 1}, format='json').data['items']
+        self.assertEqual(len(again), 1)
+        self.assertNotIn(again[0]['id'], {self.test_item.id, claimed[0]['id']})
+        self.assertIsNone(Item.objects.get(id=claimed[0]['id']).claimed_by)
+
+    def test_claim_queue_requires_evaluator_and_valid_order(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.seller))
+        response = self.client.post(reverse('claim-evaluation-queue'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        response = self.client.post(reverse('claim-evaluation-queue'), {'order': 'random'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(TOKEN_AUTH_CACHE={'ENABLED': False})  # Count the token lookup of every request
+    def test_claim_queue_query_count_does_not_grow(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.evaluator))
+        url = reverse('claim-evaluation-queue')
+
+        for size in (1, 10, 100):
+            self._create_pending_items(size)
+            Item.objects.update(claimed_by=None, lease_expires_at=None)
+
+            # Token + reclaim + renew + claim + one joined query for the leased items
+            with self.assertNumQueries(5):
+                response = self.client.post(url, {'limit': size}, format='json')
+            self.assertEqual(len(response.data['items']), size)
+
     ### HELPER FUNCTIONS ###
 
-    def _get_user_token(self, user):
+    def _create_request(self, item, price=Decimal('55.00')):
+        """
+        Helper function to create a pending evaluation request from the evaluator.
+        """
+        return EvaluationRequest.objects.create(
+            item=item,
+            evaluator=self.evaluator,
+            name='Pending Evaluation',
+            message='This evaluation is pending.',
+            price=price,
+        )
+
+    def _create_pending_items(self, count):
         """
-        Helper function to retrieve or create a token for a given user.
+        Helper function to create pending items of the seller.
         """
-        from rest_framework.authtoken.models import Token
-        token, _ = Token.objects.get_or_create(user=user)
-        return token.key
+        for n in range(count):
+            self._create_item(f'Queued Item {n}', price=Decimal('20.00'), delegation_state='Pending')
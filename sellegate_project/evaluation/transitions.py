@@ -0,0 +1,124 @@
+# evaluation/transitions.py
+
+"""
+State transitions of evaluation requests.
+
+Every transition is a conditional UPDATE (`... WHERE state IN <allowed source states>`), so a
+request that another call changed meanwhile is never overwritten. Accepting a request runs in
+one transaction and costs the same number of queries however many requests the item has:
+
+    1. load the request with its item (ownership check)
+    2. approve it: UPDATE ... WHERE id = %s AND state = 'Pending'
+    3. reject every other pending request of the item with one UPDATE
+    4. copy price, evaluator and delegation state to the item (and drop its queue lease)
+       with one UPDATE
+
+The partial unique index `evalreq_one_approved_per_item` makes step 2 fail with an
+IntegrityError when another request of the item is already approved, so two concurrent
+accepts can't both succeed.
+"""
+
+from django.db import IntegrityError, transaction
+from rest_framework import status
+
+from item_management import cache as response_cache
+from item_management.models import Item
+from .models import EvaluationRequest
+
+PENDING, APPROVED, REJECTED = 'Pending', 'Approved', 'Rejected'
+
+# Target state -> states it can be reached from. Rejecting a rejected request again succeeds,
+# as it always has; an approved one is already applied to its item and can't be rejected
+ALLOWED_TRANSITIONS = {
+    APPROVED: {PENDING},
+    REJECTED: {PENDING, REJECTED},
+}
+
+# 404 message per action, as each endpoint has always reported it
+NOT_FOUND_MESSAGES = {
+    'accept': "Evaluation request not found.",
+    'reject': "Assessment request not found.",
+}
+
+
+class TransitionError(Exception):
+    """
+    A transition that can't be applied. `code` is the HTTP status to report.
+    """
+
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.message = message
+        self.code = code
+
+
+def get_for_owner(evaluation_id, user, action):
+    """
+    Load an evaluation request with its item, checking that `user` owns the item.
+    `action` ('accept', 'reject') is only used in the error message.
+    """
+    try:
+        evaluation = EvaluationRequest.objects.select_related('item').get(id=evaluation_id)
+    except EvaluationRequest.DoesNotExist:
+        raise TransitionError(NOT_FOUND_MESSAGES[action], status.HTTP_404_NOT_FOUND)
+
+    if evaluation.item.seller_id != user.id:
+        raise TransitionError(
+            f"You do not own this item. Only the item owner can {action} evaluations.",
+            status.HTTP_403_FORBIDDEN,
+        )
+    return evaluation
+
+
+def transition(evaluation, target):
+    """
+    Move one evaluation request to `target` with a conditional UPDATE.
+    """
+    allowed = ALLOWED_TRANSITIONS[target]
+
+    updated = 0
+    if evaluation.state in allowed:
+        updated = EvaluationRequest.objects.filter(id=evaluation.id, state__in=allowed).update(state=target)
+
+    if not updated:
+        # Not in an allowed state (possibly changed by a concurrent call); report the current one
+        current = EvaluationRequest.objects.filter(id=evaluation.id).values_list('state', flat=True).first()
+        raise TransitionError(f"Evaluation request is already {(current or evaluation.state).lower()}.", status.HTTP_409_CONFLICT)
+
+    evaluation.state = target
+
+
+def accept(evaluation_id, user):
+    """
+    Approve an evaluation request, reject the other pending requests of its item and apply
+    the evaluation (price, evaluator, delegation state) to the item, all in one transaction.
+    """
+    try:
+        with transaction.atomic():
+            evaluation = get_for_owner(evaluation_id, user, 'accept')
+            transition(evaluation, APPROVED)
+
+            EvaluationRequest.objects.filter(item_id=evaluation.item_id, state=PENDING).update(state=REJECTED)
+            Item.objects.filter(id=evaluation.item_id).update(
+                price=evaluation.price,
+                evaluator_id=evaluation.evaluator_id,
+                delegation_state=APPROVED,
+                claimed_by=None,  # Evaluated: no longer in the evaluation queue
+                lease_expires_at=None,
+            )
+    except IntegrityError:
+        # The partial unique index refused a second approved request for the item
+        raise TransitionError("An evaluation has already been approved for this item.", status.HTTP_409_CONFLICT)
+
+    # UPDATE skips the post_save signal, so invalidate the cached item responses here
+    response_cache.invalidate_items([evaluation.item_id])
+    return evaluation
+
+
+def reject(evaluation_id, user):
+    """
+    Reject a single pending (or already rejected) evaluation request.
+    """
+    evaluation = get_for_owner(evaluation_id, user, 'reject')
+    transition(evaluation, REJECTED)
+    return evaluation
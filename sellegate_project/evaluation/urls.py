@@ -5,7 +5,9 @@ from .views import (
     GetMyEvaluationsAPIView, 
     GetEvaluationRequestsOnMyProductAPIView,
     RejectEvaluationAPIView,
-    AcceptEvaluationAPIView)
+    AcceptEvaluationAPIView,
+    ClaimEvaluationQueueAPIView,
+    ReleaseEvaluationQueueItemAPIView)
 
 urlpatterns = [
 
@@ -22,6 +24,10 @@ urlpatterns = [
     path('<int:evaluation_id>/reject/', RejectEvaluationAPIView.as_view(), name='reject-evaluation'),
     path('<int:evaluation_id>/accept/', AcceptEvaluationAPIView.as_view(), name='accept-evaluation'),
 
+    # API endpoints of the leased evaluation queue (replaces the full pending list of 'items/')
+    path('queue/claim/', ClaimEvaluationQueueAPIView.as_view(), name='claim-evaluation-queue'),
+    path('queue/<int:item_id>/release/', ReleaseEvaluationQueueItemAPIView.as_view(), name='release-evaluation-queue-item'),
+
 
     # OLD \/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/\/
     # Define URL patterns here
@@ -11,9 +11,27 @@ from item_management.serializers import ItemSerializer
 
 from .models import EvaluationRequest, EvaluationRequest
 from .serializers import EvaluationRequestSerializer, EvaluationRequestSerializer
+from . import transitions
+from . import queue as evaluation_queue
 
 # Create your views here.
 
+
+def transition_error_response(error):
+    """
+    Error response for a refused state transition.
+    """
+    return Response(
+        {
+            "status": "error",
+            "error": {
+                "message": error.message,
+                "code": error.code,
+            },
+        },
+        status=error.code,
+    )
+
 class SendEvaluationRequestAPIView(APIView):
     """
     API endpoint for sending an evaluation request.
@@ -40,6 +58,9 @@ class SendEvaluationRequestAPIView(APIView):
             # Create a new evaluation request
             new_evaluation = serializer.save()
 
+            # The evaluator is done with the item, so hand their queue lease back
+            evaluation_queue.release(request.user, new_evaluation.item_id)
+
             return Response(
                 {
                     "message": "evaluation request created successfully.",
@@ -66,6 +87,7 @@ class GetMyEvaluationsAPIView(APIView):
     """
     API endpoint to retrieve evaluation requests created by the current evaluator.
     """
+    query_budget = 2  # Token, evaluation requests
     def get(self, request):
         # Check if the current user is an evaluator
         if not request.user.is_evaluator:
@@ -95,6 +117,7 @@ class GetEvaluationRequestsOnMyProductAPIView(APIView):
     API endpoint to retrieve all evaluation requests for a specific item owned by the current user.
     """
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can access
+    query_budget = 4  # Token, item, exists check, evaluation requests
     
     def get(self, request):
         """
@@ -119,7 +142,7 @@ class GetEvaluationRequestsOnMyProductAPIView(APIView):
         # Retrieve the item and check if it belongs to the current logged-in user
         try:
             item = Item.objects.get(id=item_id)
-            if item.seller != request.user:
+            if item.seller_id != request.user.id:
                 return Response(
                     {
                         "status": "error",
@@ -169,43 +192,16 @@ class GetEvaluationRequestsOnMyProductAPIView(APIView):
 
 class RejectEvaluationAPIView(APIView):
     """
-    API endpoint to reject an evaluation request.
+    API endpoint to reject an evaluation request. Approved requests can't be rejected (409 Conflict).
     """
     permission_classes = [IsAuthenticated]
 
     def patch(self, request, evaluation_id):
-        # Try to get the evaluation request, catching 404 if not found
+        # Conditionally move the request from 'Pending' (or 'Rejected') to 'Rejected' (see evaluation/transitions.py)
         try:
-            evaluation = EvaluationRequest.objects.get(id=evaluation_id)
-        except ObjectDoesNotExist:
-            return Response(
-                {
-                    "status": "error",
-                    "error": {
-                        "message": "Assessment request not found.",
-                        "code": 404,
-                    },
-                },
-                status=status.HTTP_404_NOT_FOUND,
-            )
-
-        # Ensure the current user owns the item associated with the evaluation
-        item = evaluation.item
-        if item.seller != request.user:
-            return Response(
-                {
-                    "status": "error",
-                    "error": {
-                        "message": "You do not own this item. Only the item owner can reject evaluations.",
-                        "code": status.HTTP_403_FORBIDDEN,
-                    },
-                },
-                status=status.HTTP_403_FORBIDDEN,
-            )
-
-        # Update the state to 'Rejected'
-        evaluation.state = 'Rejected'
-        evaluation.save()  # Save the change
+            transitions.reject(evaluation_id, request.user)
+        except transitions.TransitionError as error:
+            return transition_error_response(error)
 
         return Response(
             {
@@ -221,77 +217,123 @@ class AcceptEvaluationAPIView(APIView):
     reject other pending evaluation requests, and assign the evaluator to the item.
     """
     permission_classes = [IsAuthenticated]  # Only authenticated users can accept evaluations
+    query_budget = 7  # Token, request and item, approve, reject the others, item update, savepoint pair
 
     def patch(self, request, evaluation_id):
-        # Try to get the evaluation request, catching 404 if not found
+        # Approve the request, reject the other pending ones and update the item in one
+        # transaction, with a constant number of queries (see evaluation/transitions.py)
         try:
-            evaluation = EvaluationRequest.objects.get(id=evaluation_id)
-        except ObjectDoesNotExist:
-            return Response(
-                {
-                    "status": "error",
-                    "error": {
-                        "message": "Evaluation request not found.",
-                        "code": status.HTTP_404_NOT_FOUND,
-                    },
-                },
-                status=status.HTTP_404_NOT_FOUND,
-            )
+            transitions.accept(evaluation_id, request.user)
+        except transitions.TransitionError as error:
+            return transition_error_response(error)
+
+        return Response(
+            {
+                "message": "Evaluation request approved, item information updated, and other pending requests rejected.",
+            },
+            status=status.HTTP_200_OK,
+        )
 
-        # Ensure the current user owns the item associated with the evaluation
-        item = evaluation.item
-        if item.seller != request.user:
+class ClaimEvaluationQueueAPIView(APIView):
+    """
+    API endpoint handing the current evaluator a page of pending items to evaluate, each
+    leased to them for EVALUATION_QUEUE['LEASE_SECONDS'] (see evaluation/queue.py).
+    """
+    permission_classes = [IsAuthenticated]
+    query_budget = 5  # Token, reclaim, renew, claim, leased items
+
+    def post(self, request):
+        """
+        ### Claiming Items to Evaluate with Postman
+
+        1. **Set the HTTP Method to POST**:
+        - Select `POST` from the method dropdown.
+
+        2. **Enter the Endpoint URL**:
+        - Use the endpoint for the evaluation queue. Example: `http://localhost:8000/evaluation/queue/claim/`.
+
+        3. **Set the Headers**:
+        - Add the `Authorization` header with your token:
+            - `Authorization`: `Token <your_token_here>`  # Replace with your token
+
+        4. **Set the Request Body** (optional):
+            - `limit`: `20`  # Number of items to hold, capped at EVALUATION_QUEUE['MAX_PAGE_SIZE']
+            - `order`: `oldest` (default, items waiting the longest first) or `price` (most valuable first)
+
+        5. **Send the Request**:
+        - If successful, you'll receive a `200 OK` response with the items leased to you and `lease_expires_at`.
+        - Calling it again renews your leases and tops your page up to `limit` items.
+        - No other evaluator is handed these items until the lease expires or you release them.
+        - Sending an evaluation request for an item releases its lease.
+
+        6. **Common Error Responses**:
+        - **400 Bad Request**: If `order` is invalid.
+        - **403 Forbidden**: If the current user is not an evaluator.
+        """
+        if not request.user.is_evaluator:
             return Response(
                 {
                     "status": "error",
                     "error": {
-                        "message": "You do not own this item. Only the item owner can accept evaluations.",
+                        "message": "Only evaluators can claim items to evaluate.",
                         "code": status.HTTP_403_FORBIDDEN,
                     },
                 },
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        # Check if there is already an approved evaluation request for this item
-        if EvaluationRequest.objects.filter(item=item, state='Approved').exists():
+        ordering = request.data.get('order', 'oldest')
+        if ordering not in evaluation_queue.ORDERINGS:
             return Response(
                 {
                     "status": "error",
                     "error": {
-                        "message": "An evaluation has already been approved for this item.",
-                        "code": status.HTTP_409_CONFLICT,
+                        "message": f"Invalid order. Choose one of: {', '.join(evaluation_queue.ORDERINGS)}.",
+                        "code": status.HTTP_400_BAD_REQUEST,
                     },
                 },
-                status=status.HTTP_409_CONFLICT,
+                status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Update the item based on the approved evaluation request
-        item.price = evaluation.price  # Update the price with the approved evaluation's price
-        item.delegation_state = 'Approved'  # Set delegation state to 'Approved'
-        item.evaluator = evaluation.evaluator  # Assign the evaluator to the item
-        item.save()  # Save the item
-
-        # Reject other pending evaluation requests for the same item
-        other_pending_requests = EvaluationRequest.objects.filter(item=item, state='Pending')
-        for pending_request in other_pending_requests:
-            if pending_request != evaluation:
-                pending_request.state = 'Rejected'
-                pending_request.save()
-
-        # Approve the evaluation request and save
-        evaluation.state = 'Approved'
-        evaluation.save()
+        items, lease_expires_at = evaluation_queue.claim(request.user, request.data.get('limit'), ordering)
+        serializer = ItemSerializer(items, many=True)
 
         return Response(
             {
-                "message": "Evaluation request approved, item information updated, and other pending requests rejected.",
+                "message": f"{len(serializer.data)} items leased for evaluation.",
+                "lease_expires_at": lease_expires_at,
+                "items": serializer.data,
             },
             status=status.HTTP_200_OK,
         )
 
+
+class ReleaseEvaluationQueueItemAPIView(APIView):
+    """
+    API endpoint giving an item leased through the evaluation queue back to the queue.
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request, item_id):
+        # Single conditional UPDATE: only the lease holder can release it
+        if not evaluation_queue.release(request.user, item_id):
+            return Response(
+                {
+                    "status": "error",
+                    "error": {
+                        "message": "You do not hold a lease on this item.",
+                        "code": status.HTTP_404_NOT_FOUND,
+                    },
+                },
+                status=status.HTTP_404_NOT_FOUND,
+            )
+
+        return Response({"message": "Item released back to the evaluation queue."}, status=status.HTTP_200_OK)
+
 # OLD \/\/\/\/\/\/\/\/\/\/
 
 class SearchItemsToEvaluateAPIView(APIView):
+    query_budget = 3  # Token, exists check, items
     def get(self, request):
         """
         Get a list of items that are pending evaluation.
@@ -320,7 +362,7 @@ class SearchItemsToEvaluateAPIView(APIView):
 
         """
         # Fetch items with delegation_state 'Pending'
-        items = Item.objects.filter(delegation_state='Pending')
+        items = Item.objects.for_serializer().filter(delegation_state='Pending')
 
         if not items.exists():
             # If no items are pending evaluation, return a suitable response
@@ -7,6 +7,8 @@ from .models import Item, Purchase, Bid, Payment
 class ItemAdmin(admin.ModelAdmin):
     list_display = ('id', 'title', 'price', 'seller', 'evaluator', 'delegation_state', 'created_at', 'is_sold', 'is_visible')
     list_filter = ('delegation_state', 'seller', 'is_sold', 'is_visible')
+    list_select_related = ('seller', 'evaluator')  # Shown in the list; evaluator is nullable, so not joined by default
+    raw_id_fields = ('seller', 'evaluator')  # Id inputs instead of a <select> of every user
     search_fields = ('title', 'description', 'seller__username')
     readonly_fields = ('id', 'created_at')  # `created_at` is read-only, set by the system
     
@@ -35,6 +37,8 @@ class PaymentAdmin(admin.ModelAdmin):
     Admin configuration for the Payment model.
     """
     list_display = ['id', 'item', 'buyer', 'total_price', 'created_at']  # Fields to display
+    list_select_related = ['item', 'buyer']  # Join the item and buyer shown on every row
+    raw_id_fields = ['item', 'buyer']  # Id inputs instead of a <select> of every item and user
     list_filter = ['created_at']  # Filter by creation date
     search_fields = ['item__title', 'buyer__username']  # Search by item title or buyer username
     readonly_fields = ['created_at', 'total_price']  # Fields that are read-only
@@ -0,0 +1,176 @@
+# item_management/cache.py
+
+"""
+Versioned response cache for the public (AllowAny) item read endpoints.
+
+Cached responses are keyed by endpoint, normalized query parameters and a version number:
+
+    - list endpoints (all items, search) use the global catalog version
+    - the item detail endpoint uses that item's own version
+
+Instead of deleting entries, writers bump the versions (Item post_save/post_delete, seller or
+evaluator username changes, and the bulk UPDATE paths that bypass signals call
+`invalidate_items()` directly). Old entries simply become unreachable and expire on their own,
+so invalidation is O(1) and works the same on every Django cache backend, including the
+local-memory and file-based ones.
+"""
+
+import hashlib
+import threading
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from rest_framework.response import Response
+
+CATALOG_VERSION_KEY = 'items:version:catalog'
+ITEM_VERSION_KEY = 'items:version:item:{}'
+RESPONSE_KEY = 'items:response:{endpoint}:{version}:{params}'
+
+
+class CacheStats:
+    """
+    Per-process hit/miss counters, used to size the cache.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.stores = 0
+            self.invalidations = 0
+
+    def record(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def as_dict(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / lookups, 4) if lookups else None,
+                'stores': self.stores,
+                'invalidations': self.invalidations,
+            }
+
+
+stats = CacheStats()
+
+
+def _config():
+    return getattr(settings, 'ITEM_RESPONSE_CACHE', {})
+
+
+def is_enabled():
+    return _config().get('ENABLED', True)
+
+
+def get_cache():
+    return caches[_config().get('ALIAS', 'default')]
+
+
+def _new_version():
+    # Versions start from a fresh, never-reused value: if a version key is evicted, responses
+    # cached under the old value can never be served again
+    return time.time_ns()
+
+
+def _get_version(cache, key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_version(), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_versions(item_ids):
+    cache = get_cache()
+    for key in [CATALOG_VERSION_KEY] + [ITEM_VERSION_KEY.format(item_id) for item_id in item_ids]:
+        try:
+            cache.incr(key)
+        except ValueError:
+            # Not set (or evicted); any new value orphans the old entries
+            cache.set(key, _new_version(), timeout=None)
+    stats.record('invalidations')
+
+
+def invalidate_items(item_ids):
+    """
+    Invalidate the catalog listings and the detail responses of the given items.
+
+    Inside a transaction the versions are bumped right away and again on commit, so a reader
+    that cached the pre-commit rows in between cannot keep serving them.
+    """
+    item_ids = list(item_ids)
+    _bump_versions(item_ids)
+    if connection.in_atomic_block:
+        transaction.on_commit(lambda: _bump_versions(item_ids))
+
+
+def normalize_params(query_params):
+    """
+    Return a short, order-independent digest of the query parameters (empty values dropped).
+    """
+    pairs = sorted(
+        (key, value)
+        for key in query_params
+        for value in query_params.getlist(key)
+        if value != ''
+    )
+    return hashlib.sha1(urlencode(pairs).encode('utf-8')).hexdigest()
+
+
+class CachedResponseMixin:
+    """
+    View mixin caching successful GET responses (data, status and headers) per endpoint.
+
+    Set `cache_endpoint` to a unique name. Set `cache_item_kwarg` to the URL kwarg holding the
+    item id to version responses per item instead of per catalog. Only use it on endpoints
+    whose response does not depend on the requesting user.
+    """
+    cache_endpoint = None
+    cache_item_kwarg = None
+
+    def get_response_cache_key(self, request, cache):
+        if self.cache_item_kwarg:
+            version_key = ITEM_VERSION_KEY.format(self.kwargs.get(self.cache_item_kwarg))
+        else:
+            version_key = CATALOG_VERSION_KEY
+
+        # The version is read before the database is queried, so a concurrent write can only
+        # orphan what we store, never hide behind it
+        return RESPONSE_KEY.format(
+            endpoint=self.cache_endpoint,
+            version=_get_version(cache, version_key),
+            params=normalize_params(request.query_params),
+        )
+
+    def get(self, request, *args, **kwargs):
+        if not is_enabled():
+            return super().get(request, *args, **kwargs)
+
+        cache = get_cache()
+        key = self.get_response_cache_key(request, cache)
+
+        cached = cache.get(key)
+        if cached is not None:
+            stats.record('hits')
+            status_code, data, headers = cached
+            return Response(data, status=status_code, headers=headers)
+
+        stats.record('misses')
+        response = super().get(request, *args, **kwargs)
+
+        if response.status_code == 200:
+            cache.set(key, (response.status_code, response.data, dict(response.items())), _config().get('TIMEOUT', 300))
+            stats.record('stores')
+
+        return response
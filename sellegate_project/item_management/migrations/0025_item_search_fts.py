@@ -0,0 +1,52 @@
+# Creates the FTS5 full-text index used by item_management/search.py
+
+from django.conf import settings
+from django.db import migrations
+
+# The DDL is spelled out here rather than imported from item_management.search, so this
+# migration keeps creating the same table whatever that module becomes
+CREATE_INDEX = """
+    CREATE VIRTUAL TABLE item_management_item_fts USING fts5(
+        title,
+        description,
+        seller_name,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+"""
+
+FILL_INDEX = """
+    INSERT INTO item_management_item_fts (rowid, title, description, seller_name)
+    SELECT item.id, item.title, item.description, seller.username
+    FROM item_management_item AS item
+    JOIN authentication_user AS seller ON seller.id = item.seller_id
+"""
+
+DROP_INDEX = 'DROP TABLE IF EXISTS item_management_item_fts'
+
+
+def create_search_index(apps, schema_editor):
+    engine = getattr(settings, 'ITEM_SEARCH', {}).get('ENGINE', 'fts5')
+    if engine != 'fts5' or schema_editor.connection.vendor != 'sqlite':
+        return  # Search falls back to icontains on other databases
+
+    schema_editor.execute(DROP_INDEX)
+    schema_editor.execute(CREATE_INDEX)
+    schema_editor.execute(FILL_INDEX)  # Index the items that already exist
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute(DROP_INDEX)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('authentication', '0004_alter_user_username'),
+        ('item_management', '0024_item_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
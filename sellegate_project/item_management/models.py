@@ -2,11 +2,50 @@
 
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
 from django.utils import timezone  # Import timezone for automatic timestamp
 # from authentication.models import User
 
 User = get_user_model() # instead imported user model
 
+
+class ItemQuerySet(models.QuerySet):
+    # Item columns read by ItemSerializer
+    SERIALIZED_FIELDS = (
+        'id', 'title', 'description', 'price', 'thumbnail_url', 'seller_id', 'evaluator_id',
+        'delegation_state', 'created_at', 'is_visible', 'is_sold',
+    )
+
+    def for_serializer(self):
+        """
+        Fetch items ready for ItemSerializer in a single query: the seller and evaluator are
+        joined in, and only their usernames are loaded (no passwords, emails, ...).
+        Use this for every read path that serializes items; it is not meant for instances
+        that are going to be modified and saved.
+        """
+        return self.select_related('seller', 'evaluator').only(
+            *self.SERIALIZED_FIELDS,
+            'seller__username',
+            'evaluator__username',
+        )
+
+    def available_to(self, buyer):
+        """
+        Items `buyer` may purchase: unsold, visible and not their own.
+        """
+        return self.filter(is_sold=False, is_visible=True).exclude(seller=buyer)
+
+    def mark_sold(self):
+        """
+        Mark the items sold (and hide them) in a single UPDATE and return the number of rows
+        changed. Chained after available_to(), the availability check is part of the UPDATE's
+        WHERE clause, so two concurrent buyers can never both claim the same item. A sold item
+        leaves the evaluation queue, so its lease is dropped too.
+        """
+        return self.update(is_sold=True, is_visible=False, claimed_by=None, lease_expires_at=None)
+
+
 class Item(models.Model):
     title = models.CharField(max_length=255)
     description = models.TextField(blank=False)
@@ -32,6 +71,31 @@ class Item(models.Model):
     is_visible = models.BooleanField(blank=False, null=False)  # Required, no default DOESNT WANT TO BE ENFORCED, JUST ENFORE IN FRONT-END
     is_sold = models.BooleanField(default=False)  # Indicates whether the item is sold
 
+    # Evaluation queue lease (see evaluation/queue.py): the evaluator currently working on the
+    # item and when that lease runs out. Expired leases are found through the index.
+    claimed_by = models.ForeignKey(
+        User, null=True, blank=True, on_delete=models.SET_NULL, related_name="claimed_items"
+    )
+    lease_expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+
+    objects = ItemQuerySet.as_manager()  # Adds Item.objects.for_serializer()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination walks items in (created_at, id) order
+            models.Index(fields=['created_at', 'id'], name='item_created_id_idx'),
+            # Explore lists unsold items in (created_at, id) order. Partial, because Django
+            # compiles is_sold=False to `NOT is_sold`, which a plain index on is_sold can't serve;
+            # seller_id makes it covering for the "not mine" filter and the count
+            models.Index(
+                fields=['created_at', 'id', 'seller_id'],
+                condition=models.Q(is_sold=False),
+                name='item_unsold_created_idx',
+            ),
+            # Evaluators list items with delegation_state='Pending'
+            models.Index(fields=['delegation_state', 'created_at'], name='item_delegation_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
     # Other fields for item details like condition, category, etc.
@@ -94,3 +158,59 @@ class Bid(models.Model):
     item = models.ForeignKey(Item, on_delete=models.CASCADE)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     # Other fields for bid details
+
+
+# Signals keeping the full-text search index (item_management/search.py) in sync
+SEARCH_INDEXED_FIELDS = {'title', 'description', 'seller', 'seller_id'}
+
+@receiver(post_save, sender=Item)
+def index_item_for_search(sender, instance, using, update_fields=None, **kwargs):
+    from . import search
+
+    if not search.is_enabled(using):
+        return
+
+    # Saves that only touch non-indexed columns (price, is_sold, ...) leave the index alone
+    if update_fields is not None and not SEARCH_INDEXED_FIELDS.intersection(update_fields):
+        return
+
+    search.index_item(instance.pk, using=using)
+
+@receiver(post_delete, sender=Item)
+def remove_item_from_search(sender, instance, using, **kwargs):
+    from . import search
+
+    if search.is_enabled(using):
+        search.remove_item(instance.pk, using=using)
+
+@receiver(post_save, sender=User)
+def update_seller_name_in_search(sender, instance, created, using, **kwargs):
+    from . import search
+
+    # A new user has no items yet; an unchanged username needs no reindexing
+    if created or not instance.username_changed() or not search.is_enabled(using):
+        return
+
+    search.update_seller_name(instance.pk, instance.username, using=using)
+
+
+# Signals invalidating the public item response cache (item_management/cache.py)
+@receiver(post_save, sender=Item)
+@receiver(post_delete, sender=Item)
+def invalidate_item_responses(sender, instance, **kwargs):
+    from . import cache
+
+    cache.invalidate_items([instance.pk])
+
+@receiver(post_save, sender=User)
+def invalidate_user_item_responses(sender, instance, created, **kwargs):
+    from . import cache
+
+    # seller_name and evaluator_name are embedded in the cached item responses
+    if created or not instance.username_changed():
+        return
+
+    item_ids = Item.objects.filter(
+        models.Q(seller=instance) | models.Q(evaluator=instance)
+    ).values_list('id', flat=True)
+    cache.invalidate_items(item_ids)
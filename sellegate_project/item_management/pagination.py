@@ -0,0 +1,236 @@
+# item_management/pagination.py
+
+import base64
+import binascii
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from rest_framework import status
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class ItemKeysetPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over items ordered by (created_at, id).
+
+    Every page is fetched with `WHERE (created_at, id) > cursor ORDER BY created_at, id LIMIT n`,
+    so a page costs the same at any depth (no OFFSET). The response body stays a plain list,
+    exactly like the unpaginated endpoints; navigation is returned in headers instead:
+
+        Link: <...?cursor=abc>; rel="next", <...?cursor=def>; rel="prev"
+        X-Next-Cursor / X-Prev-Cursor: the raw opaque cursors
+        X-Total-Count: total number of matches (only when `?include_count=true`)
+
+    Query parameters:
+        - `cursor`: opaque cursor taken from a previous response
+        - `page_size`: number of items per page, capped at ITEM_PAGINATION['MAX_PAGE_SIZE']
+        - `include_count`: set to `true` to receive the X-Total-Count header (costs a COUNT query)
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    count_query_param = 'include_count'
+    ordering = ('created_at', 'id')  # Must be unique as a whole; `id` breaks ties
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+
+        # Decode the cursor, if any (raises a 404 for tampered or malformed cursors)
+        position, reverse = self.decode_cursor(request)
+
+        self.total_count = None
+        if request.query_params.get(self.count_query_param, '').lower() in ('1', 'true', 'yes'):
+            self.total_count = queryset.count()
+
+        if reverse:
+            # Walk backwards from the cursor, then flip the page back into ascending order
+            queryset = queryset.order_by(*['-' + field for field in self.ordering])
+            if position is not None:
+                queryset = queryset.filter(self._before(position))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+            if position is not None:
+                queryset = queryset.filter(self._after(position))
+
+        # Fetch one extra row to know whether there is another page in this direction
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+
+        if reverse:
+            results.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = results
+        return results
+
+    def get_paginated_response(self, data):
+        headers = {}
+        links = []
+
+        next_cursor = self.get_next_cursor()
+        if next_cursor:
+            headers['X-Next-Cursor'] = next_cursor
+            links.append(f'<{replace_query_param(self.base_url, self.cursor_query_param, next_cursor)}>; rel="next"')
+
+        prev_cursor = self.get_previous_cursor()
+        if prev_cursor:
+            headers['X-Prev-Cursor'] = prev_cursor
+            links.append(f'<{replace_query_param(self.base_url, self.cursor_query_param, prev_cursor)}>; rel="prev"')
+        elif self.has_previous:
+            # Walked past the start of the listing; the first page has no cursor
+            links.append(f'<{remove_query_param(self.base_url, self.cursor_query_param)}>; rel="prev"')
+
+        if links:
+            headers['Link'] = ', '.join(links)
+
+        if self.total_count is not None:
+            headers['X-Total-Count'] = str(self.total_count)
+
+        return Response(data, headers=headers)
+
+    def get_page_size(self, request):
+        """
+        Return the requested page size, falling back to the default and capped at the maximum.
+        """
+        config = getattr(settings, 'ITEM_PAGINATION', {})
+        default_size = config.get('PAGE_SIZE', 50)
+        max_size = config.get('MAX_PAGE_SIZE', 200)
+
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return default_size
+
+        if size <= 0:
+            return default_size
+        return min(size, max_size)
+
+    # Cursor helpers
+
+    def get_next_cursor(self):
+        if self.has_next and self.page:
+            return self.encode_cursor(self.page[-1], reverse=False)
+        return None
+
+    def get_previous_cursor(self):
+        if self.has_previous and self.page:
+            return self.encode_cursor(self.page[0], reverse=True)
+        return None
+
+    def _after(self, position):
+        created_at, pk = position
+        return Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk)
+
+    def _before(self, position):
+        created_at, pk = position
+        return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk)
+
+    def encode_cursor(self, item, reverse):
+        """
+        Build an opaque cursor pointing at `item`. `reverse` marks a "previous page" cursor.
+        """
+        raw = f"{'p' if reverse else 'n'}|{item.created_at.isoformat()}|{item.id}"
+        return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        """
+        Return `((created_at, id), reverse)` for the request's cursor, or `(None, False)` if absent.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            direction, created_at, pk = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+            if direction not in ('n', 'p'):
+                raise ValueError(direction)
+            position = (datetime.fromisoformat(created_at), int(pk))
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise _invalid_cursor()
+
+        return position, direction == 'p'
+
+
+class ItemSearchPagination(ItemKeysetPagination):
+    """
+    Pagination of search results, best match first or in the requested `ordering`.
+
+    Same parameters and headers as ItemKeysetPagination, except `include_count`. Relevance is
+    not a column a keyset can seek to, so the cursor holds an offset: each page is one ranked
+    query with `LIMIT n OFFSET m`, and a search never ranks more than ITEM_SEARCH['MAX_RESULTS']
+    hits, which bounds the offset. `queryset` is anything sliceable: a QuerySet (ordered by
+    `id` last, so pages neither repeat nor skip items) or search.RankedItems.
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.offset = self.decode_cursor(request)
+        self.total_count = None
+
+        if isinstance(queryset, QuerySet):
+            queryset = queryset.order_by(*queryset.query.order_by, 'id')
+
+        # Fetch one extra row to know whether there is another page
+        results = list(queryset[self.offset:self.offset + self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.has_previous = self.offset > 0
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_next_cursor(self):
+        if self.has_next:
+            return self.encode_offset(self.offset + self.page_size)
+        return None
+
+    def get_previous_cursor(self):
+        if self.offset > self.page_size:
+            return self.encode_offset(self.offset - self.page_size)
+        return None  # The previous page is the first one, which has no cursor
+
+    def encode_offset(self, offset):
+        return base64.urlsafe_b64encode(f'o|{offset}'.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, request):
+        """
+        Return the offset of the request's cursor, or 0 if absent.
+        """
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return 0
+
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            kind, offset = base64.urlsafe_b64decode(padded).decode('utf-8').split('|')
+            offset = int(offset)
+            if kind != 'o' or offset < 0:
+                raise ValueError(kind)
+        except (TypeError, ValueError, UnicodeDecodeError, binascii.Error):
+            raise _invalid_cursor()
+
+        return offset
+
+
+def _invalid_cursor():
+    return NotFound(
+        {
+            "status": "error",
+            "error": {
+                "message": "Invalid cursor",
+                "code": status.HTTP_404_NOT_FOUND,
+                "details": {},
+            },
+        }
+    )
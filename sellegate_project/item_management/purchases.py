@@ -0,0 +1,55 @@
+# item_management/purchases.py
+
+"""
+Race-free purchases.
+
+An item is claimed with one conditional UPDATE (`... SET is_sold = true WHERE id = %s AND
+NOT is_sold AND is_visible AND seller_id <> buyer`) inside the same transaction that creates
+the Payment. The database applies the WHERE clause atomically, so exactly one concurrent buyer
+gets an updated row count of 1 and every other one gets 0, without any explicit lock.
+"""
+
+from django.db import transaction
+
+from . import cache as response_cache
+from .models import Item, Payment
+
+
+def buy_item(item_id, buyer):
+    """
+    Buy one item for `buyer`. Returns the new Payment, or None if the item could not be
+    claimed (missing, sold, hidden or owned by the buyer; see `rejection_reason()`).
+    """
+    with transaction.atomic():
+        claimed = Item.objects.filter(id=item_id).available_to(buyer).mark_sold()
+        if not claimed:
+            return None
+
+        # The row is ours now (and write-locked until commit), so its price can't change under us
+        item = Item.objects.get(id=item_id)
+        payment = Payment.objects.create(item=item, buyer=buyer, total_price=item.price)
+
+    # UPDATE skips the post_save signal, so invalidate the cached item responses here
+    response_cache.invalidate_items([item_id])
+    return payment
+
+
+def is_available_to(item, buyer):
+    """
+    In-memory version of ItemQuerySet.available_to(), for items that are already loaded.
+    """
+    return not item.is_sold and item.is_visible and item.seller_id != buyer.id
+
+
+def rejection_reason(item, buyer):
+    """
+    Explain why `buyer` can't buy `item` (checked in the order the API always reported them).
+    """
+    if item.is_sold:
+        return "Item is already sold."
+    if not item.is_visible:
+        return "Item is not visible. Revise code."
+    if item.seller_id == buyer.id:
+        return "You cannot buy your own item."
+    # Available again by now; only possible if it was sold and then relisted meanwhile
+    return "Item is already sold."
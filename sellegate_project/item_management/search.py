@@ -0,0 +1,238 @@
+# item_management/search.py
+
+"""
+Full-text search over items, backed by an SQLite FTS5 virtual table.
+
+The index holds one row per item (rowid = item id) with the item's title, description and
+the seller's username. It is kept in sync by the Item/User signal receivers in models.py and
+can be rebuilt from scratch with `python manage.py rebuild_search_index`.
+
+On databases other than SQLite (or when ITEM_SEARCH['ENGINE'] is not 'fts5') `is_enabled()`
+returns False and callers fall back to plain `icontains` filtering, as they do for queries
+without any word to look up.
+"""
+
+import html
+import re
+from collections import OrderedDict, namedtuple
+
+from django.conf import settings
+from django.db import connections
+
+from .models import Item, User
+
+FTS_TABLE = 'item_management_item_fts'
+
+# Column weights for bm25(): a hit in the title counts far more than one in the description
+BM25_WEIGHTS = (10.0, 1.0, 2.0)  # title, description, seller_name
+
+# Private-use markers wrapped around matches, swapped for <mark> tags after HTML-escaping
+_MATCH_START, _MATCH_END = '\x02', '\x03'
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+SearchHit = namedtuple('SearchHit', ['score', 'snippet'])
+
+
+def is_enabled(using='default'):
+    """
+    Return True if full-text search is configured and available on the given database.
+    """
+    engine = getattr(settings, 'ITEM_SEARCH', {}).get('ENGINE', 'fts5')
+    return engine == 'fts5' and connections[using].vendor == 'sqlite'
+
+
+def create_index(using='default', drop=False):
+    """
+    Create the FTS5 table (optionally dropping the existing one first).
+    """
+    with connections[using].cursor() as cursor:
+        if drop:
+            cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+        cursor.execute(
+            f"""
+            CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+                title,
+                description,
+                seller_name,
+                tokenize = 'unicode61 remove_diacritics 2',
+                prefix = '2 3'
+            )
+            """
+        )
+
+
+def drop_index(using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DROP TABLE IF EXISTS {FTS_TABLE}')
+
+
+def _insert_select_sql(where):
+    """
+    INSERT ... SELECT pulling rows straight from the item and user tables, so indexing never
+    needs the seller instance to be loaded in Python.
+    """
+    item_table = Item._meta.db_table
+    user_table = User._meta.db_table
+    return (
+        f'INSERT INTO {FTS_TABLE} (rowid, title, description, seller_name) '
+        f'SELECT item.id, item.title, item.description, seller.username '
+        f'FROM {item_table} AS item JOIN {user_table} AS seller ON seller.id = item.seller_id '
+        f'WHERE {where}'
+    )
+
+
+def index_item(item_id, using='default'):
+    """
+    (Re)index a single item.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [item_id])
+        cursor.execute(_insert_select_sql('item.id = %s'), [item_id])
+
+
+def index_item_range(first_id, last_id, using='default'):
+    """
+    Index every item whose id is between `first_id` and `last_id` (inclusive).
+    Assumes those rows are not in the index yet (used by the rebuild command).
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(_insert_select_sql('item.id BETWEEN %s AND %s'), [first_id, last_id])
+
+
+def remove_item(item_id, using='default'):
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [item_id])
+
+
+def update_seller_name(user_id, username, using='default'):
+    """
+    Rewrite the seller_name column for all items of a user after a username change.
+    """
+    item_table = Item._meta.db_table
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'UPDATE {FTS_TABLE} SET seller_name = %s '
+            f'WHERE rowid IN (SELECT id FROM {item_table} WHERE seller_id = %s)',
+            [username, user_id],
+        )
+
+
+def optimize_index(using='default'):
+    """
+    Merge the index b-trees; worth running after a bulk rebuild.
+    """
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+
+def build_match_expression(query):
+    """
+    Turn free user input into a safe FTS5 MATCH expression.
+
+    Every word becomes a quoted prefix query and all words must match, so "lap pro" finds
+    "Laptop Professional". Returns None when the input contains no searchable words.
+    """
+    tokens = _TOKEN_RE.findall(query or '')
+    if not tokens:
+        return None
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def _highlight(raw_snippet):
+    # Escape the text first so titles/descriptions can never inject markup, then add the tags
+    escaped = html.escape(raw_snippet or '')
+    return escaped.replace(_MATCH_START, '<mark>').replace(_MATCH_END, '</mark>')
+
+
+def get_max_results():
+    return getattr(settings, 'ITEM_SEARCH', {}).get('MAX_RESULTS', 200)
+
+
+def search_items(query, min_price=None, max_price=None, limit=None, offset=0, item_ids=None, using='default'):
+    """
+    Run a ranked full-text search.
+
+    Returns an OrderedDict of item id -> SearchHit(score, snippet), best match first.
+    `score` is the negated BM25 rank (higher is better) and `snippet` is an HTML-escaped
+    excerpt with the matched words wrapped in <mark> tags. Price bounds are applied inside
+    the same query so the result limit never cuts off matching items. `limit` and `offset`
+    select a page of the ranking; `item_ids` restricts the search to those items.
+    """
+    match = build_match_expression(query)
+    if match is None:
+        return OrderedDict()
+
+    if limit is None:
+        limit = get_max_results()
+
+    item_table = Item._meta.db_table
+    weights = ', '.join(str(weight) for weight in BM25_WEIGHTS)
+    sql = (
+        f'SELECT {FTS_TABLE}.rowid, bm25({FTS_TABLE}, {weights}) AS rank, '
+        f"snippet({FTS_TABLE}, -1, '{_MATCH_START}', '{_MATCH_END}', '…', 16) "
+        f'FROM {FTS_TABLE} JOIN {item_table} AS item ON item.id = {FTS_TABLE}.rowid '
+        f'WHERE {FTS_TABLE} MATCH %s'
+    )
+    params = [match]
+
+    if min_price is not None:
+        sql += ' AND item.price >= %s'
+        params.append(min_price)
+    if max_price is not None:
+        sql += ' AND item.price <= %s'
+        params.append(max_price)
+    if item_ids is not None:
+        sql += f' AND item.id IN ({", ".join(["%s"] * len(item_ids)) or "NULL"})'
+        params.extend(item_ids)
+
+    sql += ' ORDER BY rank LIMIT %s OFFSET %s'
+    params.extend([limit, offset])
+
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+
+    return OrderedDict(
+        (item_id, SearchHit(score=-rank, snippet=_highlight(snippet)))
+        for item_id, rank, snippet in rows
+    )
+
+
+def match_subquery(query):
+    """
+    `(sql, params)` selecting the ids of the items matching `query`, for `id__in=RawSQL(...)`,
+    or None when the input contains no searchable words.
+    """
+    match = build_match_expression(query)
+    if match is None:
+        return None
+    return f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match]
+
+
+class RankedItems:
+    """
+    Items matching a search, best match first, for pagination: slicing runs one ranked query
+    with LIMIT/OFFSET (never past ITEM_SEARCH['MAX_RESULTS']) and loads just those items from
+    `queryset`. `hits` collects the score and snippet of every item fetched.
+    """
+
+    def __init__(self, queryset, query, min_price=None, max_price=None):
+        self.queryset = queryset
+        self.query = query
+        self.min_price = min_price
+        self.max_price = max_price
+        self.hits = OrderedDict()
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice):
+            raise TypeError('RankedItems only supports slicing')
+        start = index.start or 0
+        stop = min(index.stop, get_max_results())
+        if stop <= start:
+            return []
+
+        hits = search_items(self.query, self.min_price, self.max_price, limit=stop - start, offset=start)
+        self.hits.update(hits)
+        items = self.queryset.in_bulk(list(hits))
+        return [items[item_id] for item_id in hits if item_id in items]
@@ -57,6 +57,45 @@ class ItemSerializer(serializers.ModelSerializer):
 
         return Item.objects.create(**validated_data)
 
+class ItemSearchResultSerializer(ItemSerializer):
+    """
+    ItemSerializer plus the full-text search score and highlighted snippet of each hit.
+    Hits are passed in the serializer context as `search_hits` (see item_management/search.py).
+    """
+    score = serializers.SerializerMethodField()  # Relevance, higher is better (None without a query)
+    snippet = serializers.SerializerMethodField()  # HTML-escaped excerpt with <mark>ed matches
+
+    class Meta(ItemSerializer.Meta):
+        fields = ItemSerializer.Meta.fields + ['score', 'snippet']
+
+    def _get_hit(self, obj):
+        return self.context.get('search_hits', {}).get(obj.id)
+
+    def get_score(self, obj):
+        hit = self._get_hit(obj)
+        return hit.score if hit else None
+
+    def get_snippet(self, obj):
+        hit = self._get_hit(obj)
+        return hit.snippet if hit else None
+
+class ItemSummarySerializer(serializers.ModelSerializer):
+    """
+    Compact, read-only item representation embedded in other resources (e.g. cart lines).
+    Only reads columns of the item itself, so it never triggers extra queries.
+    """
+    class Meta:
+        model = Item
+        fields = [
+            'id',                # Unique ID for the item
+            'title',             # Item title
+            'price',             # Item price
+            'thumbnail_url',     # Optional image URL
+            'is_sold',           # Indicates if the item is sold
+            'is_visible',        # Indicates if the item is visible
+        ]
+        read_only_fields = fields
+
 class PaymentSerializer(serializers.ModelSerializer):
     """
     Serializer for the Payment model.
@@ -67,9 +106,9 @@ class PaymentSerializer(serializers.ModelSerializer):
     
     # Method to retrieve related item ID
     def get_item_id(self, obj):
-        return obj.item.id
+        return obj.item_id  # The column, no need to load the item
     
-    # Method to retrieve related item name
+    # Method to retrieve related item name (load payments with select_related('item'))
     def get_item_name(self, obj):
         return obj.item.title
     
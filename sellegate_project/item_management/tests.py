@@ -1,16 +1,26 @@
 # item_management/tests.py
 
-from django.urls import reverse
+import tempfile
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
 from rest_framework import status
 from rest_framework.test import APITestCase, APIClient
 from django.contrib.auth import get_user_model
-from .models import Item, Payment
+from authentication import token_cache
+from sellegate_project import query_inspector
+from sellegate_project.testing import MarketplaceTestMixin
+from .models import Item, Payment, Purchase
+from . import cache as response_cache
 from decimal import Decimal
 import json
 
 User = get_user_model()
 
-class ItemManagementTests(APITestCase):
+class ItemManagementTests(MarketplaceTestMixin, APITestCase):
 
     def setUp(self):
         # Create test users and tokens
@@ -27,6 +37,10 @@ class ItemManagementTests(APITestCase):
 
         self.client = APIClient()
 
+        # Start every test with an empty response cache
+        cache.clear()
+        response_cache.stats.reset()
+
     ### ITEM TESTS ###
 
     def test_create_item(self):
@@ -163,6 +177,44 @@ class ItemManagementTests(APITestCase):
         self.assertTrue('payment' in response.data, "Payment record not created after buying item")
         self.assertEqual(response.data['payment']['item_name'], 'Item to Buy', "Payment details incorrect")
 
+    def test_buy_item_only_once(self):
+        item = self._create_item('Contested Item')
+        other_buyer = User.objects.create_user(
+            username='other',
+            email='other@example.com',
+            password='OtherPass123'
+        )
+        url = reverse('buy-item', args=[item.id])
+
+        # The first buyer wins
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.buyer))
+        self.assertEqual(self.client.post(url).status_code, status.HTTP_201_CREATED)
+
+        # The second one is told why, and no second payment is recorded
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(other_buyer))
+        response = self.client.post(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['error']['message'], 'Item is already sold.')
+        self.assertEqual(Payment.objects.filter(item=item).count(), 1)
+
+        # A buyer holding a stale copy of the item can't claim it either
+        self.assertEqual(Item.objects.filter(id=item.id).available_to(other_buyer).mark_sold(), 0)
+
+    def test_buy_item_rejections(self):
+        own_item = self._create_item('Own Item', seller=self.buyer)
+        hidden_item = self._create_item('Hidden Item', is_visible=False)
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.buyer))
+
+        response = self.client.post(reverse('buy-item', args=[own_item.id]))
+        self.assertEqual(response.data['error']['message'], 'You cannot buy your own item.')
+
+        response = self.client.post(reverse('buy-item', args=[hidden_item.id]))
+        self.assertEqual(response.data['error']['message'], 'Item is not visible. Revise code.')
+
+        response = self.client.post(reverse('buy-item', args=[999999]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Payment.objects.exists())
+
     def test_get_user_payments(self):
         # Create a payment for the buyer
         item = Item.objects.create(
@@ -189,12 +241,240 @@ class ItemManagementTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertGreater(len(response.data), 0, "No payments found for the user")
 
-    ### HELPER FUNCTIONS ###
+    ### PAGINATION TESTS ###
+
+    def test_get_all_items_keyset_pagination(self):
+        # Create more items than fit on one page
+        items = [self._create_item(f'Paged Item {i}') for i in range(5)]
+
+        url = reverse('get-all-items')
+        response = self.client.get(url, {'page_size': 2, 'include_count': 'true'})
+
+        # First page: a plain list plus navigation headers
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [items[0].id, items[1].id])
+        self.assertEqual(response['X-Total-Count'], '5')
+        self.assertIn('rel="next"', response['Link'])
+        self.assertNotIn('X-Prev-Cursor', response)
+
+        # Follow the next cursors until the last page
+        seen = [item['id'] for item in response.data]
+        while 'X-Next-Cursor' in response:
+            response = self.client.get(url, {'page_size': 2, 'cursor': response['X-Next-Cursor']})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            seen.extend(item['id'] for item in response.data)
+
+        self.assertEqual(seen, [item.id for item in items], "Pages skipped or repeated items")
+
+        # The previous cursor of the last page leads back to the page before it
+        response = self.client.get(url, {'page_size': 2, 'cursor': response['X-Prev-Cursor']})
+        self.assertEqual([item['id'] for item in response.data], [items[2].id, items[3].id])
+
+    def test_get_all_items_invalid_cursor(self):
+        self._create_item('Only Item')
+
+        url = reverse('get-all-items')
+        response = self.client.get(url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    ### SEARCH TESTS ###
+
+    def test_search_items_full_text(self):
+        laptop = self._create_item('Gaming Laptop', description='A fast <b>laptop</b>', price=Decimal('900.00'))
+        cheap_laptop = self._create_item('Old Laptop', description='Still boots', price=Decimal('50.00'))
+        self._create_item('Office Chair', description='Comfortable chair')
+
+        url = reverse('item-search')
+        response = self.client.get(url, {'query': 'lap'})
+
+        # Prefix matching finds both laptops, and only them
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual({item['id'] for item in response.data}, {laptop.id, cheap_laptop.id})
+        self.assertIn('<mark>', response.data[0]['snippet'])
+        self.assertNotIn('<b>', ''.join(item['snippet'] for item in response.data), "Snippet was not escaped")
+
+        # Price filters still apply on top of the full-text match
+        response = self.client.get(url, {'query': 'laptop', 'minPrice': '100'})
+        self.assertEqual([item['id'] for item in response.data], [laptop.id])
+
+        # Seller usernames are searchable too
+        response = self.client.get(url, {'query': 'seller'})
+        self.assertEqual(len(response.data), 3)
 
-    def _get_user_token(self, user):
-        """
-        Helper function to retrieve or create a token for a given user.
-        """
-        from rest_framework.authtoken.models import Token
-        token, _ = Token.objects.get_or_create(user=user)
-        return token.key
+    def test_search_index_follows_changes(self):
+        item = self._create_item('Vintage Lamp', description='Works fine')
+        url = reverse('item-search')
+
+        # Renaming the item reindexes it
+        item.title = 'Antique Clock'
+        item.save()
+        self.assertEqual(len(self.client.get(url, {'query': 'lamp'}).data), 0)
+        self.assertEqual(len(self.client.get(url, {'query': 'clock'}).data), 1)
+
+        # Renaming the seller updates the seller name of their items
+        self.seller.username = 'collector'
+        self.seller.save()
+        self.assertEqual(len(self.client.get(url, {'query': 'collector'}).data), 1)
+
+        # Deleted items disappear from the index
+        item.delete()
+        self.assertEqual(len(self.client.get(url, {'query': 'clock'}).data), 0)
+
+    def test_search_results_are_paginated_in_rank_order(self):
+        for n in range(5):
+            # More title hits rank higher
+            self._create_item(' '.join(['Lamp'] * (5 - n)) + f' {n}', description='Lamp')
+        url = reverse('item-search')
+
+        response = self.client.get(url, {'query': 'lamp', 'page_size': 2})
+        pages = [response.data]
+        while 'X-Next-Cursor' in response:
+            response = self.client.get(url, {'query': 'lamp', 'page_size': 2, 'cursor': response['X-Next-Cursor']})
+            pages.append(response.data)
+
+        self.assertEqual([len(page) for page in pages], [2, 2, 1])
+        scores = [item['score'] for page in pages for item in page]
+        self.assertEqual(scores, sorted(scores, reverse=True))
+        self.assertIn('rel="prev"', response['Link'])
+
+        # Ordered by price, each page still carries its scores
+        response = self.client.get(url, {'query': 'lamp', 'ordering': '-price', 'page_size': 2})
+        self.assertEqual(len(response.data), 2)
+        self.assertTrue(all(item['score'] is not None for item in response.data))
+        self.assertIn('X-Next-Cursor', response)
+
+    def test_search_without_words_falls_back_to_substrings(self):
+        tagged = self._create_item('Lamp #42', description='Brass')
+        self._create_item('Plain Lamp', description='Brass')
+
+        response = self.client.get(reverse('item-search'), {'query': '#'})
+        self.assertEqual([item['id'] for item in response.data], [tagged.id])
+
+    ### QUERY COUNT TESTS ###
+
+    @override_settings(ITEM_RESPONSE_CACHE={'ENABLED': False})  # Measure the database work, not the cache
+    @override_settings(TOKEN_AUTH_CACHE={'ENABLED': False})  # Count the token lookup of every request
+    def test_item_endpoints_stay_within_their_query_budget(self):
+        evaluator = User.objects.create_user(
+            username='evaluator',
+            email='evaluator@example.com',
+            password='EvaluatorPass123',
+            is_evaluator=True,
+        )
+        seller_token = self._get_user_token(self.seller)
+        buyer_token = self._get_user_token(self.buyer)
+        first_item = self._create_item('Query Item', evaluator=evaluator)
+
+        # (url name, url args, query params, token)
+        endpoints = [
+            ('get-all-items', [], {}, None),
+            ('get-item-by-id', [first_item.id], {}, None),
+            ('item-search', [], {'query': 'query'}, None),
+            ('get-items-to-explore', [], {}, buyer_token),
+            ('get-user-products', [], {}, seller_token),
+            ('user-sold-items', [], {}, seller_token),
+            ('get-user-payments', [], {}, buyer_token),
+            ('user-purchases', [], {}, buyer_token),
+        ]
+
+        counts = {}
+        for size in (1, 10, 100):
+            # Grow the catalog: unsold items, and sold ones paid for by the buyer
+            while Item.objects.filter(is_sold=True).count() < size:
+                self._create_item('Query Item', evaluator=evaluator)
+                sold = self._create_item('Query Item', evaluator=evaluator, is_sold=True)
+                Payment.objects.create(item=sold, buyer=self.buyer, total_price=sold.price)
+                Purchase.objects.create(item=sold, buyer=self.buyer, total_price=sold.price)
+
+            for name, args, params, token in endpoints:
+                with self.subTest(endpoint=name, size=size):
+                    if token:
+                        self.client.credentials(HTTP_AUTHORIZATION='Token ' + token)
+                    else:
+                        self.client.credentials()
+                    url = reverse(name, args=args)
+                    # Count the queries of cold response and token caches
+                    cache.clear()
+                    token_cache.local_store.clear()
+
+                    # QueryInspectorMiddleware fails the request on an N+1 or over the budget
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(url, params)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertLessEqual(len(queries), query_inspector.get_query_budget(resolve(url).func))
+                    # The same number of queries for 1, 10 and 100 rows
+                    self.assertEqual(len(queries), counts.setdefault(name, len(queries)))
+
+    def test_admin_lists_join_their_relations(self):
+        admin = User.objects.create_superuser(username='admin', email='admin@example.com', password='AdminPass123')
+        self.client.force_login(admin)
+        for i in range(10):
+            item = self._create_item(f'Admin Item {i}', evaluator=admin)
+            Payment.objects.create(item=item, buyer=self.buyer, total_price=item.price)
+
+        for name in ('admin:item_management_item_changelist', 'admin:item_management_payment_changelist'):
+            with self.subTest(page=name):
+                response = self.client.get(reverse(name))  # Raises NPlusOneError on a lazy load per row
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    ### RESPONSE CACHE TESTS ###
+
+    def test_public_item_reads_are_cached(self):
+        item = self._create_item('Cached Item')
+        list_url = reverse('get-all-items')
+        detail_url = reverse('get-item-by-id', args=[item.id])
+
+        # The first request fills the cache, the second one never touches the database
+        first = self.client.get(list_url, {'page_size': 10})
+        with self.assertNumQueries(0):
+            second = self.client.get(list_url, {'page_size': '10', 'cursor': ''})
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(response_cache.stats.as_dict()['hits'], 1)
+
+        self.client.get(detail_url)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(detail_url).data['title'], 'Cached Item')
+
+        # Saving the item bumps its version and the catalog version
+        item.title = 'Renamed Item'
+        item.save()
+        self.assertEqual(self.client.get(list_url, {'page_size': 10}).data[0]['title'], 'Renamed Item')
+        self.assertEqual(self.client.get(detail_url).data['title'], 'Renamed Item')
+
+        # So does renaming the seller, whose name is embedded in the response
+        self.seller.username = 'renamed-seller'
+        self.seller.save()
+        self.assertEqual(self.client.get(detail_url).data['seller_name'], 'renamed-seller')
+
+        # Deleting the item is visible right away too
+        item.delete()
+        self.assertEqual(self.client.get(detail_url).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_response_cache_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            file_cache = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}
+
+            with override_settings(CACHES=file_cache):
+                self._create_item('Filed Item')
+                url = reverse('get-all-items')
+
+                first = self.client.get(url, {'include_count': 'true'})
+                with self.assertNumQueries(0):
+                    second = self.client.get(url, {'include_count': 'true'})
+
+                # Body and pagination headers both come back from disk
+                self.assertEqual(second.data, first.data)
+                self.assertEqual(second['X-Total-Count'], '1')
+
+    def test_cache_stats_staff_only(self):
+        url = reverse('item-cache-stats')
+
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.buyer))
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+
+        self.buyer.is_staff = True
+        self.buyer.save()
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hit_ratio', response.data)
@@ -1,7 +1,7 @@
 from django.urls import path
 from .views import ItemSearchAPIView, ItemDetailView, ItemListCreateAPIView, PurchaseItemAPIView, UserPurchasesAPIView, UserSoldItemsAPIView, DeleteItemAPIView, UpdateItemAPIView
 from .views import GetAllItemsAPIView, GetItemsToExploreAPIView, GetItemAPIView, UserProductsAPIView, PostItemAPIView, BuyItemAPIView
-from .views import GetUserPaymentsAPIView
+from .views import GetUserPaymentsAPIView, ResponseCacheStatsAPIView
 
 urlpatterns = [
     # Define URL patterns here
@@ -32,6 +32,9 @@ urlpatterns = [
     # API endpoint to get all payments for the current logged-in user.
     path('my-payments/', GetUserPaymentsAPIView.as_view(), name='get-user-payments'),  # URL for fetching user payments
 
+    # Hit/miss counters of the public item response cache (staff only)
+    path('cache-stats/', ResponseCacheStatsAPIView.as_view(), name='item-cache-stats'),
+
 
 
     # OLD \/\/\/\/\/\/
@@ -7,30 +7,42 @@ from rest_framework.views import APIView
 from rest_framework import generics, status
 from rest_framework.response import Response
 from django.db.models import Q
+from django.db.models.expressions import RawSQL
 
 from .models import Item, Purchase, Payment
-from .serializers import PurchaseSerializer, ItemSerializer, PaymentSerializer
+from .serializers import PurchaseSerializer, ItemSerializer, PaymentSerializer, ItemSearchResultSerializer
+from .pagination import ItemKeysetPagination, ItemSearchPagination
+from .cache import CachedResponseMixin
+from . import cache as response_cache
+from . import search as item_search
+from . import purchases
 
 from rest_framework.filters import SearchFilter, OrderingFilter
-from rest_framework.permissions import AllowAny
+from decimal import Decimal, InvalidOperation
+from rest_framework.permissions import AllowAny, IsAdminUser
 from django.core.exceptions import PermissionDenied
 from rest_framework.exceptions import NotFound
 from django.core.exceptions import ObjectDoesNotExist
 
 
-class GetAllItemsAPIView(generics.ListAPIView):
+class GetAllItemsAPIView(CachedResponseMixin, generics.ListAPIView):
     """
     API endpoint to get all items with specific information.
+    Results are keyset-paginated by (created_at, id); see ItemKeysetPagination.
+    Responses are cached until the catalog changes; see item_management/cache.py.
     """
     permission_classes = [AllowAny]  # Public endpoint
+    query_budget = 2  # Token, items page
+    cache_endpoint = 'get-all-items'  # Versioned by the catalog version
     serializer_class = ItemSerializer  # Use the custom serializer
-    queryset = Item.objects.all()  # Get all items
+    pagination_class = ItemKeysetPagination  # Cursor pages, navigation in Link/X-*-Cursor headers
+    queryset = Item.objects.for_serializer()  # Get all items, seller/evaluator joined in
 
     def list(self, request, *args, **kwargs):
-        # Get the list of items
+        # Get the current page of items
         response = super().list(request, *args, **kwargs)
 
-        # If no items are found, return a custom error response
+        # If no items are found on this page, return a custom error response
         if len(response.data) == 0:
             return Response(
                 {
@@ -51,16 +63,19 @@ class GetAllItemsAPIView(generics.ListAPIView):
 class GetItemsToExploreAPIView(generics.ListAPIView):
     """
     API endpoint to get all items not owned by the current logged-in user.
+    Results are keyset-paginated by (created_at, id); see ItemKeysetPagination.
     """
     permission_classes = [IsAuthenticated]  # Ensure the user is authenticated
+    query_budget = 2  # Token, items page
     serializer_class = ItemSerializer
+    pagination_class = ItemKeysetPagination  # Cursor pages, navigation in Link/X-*-Cursor headers
 
     def get_queryset(self):
         # Get the authenticated user
         current_user = self.request.user
         
         # Retrieve all items excluding those owned by the current user, and not sold
-        queryset = Item.objects.exclude(seller=current_user).filter(is_sold=False)
+        queryset = Item.objects.for_serializer().exclude(seller=current_user).filter(is_sold=False)
 
         return queryset
 
@@ -68,7 +83,7 @@ class GetItemsToExploreAPIView(generics.ListAPIView):
         # Get the original queryset
         response = super().list(request, *args, **kwargs)
 
-        # If the resulting list is empty, return a custom error response
+        # If the resulting page is empty, return a custom error response
         if len(response.data) == 0:
             return Response(
                 {
@@ -86,11 +101,15 @@ class GetItemsToExploreAPIView(generics.ListAPIView):
         return response  
     
 
-class GetItemAPIView(generics.RetrieveAPIView):
+class GetItemAPIView(CachedResponseMixin, generics.RetrieveAPIView):
     """
     API endpoint to get a specific item by ID.
+    Responses are cached until the item changes; see item_management/cache.py.
     """
     permission_classes = [AllowAny]  # Public endpoint
+    query_budget = 2  # Token, item
+    cache_endpoint = 'get-item-by-id'
+    cache_item_kwarg = 'id'  # Versioned by this item's own version
     serializer_class = ItemSerializer  # Serializer for the expected data structure
 
     def get_object(self):
@@ -98,7 +117,7 @@ class GetItemAPIView(generics.RetrieveAPIView):
 
         try:
             # Attempt to retrieve the item by ID
-            item = Item.objects.get(id=item_id)
+            item = Item.objects.for_serializer().get(id=item_id)
             return item
         except Item.DoesNotExist:
             # Raise a NotFound exception if the item doesn't exist
@@ -119,6 +138,7 @@ class UserProductsAPIView(generics.ListAPIView):
     API endpoint to return all items owned by the currently logged-in user.
     """
     permission_classes = [IsAuthenticated]  # Restrict access to authenticated users only
+    query_budget = 3  # Token, exists check, items page
     serializer_class = ItemSerializer  # Use the response serializer
 
     def get_queryset(self):
@@ -126,7 +146,7 @@ class UserProductsAPIView(generics.ListAPIView):
         Get all items owned by the current user.
         """
         user = self.request.user  # Get the current user
-        queryset = Item.objects.filter(seller=user)  # Fetch all items belonging to the current user
+        queryset = Item.objects.for_serializer().filter(seller=user)  # Fetch all items belonging to the current user
         
         return queryset
 
@@ -225,7 +245,7 @@ class UpdateItemAPIView(APIView):
         
         # Find the item by ID
         try:
-            item = Item.objects.get(id=item_id)  # Fetch the item by ID
+            item = Item.objects.select_related('seller', 'evaluator').get(id=item_id)  # Fetch the item by ID
         except Item.DoesNotExist:
             # Return a 404 error if the item doesn't exist
             return Response(
@@ -240,7 +260,7 @@ class UpdateItemAPIView(APIView):
             )
 
         # Check if the current user is the owner (by seller ID)
-        if item.seller != request.user:
+        if item.seller_id != request.user.id:
             return Response(
                 {
                     "status": "error",
@@ -311,7 +331,7 @@ class DeleteItemAPIView(APIView):
             )
 
         # Check if the current user is the owner of the item
-        if item.seller != request.user:
+        if item.seller_id != request.user.id:
             # If the current user is not the owner, return a 403 Forbidden response
             return Response(
                 {
@@ -348,61 +368,25 @@ class BuyItemAPIView(APIView):
     def post(self, request, item_id):
         """
         Handles the POST request to buy an item.
+        The item is claimed with a conditional UPDATE, so concurrent buyers can't both win.
         """
-        # Find the item by its ID
-        item = get_object_or_404(Item, id=item_id)
+        # Claim the item and create the payment in one transaction
+        payment = purchases.buy_item(item_id, request.user)
 
-        # Validate if the item can be bought
-        if item.is_sold:
+        if payment is None:
+            # Nothing was claimed: find out why (404 if the item doesn't exist)
+            item = get_object_or_404(Item, id=item_id)
             return Response(
                 {
                     "status": "error",
                     "error": {
-                        "message": "Item is already sold.",
-                        "code": status.HTTP_400_BAD_REQUEST,
-                    },
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-        
-        # Validate if the item was visible
-        if not item.is_visible:
-            return Response(
-                {
-                    "status": "error",
-                    "error": {
-                        "message": "Item is not visible. Revise code.",
+                        "message": purchases.rejection_reason(item, request.user),
                         "code": status.HTTP_400_BAD_REQUEST,
                     },
                 },
                 status=status.HTTP_400_BAD_REQUEST,
             )
 
-        # Seller cant but his own item
-        if item.seller == request.user:
-            return Response(
-                {
-                    "status": "error",
-                    "error": {
-                        "message": "You cannot buy your own item.",
-                        "code": status.HTTP_400_BAD_REQUEST,
-                    },
-                },
-                status=status.HTTP_400_BAD_REQUEST,
-            )
-
-        # If valid, mark the item as sold
-        item.is_sold = True
-        item.is_visible = False # not necessary
-        item.save()  # Save the updated item status
-
-        # Create a new payment record
-        payment = Payment.objects.create(
-            item=item,
-            buyer=request.user,
-            total_price=item.price,
-        )
-
         # Use the PaymentSerializer to serialize the payment details
         payment_serializer = PaymentSerializer(payment)
 
@@ -421,6 +405,7 @@ class GetUserPaymentsAPIView(generics.ListAPIView):
     API endpoint to get all payments for the current logged-in user.
     """
     permission_classes = [IsAuthenticated]  # Ensure only authenticated users can access this endpoint
+    query_budget = 2  # Token, payments with their items
     serializer_class = PaymentSerializer  # Use the updated serializer
     
     def get_queryset(self):
@@ -428,7 +413,7 @@ class GetUserPaymentsAPIView(generics.ListAPIView):
         Get all payments for the current user.
         """
         user = self.request.user  # Get the current logged-in user
-        return Payment.objects.filter(buyer=user)  # Return all payments for this user
+        return Payment.objects.filter(buyer=user).select_related('item')  # Return all payments for this user, item titles joined in
 
 # OLD APIS \/\/\/\/\/\/\/\/\/\/\/
 
@@ -584,7 +569,7 @@ class ItemDetailView(APIView):
             """
 
         try:
-            item = Item.objects.get(pk=item_id)  # Retrieve the item by its ID
+            item = Item.objects.for_serializer().get(pk=item_id)  # Retrieve the item by its ID
             serializer = ItemSerializer(item)  # Serialize the item
             return Response(serializer.data, status=status.HTTP_200_OK)  # Return the serialized data
         except Item.DoesNotExist:
@@ -595,6 +580,7 @@ class UserPurchasesAPIView(APIView):
     API endpoint to get all purchases of the authenticated user.
     """
     permission_classes = [IsAuthenticated]  # Require authentication
+    query_budget = 3  # Token, exists check, purchases
 
     def get(self, request, format=None):
 
@@ -643,6 +629,7 @@ class UserSoldItemsAPIView(APIView):
     API endpoint to get all items sold by the authenticated user.
     """
     permission_classes = [IsAuthenticated]  # Require authentication
+    query_budget = 3  # Token, exists check, items
 
     def get(self, request, format=None):
         """
@@ -673,7 +660,7 @@ class UserSoldItemsAPIView(APIView):
         """
 
         # Get all items where the authenticated user is the seller
-        items_sold = Item.objects.filter(seller=request.user, is_sold=True)
+        items_sold = Item.objects.for_serializer().filter(seller=request.user, is_sold=True)
 
         if items_sold.exists():  # Check if there are any sold items
             # Serialize the items
@@ -802,18 +789,24 @@ class _DeleteItemAPIView(APIView):
             # Return a 403 if the user does not have permission
             return Response({"error": "You do not have permission to delete this item."}, status=status.HTTP_403_FORBIDDEN)
         
-class ItemSearchAPIView(generics.ListAPIView):
+class ItemSearchAPIView(CachedResponseMixin, generics.ListAPIView):
     # REPLACED BY GetAllItemsAPIView
     permission_classes = [AllowAny]  # Allow public access, no token required
+    query_budget = 3  # Token, search hits, items
+    cache_endpoint = 'item-search'  # Versioned by the catalog version
 
 
-    serializer_class = ItemSerializer
-    queryset = Item.objects.all()
-    filter_backends = [SearchFilter, OrderingFilter]  # Add filter backends for search and ordering
+    serializer_class = ItemSearchResultSerializer  # Items plus their search score and snippet
+    queryset = Item.objects.for_serializer()
+    filter_backends = [OrderingFilter]  # Text matching is done by the full-text index in get_queryset
+    pagination_class = ItemSearchPagination  # Pages of `page_size` results, navigation in Link/X-*-Cursor headers
 
-    search_fields = ['title', 'description', 'seller__username']  # Specify fields for search
     ordering_fields = ['price']  # Specify fields for ordering
 
+    search_query = None  # Query matched by the full-text index for the current request
+    ranked_items = None  # Relevance-ordered results (search.RankedItems) when no `ordering` is given
+    search_hits = None  # Full-text hits of the current page (item id -> SearchHit)
+
     def get_queryset(self):
         """
             ### Searching Items with Postman
@@ -829,15 +822,20 @@ class ItemSearchAPIView(generics.ListAPIView):
             3. **Set the Query Parameters**:
             - Click on the "Params" tab.
             - Add key-value pairs for the filters. Examples:
-                - `query`: `"search_term"`  # Search by title or description
+                - `query`: `"search_term"`  # Search by title, description or seller username (`search` also works)
                 - `category`: `"desired_category"`  # Filter by category (Not implemented yet)
                 - `minPrice`: `"minimum_price"`  # Filter by minimum price
                 - `maxPrice`: `"maximum_price"`  # Filter by maximum price
+                - `ordering`: `"price"` or `"-price"`  # Optional, results are ranked by relevance otherwise
+                - `page_size`: `"20"`  # Optional, results per page (see ItemSearchPagination)
+                - `cursor`: `"..."`  # Optional, the X-Next-Cursor or X-Prev-Cursor header of a previous page
 
             4. **Send the Request**:
             - Click "Send" to submit the request.
             - If successful, you'll receive a JSON response with the filtered items.
-            - You can use the "Search Fields" to filter by title or description, and "Ordering Fields" to order by price.
+            - Every word of the query is matched as a prefix ("lap" finds "laptop"), best matches first.
+            - A query without any word (e.g. `#`) is matched as a plain substring instead.
+            - Each item also has a `score` (higher is more relevant) and a `snippet` with the matches wrapped in `<mark>` tags.
 
             5. **Handle Response**:
             - If successful, examine the returned JSON data to understand the structure of the response.
@@ -847,25 +845,83 @@ class ItemSearchAPIView(generics.ListAPIView):
         queryset = super().get_queryset()  # Get the queryset from the parent class
 
         # Apply filters based on query parameters:
-
-        # Filter by search query
-        query = self.request.query_params.get('query')
-        if query:
-            queryset = queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+        min_price = self.request.query_params.get('minPrice')
+        max_price = self.request.query_params.get('maxPrice')
 
         # Filter by category
         category = self.request.query_params.get('category')
         if category:
             queryset = queryset.filter(category=category)
 
+        # Filter by search query (`search` is the parameter name of the old SearchFilter)
+        query = self.request.query_params.get('query') or self.request.query_params.get('search')
+        match = item_search.match_subquery(query) if query and item_search.is_enabled() else None
+        if match is not None:
+            self.search_query = query
+            if not self.request.query_params.get('ordering'):
+                # Best match first: ranked and paged by the full-text index, with the price
+                # bounds applied inside the same query
+                self.ranked_items = item_search.RankedItems(
+                    queryset,
+                    query,
+                    min_price=_parse_decimal(min_price),
+                    max_price=_parse_decimal(max_price),
+                )
+            queryset = queryset.filter(id__in=RawSQL(*match))
+        elif query:
+            # No full-text index, or no word to look up (e.g. "%"): plain substring matching
+            queryset = queryset.filter(
+                Q(title__icontains=query) | Q(description__icontains=query) | Q(seller__username__icontains=query)
+            )
+
         # Filter by minimum price
-        min_price = self.request.query_params.get('minPrice')
         if min_price:
             queryset = queryset.filter(price__gte=min_price)
 
         # Filter by maximum price
-        max_price = self.request.query_params.get('maxPrice')
         if max_price:
             queryset = queryset.filter(price__lte=max_price)
 
         return queryset  # Return the filtered queryset
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context['search_hits'] = self.search_hits or {}  # Lets the serializer attach score and snippet
+        return context
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        if self.ranked_items is not None:
+            queryset = self.ranked_items  # Ordered and limited by the full-text query
+
+        page = self.paginate_queryset(queryset)
+
+        if self.ranked_items is not None:
+            self.search_hits = self.ranked_items.hits
+        elif self.search_query is not None:
+            # Ordered by a column: look up the score and snippet of this page's items only
+            self.search_hits = item_search.search_items(self.search_query, item_ids=[item.id for item in page])
+
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+
+def _parse_decimal(value):
+    """
+    Return `value` as a Decimal, or None if it is missing or not a number.
+    """
+    try:
+        return Decimal(value) if value else None
+    except InvalidOperation:
+        return None
+
+
+class ResponseCacheStatsAPIView(APIView):
+    """
+    API endpoint returning the hit/miss counters of the public item response cache.
+    Counters are per process and reset on restart.
+    """
+    permission_classes = [IsAdminUser]  # Staff only
+
+    def get(self, request):
+        return Response(response_cache.stats.as_dict(), status=status.HTTP_200_OK)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class SellegateProjectConfig(AppConfig):
+    name = 'sellegate_project'
+    verbose_name = 'Sellegate project'
+
+    def ready(self):
+        # Tune every SQLite connection (connection_created receiver)
+        from . import sqlite_tuning  # noqa: F401
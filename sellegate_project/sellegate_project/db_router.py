@@ -0,0 +1,161 @@
+# sellegate_project/db_router.py
+
+"""
+Read replicas (DATABASE_REPLICAS).
+
+Reads only go to a replica while ReplicaRoutingMiddleware serves a request with a safe method
+(GET, HEAD, OPTIONS): API reads, admin changelists, ... Everything else uses the primary
+('default'): writes, reads inside a transaction, unsafe requests, management commands and the
+shell. A safe request that writes anyway (token renewal, ...) reads from the primary from then
+on.
+
+Replicas lag behind the primary, so a client that just wrote must not read from one: after a
+write request, the client's next requests are pinned to the primary for
+DATABASE_REPLICAS['PIN_SECONDS']. Token clients are only authenticated inside the view, and a
+registration or login response carries a brand new token, so clients are identified by their
+Authorization header and by their IP. Pins live in a Django cache (DATABASE_REPLICAS['ALIAS']):
+per process with the local-memory backend, shared by every worker with memcached or Redis.
+"""
+
+import contextvars
+import hashlib
+import random
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS, connections
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+PIN_KEY = 'db-pin:{ident}'
+
+
+def _config():
+    return getattr(settings, 'DATABASE_REPLICAS', {})
+
+
+def get_replicas():
+    return _config().get('ALIASES', [])
+
+
+def get_pin_seconds():
+    return _config().get('PIN_SECONDS', 10)
+
+
+def get_cache():
+    return caches[_config().get('ALIAS', 'default')]
+
+
+class RoutingState:
+    """
+    Routing of the request being served: whether its reads may use a replica, and whether it
+    wrote to the primary.
+    """
+
+    def __init__(self, use_replicas):
+        self.use_replicas = use_replicas
+        self.wrote = False
+
+
+# None outside of requests: everything goes to the primary
+_state = contextvars.ContextVar('db_router_state', default=None)
+
+
+@contextmanager
+def use_primary():
+    """
+    Read from the primary inside the block, even in a safe request.
+    """
+    token = _state.set(None)
+    try:
+        yield
+    finally:
+        _state.reset(token)
+
+
+def _client_idents(request):
+    idents = []
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if authorization:
+        idents.append('auth:' + hashlib.sha256(authorization.encode('utf-8')).hexdigest())
+    if request.META.get('REMOTE_ADDR'):
+        idents.append('ip:' + request.META['REMOTE_ADDR'])
+    return idents
+
+
+def pin(request):
+    """
+    Send the client's requests to the primary for the next PIN_SECONDS.
+    """
+    keys = [PIN_KEY.format(ident=ident) for ident in _client_idents(request)]
+    get_cache().set_many(dict.fromkeys(keys, True), timeout=get_pin_seconds())
+
+
+def is_pinned(request):
+    keys = [PIN_KEY.format(ident=ident) for ident in _client_idents(request)]
+    return bool(keys) and bool(get_cache().get_many(keys))
+
+
+class ReplicaRouter:
+    """
+    Database router sending the reads of safe requests to a random replica and everything
+    else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None or not state.use_replicas:
+            return DEFAULT_DB_ALIAS
+
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db  # Related objects come from the same snapshot
+
+        replicas = get_replicas()
+        if not replicas or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            # The rest of the request reads its own write, and so do the client's next requests
+            state.use_replicas = False
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replicas hold the primary's rows: instances read from any of them may be related
+        databases = {DEFAULT_DB_ALIAS, *get_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Only the primary is migrated; replicas get the schema with the data (see sync_replicas)
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Let the reads of safe, unpinned requests use the replicas, and pin clients after a write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not get_replicas():
+            return self.get_response(request)
+
+        safe = request.method in SAFE_METHODS
+        state = RoutingState(use_replicas=safe and not is_pinned(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if (state.wrote or not safe) and response.status_code < 500:
+            pin(request)
+        return response
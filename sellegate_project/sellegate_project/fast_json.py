@@ -0,0 +1,85 @@
+# sellegate_project/fast_json.py
+
+"""
+JSON renderer and parser for DRF backed by orjson, with the stdlib `json` as fallback.
+
+orjson encodes datetimes, dates, times and UUIDs natively, in the same format as DRF's encoder
+(UTC as `Z`). Other types go through DRF's JSONEncoder.default: Decimal values that are not
+coerced to strings by a serializer (e.g. database annotations) become numbers, lazy
+translations strings, querysets lists, as with DRF's JSONRenderer. The API's responses decode
+to the same values, for a fraction of the stdlib encoder's time.
+
+Without orjson (it is optional), or for an indentation orjson doesn't support (only 2 spaces;
+the browsable API asks for 4), both classes behave exactly as DRF's JSONRenderer and
+JSONParser.
+"""
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # Optional dependency
+    orjson = None
+
+_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Types orjson doesn't know: Decimal, lazy strings, querysets, ...
+    return _encoder.default(obj)
+
+
+def backend():
+    """
+    Name of the library encoding and decoding JSON.
+    """
+    return 'orjson' if orjson is not None else 'json'
+
+
+class FastJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer encoding with orjson when it is installed.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent not in (None, 2):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        ret = orjson.dumps(data, default=_default, option=options)
+
+        # Like JSONRenderer, escape U+2028 and U+2029 so the output is also valid JavaScript
+        if b'\xe2\x80' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class FastJSONParser(JSONParser):
+    """
+    JSONParser decoding with orjson when it is installed. orjson rejects NaN and Infinity,
+    as the strict JSONParser does.
+    """
+    renderer_class = FastJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        if orjson is None or not self.strict or encoding.lower().replace('-', '') != 'utf8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            return orjson.loads(stream.read())
+        except ValueError as exc:  # orjson.JSONDecodeError
+            raise ParseError('JSON parse error - %s' % str(exc))
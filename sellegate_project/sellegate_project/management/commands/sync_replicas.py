@@ -0,0 +1,69 @@
+# sellegate_project/management/commands/sync_replicas.py
+
+import sqlite3
+import time
+from contextlib import closing
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from sellegate_project.db_router import get_replicas
+
+
+def copy_database(source, target):
+    """
+    Copy the SQLite database `source` into `target` with the online backup API: writers of
+    `source` are not blocked, and readers of `target` see either the old or the new snapshot.
+    """
+    with closing(sqlite3.connect(source)) as source_db, closing(sqlite3.connect(target)) as target_db:
+        source_db.backup(target_db)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replication stand-in for local read replicas: copy the SQLite 'default' database into "
+        "every replica of DATABASE_REPLICAS['ALIASES'] once, or every --interval seconds."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help="Replica alias to sync (repeatable; default: DATABASE_REPLICAS['ALIASES']).",
+        )
+        parser.add_argument(
+            '--interval', type=float, default=0,
+            help="Keep syncing, waiting this many seconds between copies (the simulated lag; default: sync once).",
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['databases'] or get_replicas()
+        if not aliases:
+            raise CommandError("No replicas to sync: list them in DATABASE_REPLICAS['ALIASES'] or pass --database.")
+        if options['interval'] < 0:
+            raise CommandError("--interval can't be negative.")
+
+        source = self.get_path(DEFAULT_DB_ALIAS)
+        targets = {alias: self.get_path(alias) for alias in aliases}
+        if source in targets.values():
+            raise CommandError("A replica can't be the 'default' database itself.")
+
+        while True:
+            for alias, target in targets.items():
+                started = time.perf_counter()
+                copy_database(source, target)
+                self.stdout.write(f"Synced {alias} ({target}) in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+            if not options['interval']:
+                break
+            try:
+                time.sleep(options['interval'])
+            except KeyboardInterrupt:
+                break
+
+    def get_path(self, alias):
+        if alias not in connections:
+            raise CommandError(f"Unknown database alias: {alias}")
+        connection = connections[alias]
+        if connection.vendor != 'sqlite':
+            raise CommandError(f"sync_replicas copies SQLite databases; {alias} is not SQLite.")
+        return str(connection.settings_dict['NAME'])
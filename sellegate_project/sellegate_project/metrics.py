@@ -0,0 +1,401 @@
+# sellegate_project/metrics.py
+
+"""
+Prometheus metrics (METRICS), served in the text exposition format at `metrics/`.
+
+MetricsMiddleware counts every request per URL name: requests by method and status, a latency
+histogram, SQL queries and their time. The item response cache, token cache and login
+throttle counters are exported next to them.
+
+Counters are sharded per thread: each thread increments its own dict, so recording takes no
+lock; a scrape adds the shards up. When a thread ends (servers start one per connection), its
+shard is folded into the process totals and dropped.
+
+With several worker processes (gunicorn), set METRICS['MULTIPROCESS_DIR'] to a directory shared
+by the workers and emptied when the server starts. Every process then writes its totals to its
+own memory-mapped file there (at most every METRICS['FLUSH_INTERVAL'] seconds, after a request),
+and a scrape of any worker sums all the files, so the workers are scraped as one. Files of
+exited workers keep counting, as counters should.
+"""
+
+import glob
+import json
+import mmap
+import os
+import secrets
+import struct
+import threading
+import time
+import weakref
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+# Upper bounds of the latency histogram buckets, in seconds
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float('inf'))
+
+# name -> (type, help)
+FAMILIES = {
+    'sellegate_http_requests_total': ('counter', "HTTP requests by URL name, method and status."),
+    'sellegate_http_request_duration_seconds': ('histogram', "HTTP request latency by URL name."),
+    'sellegate_db_queries_total': ('counter', "SQL queries run by requests, by URL name."),
+    'sellegate_db_query_seconds_total': ('counter', "Time spent in SQL queries by requests, by URL name."),
+    'sellegate_cache_events_total': ('counter', "Response and token cache hits, misses, ... by cache."),
+    'sellegate_throttle_attempts_total': ('counter', "Login and registration attempts by throttle scope and result."),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _config():
+    return getattr(settings, 'METRICS', {})
+
+
+def is_enabled():
+    return _config().get('ENABLED', True)
+
+
+class _ShardOwner:
+    """
+    Only referenced from a thread's local storage, so it is collected when the thread ends.
+    """
+    __slots__ = ('__weakref__',)
+
+
+class Registry:
+    """
+    Per-process counters, sharded per thread. A sample is identified by a key
+    (family, suffix, labels), labels being a tuple of (name, value) pairs.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()  # Not taken to record: only for shard creation, retirement and scrapes
+        self._shards = {}  # id(counters) -> counters of each live thread
+        self._retired = {}  # Totals of the threads that ended
+
+    def _shard(self):
+        try:
+            return self._local.counters
+        except AttributeError:
+            counters = self._local.counters = {}
+            owner = self._local.owner = _ShardOwner()
+            with self._lock:
+                self._shards[id(counters)] = counters
+            weakref.finalize(owner, self._retire, counters)
+            return counters
+
+    def _retire(self, counters):
+        # The thread is gone and won't record anymore: fold its shard into the totals
+        with self._lock:
+            if self._shards.pop(id(counters), None) is None:
+                return  # Reset meanwhile
+            for key, value in counters.items():
+                self._retired[key] = self._retired.get(key, 0) + value
+
+    def inc(self, family, labels, amount=1, suffix=''):
+        counters = self._shard()
+        key = (family, suffix, labels)
+        counters[key] = counters.get(key, 0) + amount
+
+    def observe(self, family, labels, value):
+        """
+        Record `value` in a histogram: cumulative buckets, sum and count.
+        """
+        counters = self._shard()
+        for bound in BUCKETS:
+            if value <= bound:
+                key = (family, '_bucket', labels + (('le', _format_bound(bound)),))
+                counters[key] = counters.get(key, 0) + 1
+        for suffix, amount in (('_sum', value), ('_count', 1)):
+            key = (family, suffix, labels)
+            counters[key] = counters.get(key, 0) + amount
+
+    def collect(self):
+        with self._lock:
+            totals = dict(self._retired)
+            shards = list(self._shards.values())
+        for shard in shards:
+            for key, value in shard.copy().items():  # dict.copy() is atomic under the GIL
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+    def reset(self):
+        with self._lock:
+            for shard in self._shards.values():
+                shard.clear()
+            self._retired.clear()
+
+    def __len__(self):
+        """
+        Number of shards of live threads.
+        """
+        return len(self._shards)
+
+
+registry = Registry()
+
+
+def _format_bound(bound):
+    return '+Inf' if bound == float('inf') else repr(bound)
+
+
+def collect_stats():
+    """
+    Counters of the item response cache, the token cache and the login throttles.
+    """
+    from authentication import throttling, token_cache
+    from item_management import cache as response_cache
+
+    samples = {}
+    for cache, stats in (('item_response', response_cache.stats), ('token', token_cache.stats)):
+        for event, value in stats.as_dict().items():
+            if event != 'hit_ratio':  # Computed from hits and misses at query time
+                samples[('sellegate_cache_events_total', '', (('cache', cache), ('event', event)))] = value
+    for result, scopes in throttling.stats.as_dict().items():
+        for scope, value in scopes.items():
+            samples[('sellegate_throttle_attempts_total', '', (('result', result), ('scope', scope)))] = value
+    return samples
+
+
+def snapshot():
+    """
+    All the samples of this process.
+    """
+    return {**registry.collect(), **collect_stats()}
+
+
+class MmapValues:
+    """
+    A memory-mapped file of float64 values by key, written by one process and read by any.
+
+    Layout: the number of used bytes (uint32, 4 padding bytes), then entries of
+    [key length uint32][key, UTF-8, padded to 8 bytes][value float64]. Keys are only ever
+    appended and values updated in place; the used size is written after a new entry, so
+    readers never see a partial one.
+    """
+    INITIAL_SIZE = 64 * 1024
+    HEADER = struct.Struct('<I4x')
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a+b')
+        if os.fstat(self._file.fileno()).st_size == 0:
+            self._file.truncate(self.INITIAL_SIZE)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self._used = self.HEADER.unpack_from(self._map, 0)[0] or self.HEADER.size
+        self._positions = {key: position for key, position, _ in self._entries(self._map, self._used)}
+
+    @classmethod
+    def _entries(cls, buffer, used):
+        position = cls.HEADER.size
+        while position < used:
+            length = struct.unpack_from('<I', buffer, position)[0]
+            key = bytes(buffer[position + 4:position + 4 + length]).decode('utf-8')
+            position += 4 + length + (-(4 + length) % 8)
+            yield key, position, struct.unpack_from('<d', buffer, position)[0]
+            position += 8
+
+    @classmethod
+    def read(cls, path):
+        """
+        {key: value} of a file, without mapping it for writing.
+        """
+        with open(path, 'rb') as stream:
+            data = stream.read()
+        if len(data) < cls.HEADER.size:
+            return {}
+        used = min(cls.HEADER.unpack_from(data, 0)[0], len(data))
+        return {key: value for key, _, value in cls._entries(data, used)}
+
+    def values(self):
+        return {key: struct.unpack_from('<d', self._map, position)[0] for key, position in self._positions.items()}
+
+    def write(self, key, value):
+        position = self._positions.get(key)
+        if position is None:
+            position = self._append(key)
+        struct.pack_into('<d', self._map, position, value)
+
+    def _append(self, key):
+        encoded = key.encode('utf-8')
+        padding = -(4 + len(encoded)) % 8
+        size = 4 + len(encoded) + padding + 8
+        if self._used + size > len(self._map):
+            new_size = max(2 * len(self._map), self._used + size)
+            self._map.close()
+            self._file.truncate(new_size)
+            self._map = mmap.mmap(self._file.fileno(), 0)
+
+        struct.pack_into(f'<I{len(encoded)}s', self._map, self._used, len(encoded), encoded)
+        position = self._used + 4 + len(encoded) + padding
+        struct.pack_into('<d', self._map, position, 0.0)
+        self._used += size
+        self._positions[key] = position
+        self.HEADER.pack_into(self._map, 0, self._used)
+        return position
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+def _encode(key):
+    family, suffix, labels = key
+    return json.dumps([family, suffix, [list(label) for label in labels]], separators=(',', ':'))
+
+
+def _decode(text):
+    family, suffix, labels = json.loads(text)
+    return family, suffix, tuple(tuple(label) for label in labels)
+
+
+class MultiProcessStore:
+    """
+    This process's file in METRICS['MULTIPROCESS_DIR'] and the sum of every process's file.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._file = None
+        self._owner = None  # (pid, directory) the file was opened for
+        self._base = {}
+        self._flushed_at = 0
+
+    def _open(self, directory):
+        owner = (os.getpid(), directory)
+        if self._owner != owner:  # First use, a forked worker or a new directory
+            if self._file is not None:
+                self._file.close()
+            self._file = MmapValues(os.path.join(directory, f'metrics_{owner[0]}.db'))
+            self._owner = owner
+            # A reused pid: keep what the previous process counted
+            self._base = self._file.values()
+        return self._file
+
+    def flush(self, directory, force=False):
+        now = time.monotonic()
+        with self._lock:
+            if not force and now - self._flushed_at < _config().get('FLUSH_INTERVAL', 1):
+                return
+            values = self._open(directory)
+            for key, value in snapshot().items():
+                encoded = _encode(key)
+                values.write(encoded, self._base.get(encoded, 0) + value)
+            self._flushed_at = now
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+            self._file = self._owner = None
+
+    def collect(self, directory):
+        self.flush(directory, force=True)
+        totals = {}
+        for path in glob.glob(os.path.join(directory, 'metrics_*.db')):
+            for encoded, value in MmapValues.read(path).items():
+                key = _decode(encoded)
+                totals[key] = totals.get(key, 0) + value
+        return totals
+
+
+store = MultiProcessStore()
+
+
+def collect():
+    directory = _config().get('MULTIPROCESS_DIR')
+    return store.collect(directory) if directory else snapshot()
+
+
+def _sort_key(item):
+    (family, suffix, labels), _ = item
+    bound = dict(labels).get('le')
+    base_labels = tuple(label for label in labels if label[0] != 'le')
+    return family, base_labels, suffix, float('inf') if bound == '+Inf' else float(bound or 0)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def render(samples):
+    """
+    Samples in the Prometheus text exposition format.
+    """
+    lines = []
+    family_seen = None
+    for (family, suffix, labels), value in sorted(samples.items(), key=_sort_key):
+        if family != family_seen:
+            kind, description = FAMILIES.get(family, ('untyped', ''))
+            lines.append(f'# HELP {family} {description}')
+            lines.append(f'# TYPE {family} {kind}')
+            family_seen = family
+        label_text = ','.join(f'{name}="{_escape(label)}"' for name, label in labels)
+        value_text = repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+        lines.append(f'{family}{suffix}{{{label_text}}} {value_text}' if labels else f'{family}{suffix} {value_text}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """
+    Count every request per URL name: status, latency, queries.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not is_enabled():
+            return self.get_response(request)
+
+        queries = [0, 0.0]  # Count, seconds
+
+        def count_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                queries[0] += 1
+                queries[1] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(count_query))
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        view = (request.resolver_match.url_name if request.resolver_match else None) or 'unmatched'
+        labels = (('view', view),)
+        registry.inc('sellegate_http_requests_total', labels + (('method', request.method), ('status', str(response.status_code))))
+        registry.observe('sellegate_http_request_duration_seconds', labels, duration)
+        if queries[0]:
+            registry.inc('sellegate_db_queries_total', labels, queries[0])
+            registry.inc('sellegate_db_query_seconds_total', labels, queries[1])
+
+        directory = _config().get('MULTIPROCESS_DIR')
+        if directory:
+            store.flush(directory)
+        return response
+
+
+def metrics_view(request):
+    """
+    GET metrics/: every counter in the Prometheus text format. Scrapers authenticate with
+    `Authorization: Bearer <METRICS['TOKEN']>`. Only in development (DEBUG) and without a
+    token, connecting from METRICS['ALLOWED_IPS'] is enough: behind a local reverse proxy, every
+    request comes from 127.0.0.1.
+    """
+    config = _config()
+    token = config.get('TOKEN')
+    if token:
+        allowed = secrets.compare_digest(request.META.get('HTTP_AUTHORIZATION', ''), f'Bearer {token}')
+    else:
+        allowed = settings.DEBUG and request.META.get('REMOTE_ADDR') in config.get('ALLOWED_IPS', ['127.0.0.1', '::1'])
+    if not allowed:
+        return HttpResponseForbidden("Forbidden", content_type='text/plain')
+
+    return HttpResponse(render(collect()), content_type=CONTENT_TYPE)
@@ -0,0 +1,225 @@
+# sellegate_project/query_inspector.py
+
+"""
+Query inspection for development and tests (QUERY_INSPECTOR): N+1 detection and per-view
+query budgets.
+
+QueryInspectorMiddleware watches every request:
+
+- lazy relation loads: each time a foreign key or one-to-one relation is fetched on access
+  because the queryset didn't select_related() it (`payment.item`, `request.evaluator`), the
+  relation is counted. Loading the same relation QUERY_INSPECTOR['N_PLUS_ONE_THRESHOLD'] times
+  in one request means a loop runs one query per row: NPlusOneError names the relation and the
+  line that loaded it.
+- query budgets: a view declares the most queries a request may run, authentication included
+  (`query_budget = 3`). QueryBudgetExceeded is raised when a request runs more.
+
+Statements run while a connection opens (the PRAGMAs of sqlite_tuning, backend setup) are not
+counted: with CONN_MAX_AGE=0 every request opens one.
+
+With QUERY_INSPECTOR['RAISE'] False, both are logged as warnings instead. `inspect_queries()`
+applies the same checks to a block of code outside requests.
+
+Watching lazy loads patches Django's relation descriptors and connection setup for the whole
+process, so it is only done when QUERY_INSPECTOR['ENABLED'] is on: otherwise the middleware
+removes itself at startup, and `inspect_queries()` only counts queries.
+
+Reverse foreign key and many-to-many managers (`cart.items.all()`) are not watched: building
+their querysets doesn't tell whether they run.
+"""
+
+import contextvars
+import logging
+import os
+import traceback
+from contextlib import ExitStack, contextmanager
+
+import django
+import rest_framework
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models.fields.related_descriptors import ForwardManyToOneDescriptor, ReverseOneToOneDescriptor
+
+logger = logging.getLogger(__name__)
+
+# Frames of these directories are skipped when looking for the code that loaded a relation
+_LIBRARY_DIRS = tuple(os.path.dirname(module.__file__) for module in (django, rest_framework))
+
+
+class NPlusOneError(AssertionError):
+    """
+    A relation was loaded lazily once per row.
+    """
+
+
+class QueryBudgetExceeded(AssertionError):
+    """
+    A view ran more queries than its query_budget.
+    """
+
+
+def _config():
+    return getattr(settings, 'QUERY_INSPECTOR', {})
+
+
+def is_enabled():
+    return _config().get('ENABLED', False)
+
+
+def _caller():
+    """
+    file:line of the innermost frame outside Django, DRF and this module.
+    """
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        if not frame.filename.startswith(_LIBRARY_DIRS) and frame.filename != __file__:
+            return f'{os.path.relpath(frame.filename, settings.BASE_DIR)}:{frame.lineno}'
+    return 'unknown'
+
+
+class QueryInspection:
+    """
+    Queries and lazy relation loads of one request (or `inspect_queries()` block).
+    """
+
+    def __init__(self, label, budget=None):
+        self.label = label
+        self.budget = budget
+        self.queries = 0
+        self.loads = {}  # 'app_label.Model.field' -> [count, where it was first loaded]
+
+    def record_query(self, execute, sql, params, many, context):
+        if not _connecting.get():
+            self.queries += 1
+        return execute(sql, params, many, context)
+
+    def record_load(self, relation):
+        config = _config()
+        if relation in config.get('IGNORE', ()):
+            return
+
+        load = self.loads.get(relation)
+        if load is None:
+            load = self.loads[relation] = [0, _caller()]
+        load[0] += 1
+        if load[0] == config.get('N_PLUS_ONE_THRESHOLD', 2):
+            report(NPlusOneError(
+                f"{self.label}: {relation} is loaded once per row (first loaded at {load[1]}); "
+                f"add it to select_related()."
+            ))
+
+    def check_budget(self):
+        if self.budget is not None and self.queries > self.budget:
+            report(QueryBudgetExceeded(
+                f"{self.label}: {self.queries} queries, over its budget of {self.budget}."
+            ))
+
+
+def report(error):
+    if _config().get('RAISE', True):
+        raise error
+    logger.warning(str(error))
+
+
+# None outside inspected requests and blocks
+_current = contextvars.ContextVar('query_inspection', default=None)
+
+# True while a connection is being opened and set up
+_connecting = contextvars.ContextVar('query_inspection_connecting', default=False)
+
+
+def _relation_name(field):
+    return f'{field.model._meta.label}.{field.name}'
+
+
+def instrument():
+    """
+    Count the lazy loads of forward foreign keys and one-to-ones and of reverse one-to-ones,
+    and flag connection setup (once per process). Outside inspected requests they only cost a
+    context variable lookup.
+    """
+    if getattr(ForwardManyToOneDescriptor.get_object, '_inspected', False):
+        return
+
+    connect = BaseDatabaseWrapper.connect
+
+    def inspected_connect(self):
+        token = _connecting.set(True)
+        try:
+            return connect(self)
+        finally:
+            _connecting.reset(token)
+
+    get_object = ForwardManyToOneDescriptor.get_object
+
+    def forward_get_object(self, instance):
+        inspection = _current.get()
+        if inspection is not None:
+            inspection.record_load(_relation_name(self.field))
+        return get_object(self, instance)
+
+    get_queryset = ReverseOneToOneDescriptor.get_queryset
+
+    def reverse_get_queryset(self, **hints):
+        inspection = _current.get()
+        if inspection is not None and 'instance' in hints:  # Only passed when loading one instance's object
+            related = self.related
+            inspection.record_load(f'{related.model._meta.label}.{related.get_accessor_name()}')
+        return get_queryset(self, **hints)
+
+    forward_get_object._inspected = True
+    ForwardManyToOneDescriptor.get_object = forward_get_object
+    ReverseOneToOneDescriptor.get_queryset = reverse_get_queryset
+    BaseDatabaseWrapper.connect = inspected_connect
+
+
+@contextmanager
+def inspect_queries(label='block', budget=None):
+    """
+    Check the queries of a block like those of a request; yields the QueryInspection.
+    """
+    if is_enabled():
+        instrument()
+    inspection = QueryInspection(label, budget)
+    token = _current.set(inspection)
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(inspection.record_query))
+            yield inspection
+    finally:
+        _current.reset(token)
+    inspection.check_budget()
+
+
+def get_query_budget(view_func):
+    """
+    query_budget declared by the class of a view (DRF or Django class-based view), or None.
+    """
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    return getattr(view_class, 'query_budget', None)
+
+
+class QueryInspectorMiddleware:
+    """
+    Detect N+1 relation loads and enforce the query budgets of the views.
+    """
+
+    def __init__(self, get_response):
+        if not is_enabled():
+            raise MiddlewareNotUsed()  # Production: nothing patched, nothing to do per request
+        self.get_response = get_response
+        instrument()
+
+    def __call__(self, request):
+        if not is_enabled():
+            return self.get_response(request)
+
+        with inspect_queries(f'{request.method} {request.path}'):
+            return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        inspection = _current.get()
+        if inspection is not None:
+            inspection.budget = get_query_budget(view_func)
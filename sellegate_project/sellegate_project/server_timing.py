@@ -0,0 +1,235 @@
+# sellegate_project/server_timing.py
+
+"""
+Per-request timings (SERVER_TIMING).
+
+ServerTimingMiddleware measures, for a sample of the requests (SERVER_TIMING['SAMPLE_RATE']):
+
+- db: number of SQL queries and time spent executing them, on every database alias
+  (`connection.execute_wrapper`);
+- view: the view, serializers and queries included, up to the (unrendered) response;
+- serializer: outermost `serializer.data` calls, nested serializers included;
+- render: rendering the response (JSON encoding of DRF responses);
+- total: the whole middleware chain below this middleware.
+
+They are returned in a `Server-Timing` header (shown by the browsers' developer tools) to staff
+users, to everyone with DEBUG or SERVER_TIMING['PUBLIC_HEADER'], and logged as one key=value
+line (values that could break it, like the decoded path, are quoted) with the request id (the `X-Request-ID` header of the request, or
+a new one, echoed in the response). A client's request id is only kept if it is 1 to 64
+letters, digits, dots, dashes or underscores, so it can't add fields to the log line. Requests
+slower than the threshold of their URL name (SERVER_TIMING['SLOW_THRESHOLDS']) are logged as
+warnings; the others at INFO level.
+
+Requests that are not sampled only cost a random draw; `serializer.data` checks a context
+variable. Queries of async views run in other threads and are not counted. With
+SERVER_TIMING['ENABLED'] off at startup, the middleware removes itself and DRF's serializers are
+left as they are.
+"""
+
+import contextvars
+import logging
+import random
+import re
+import time
+import uuid
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework import serializers
+
+logger = logging.getLogger(__name__)
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_PATTERN = re.compile(r'[A-Za-z0-9._-]{1,64}')
+
+# Log values written as they are; others are quoted and escaped
+PLAIN_VALUE = re.compile(r'[\w.:/-]*')
+
+
+def _config():
+    return getattr(settings, 'SERVER_TIMING', {})
+
+
+class RequestTimings:
+    """
+    Measurements of one request, in milliseconds.
+    """
+
+    def __init__(self, request_id):
+        self.request_id = request_id
+        self.queries = 0
+        self.db_ms = 0.0
+        self.serializer_ms = 0.0
+        self.serializer_depth = 0
+        self.view_started = None
+        self.view_ms = None
+        self.render_started = None
+        self.render_ms = None
+        self.total_ms = None
+
+    def record_query(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_ms += (time.perf_counter() - started) * 1000
+            self.queries += 1
+
+    def server_timing(self):
+        """
+        Value of the Server-Timing header.
+        """
+        metrics = [f'db;desc="{self.queries} queries";dur={self.db_ms:.1f}']
+        for name in ('view', 'serializer', 'render', 'total'):
+            duration = getattr(self, f'{name}_ms')
+            if duration is not None:
+                metrics.append(f'{name};dur={duration:.1f}')
+        return ', '.join(metrics)
+
+    def as_dict(self):
+        return {
+            'request_id': self.request_id,
+            'queries': self.queries,
+            'db_ms': round(self.db_ms, 2),
+            'view_ms': None if self.view_ms is None else round(self.view_ms, 2),
+            'serializer_ms': round(self.serializer_ms, 2),
+            'render_ms': None if self.render_ms is None else round(self.render_ms, 2),
+            'total_ms': round(self.total_ms, 2),
+        }
+
+
+# None when the request is not measured
+_current = contextvars.ContextVar('server_timing', default=None)
+
+
+def _timed_data(data_property):
+    """
+    Wrap a serializer's `data` property to add the time of outermost calls to the request.
+    """
+    def data(self):
+        timings = _current.get()
+        if timings is None:
+            return data_property.fget(self)
+
+        timings.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return data_property.fget(self)
+        finally:
+            timings.serializer_depth -= 1
+            if not timings.serializer_depth:
+                timings.serializer_ms += (time.perf_counter() - started) * 1000
+
+    data._timed = True
+    return property(data)
+
+
+def instrument_serializers():
+    """
+    Time `data` of DRF's serializers (once per process).
+    """
+    for serializer_class in (serializers.Serializer, serializers.ListSerializer):
+        if not getattr(serializer_class.data.fget, '_timed', False):
+            serializer_class.data = _timed_data(serializer_class.data)
+
+
+def get_request_id(request):
+    """
+    The client's X-Request-ID if it is well-formed, or a new id.
+    """
+    request_id = request.headers.get(REQUEST_ID_HEADER, '')
+    return request_id if REQUEST_ID_PATTERN.fullmatch(request_id) else uuid.uuid4().hex
+
+
+def shows_header(request):
+    """
+    Whether the client may see the Server-Timing header (internal timings).
+    """
+    if settings.DEBUG or _config().get('PUBLIC_HEADER', False):
+        return True
+    user = getattr(request, 'user', None)  # Set by DRF's authentication too
+    return bool(getattr(user, 'is_staff', False))
+
+
+def _log_value(value):
+    text = str(value)
+    return text if PLAIN_VALUE.fullmatch(text) else repr(text)
+
+
+def get_threshold(url_name):
+    thresholds = _config().get('SLOW_THRESHOLDS', {})
+    return thresholds.get(url_name, thresholds.get('default'))
+
+
+class ServerTimingMiddleware:
+    """
+    Measure sampled requests; add Server-Timing and X-Request-ID headers and log them.
+    """
+
+    def __init__(self, get_response):
+        if not _config().get('ENABLED', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        instrument_serializers()
+
+    def __call__(self, request):
+        config = _config()
+        if not config.get('ENABLED', False) or random.random() >= config.get('SAMPLE_RATE', 1.0):
+            return self.get_response(request)
+
+        timings = RequestTimings(get_request_id(request))
+        token = _current.set(timings)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(timings.record_query))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        finished = time.perf_counter()
+        timings.total_ms = (finished - started) * 1000
+        if timings.view_ms is None and timings.view_started is not None:
+            # Plain HttpResponse: nothing to render, the view ran until the response came back
+            timings.view_ms = (finished - timings.view_started) * 1000
+
+        if shows_header(request):
+            response['Server-Timing'] = timings.server_timing()
+        response[REQUEST_ID_HEADER] = timings.request_id
+        self.log(request, response, timings)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timings = _current.get()
+        if timings is not None:
+            timings.view_started = time.perf_counter()
+
+    def process_template_response(self, request, response):
+        # Called with the view's unrendered response (DRF's Response), just before rendering
+        timings = _current.get()
+        if timings is not None and timings.view_started is not None:
+            timings.render_started = time.perf_counter()
+            timings.view_ms = (timings.render_started - timings.view_started) * 1000
+            response.add_post_render_callback(lambda rendered: self.rendered(timings))
+        return response
+
+    def rendered(self, timings):
+        timings.render_ms = (time.perf_counter() - timings.render_started) * 1000
+
+    def log(self, request, response, timings):
+        url_name = request.resolver_match.url_name if request.resolver_match else None
+        threshold = get_threshold(url_name)
+        slow = threshold is not None and timings.total_ms > threshold
+
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'view': url_name,
+            'status': response.status_code,
+            **timings.as_dict(),
+            'slow': slow,
+        }
+        message = ' '.join(f'{key}={_log_value(value)}' for key, value in fields.items())
+        logger.log(logging.WARNING if slow else logging.INFO, message, extra={'timing': fields})
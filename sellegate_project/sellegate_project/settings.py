@@ -50,6 +50,7 @@ INSTALLED_APPS = [
     'cart',
     'evaluation',
     'transaction',
+    'sellegate_project',  # Project-wide commands: sync_replicas, the local replication stand-in
 
     'rest_framework',
     'rest_framework.authtoken',
@@ -57,19 +58,103 @@ INSTALLED_APPS = [
     # Other appsl
 ]
 
+if DEBUG:
+    # Benchmarks (bench_*, on scratch databases) are development tools, not part of production builds
+    INSTALLED_APPS.append('benchmarks')
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Use token-based authentication
+        'authentication.token_cache.CachedTokenAuthentication',  # Token-based authentication, cached lookups
+        'authentication.signed_tokens.SignedTokenAuthentication',  # Signed access tokens (Bearer), no database access
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # Require authentication by default
     ],
+    # orjson when installed, stdlib json otherwise (see sellegate_project/fast_json.py)
+    'DEFAULT_RENDERER_CLASSES': [
+        'sellegate_project.fast_json.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),  # HTML pages in development only
+    'DEFAULT_PARSER_CLASSES': [
+        'sellegate_project.fast_json.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
+}
+
+# Keyset pagination for the item listings (see item_management/pagination.py)
+ITEM_PAGINATION = {
+    'PAGE_SIZE': 50,  # Items per page when `page_size` is not given
+    'MAX_PAGE_SIZE': 200,  # Upper bound for the `page_size` query parameter
+}
+
+# Full-text item search (see item_management/search.py)
+ITEM_SEARCH = {
+    'ENGINE': 'fts5',  # SQLite FTS5 index; any other value falls back to icontains filtering
+    'MAX_RESULTS': 200,  # Ranked hits returned per search
+}
+
+# Leased work queue for evaluators (see evaluation/queue.py)
+EVALUATION_QUEUE = {
+    'LEASE_SECONDS': 900,  # How long a claimed item stays reserved for its evaluator
+    'PAGE_SIZE': 20,  # Items held per evaluator when `limit` is not given
+    'MAX_PAGE_SIZE': 100,  # Upper bound for `limit`
+}
+
+# Any Django cache backend works (local-memory, file-based, ...); the versioned response
+# cache never relies on deleting or scanning keys
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'sellegate',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+# Expiring tokens with sliding renewal (see authentication/tokens.py)
+TOKEN_EXPIRY = {
+    'ENABLED': True,
+    'LIFETIME': 14 * 24 * 60 * 60,  # Seconds a token stays valid after its last renewal
+    'RENEW_INTERVAL': 60 * 60,  # Renew (one UPDATE) at most this often per token
+    'PURGE_BATCH_SIZE': 500,  # Tokens deleted per transaction by purge_expired_tokens
+}
+
+# Credentials issued by login and registration (both kinds are accepted whatever the mode):
+# 'token': database Token (`Authorization: Token <key>`)
+# 'signed': short-lived signed access token (`Authorization: Bearer <token>`) + refresh token
+AUTH_TOKEN_MODE = 'token'
+
+# Signed access tokens (see authentication/signed_tokens.py)
+SIGNED_TOKENS = {
+    'ACCESS_LIFETIME': 15 * 60,  # Seconds an access token is valid
+    'REFRESH_LIFETIME': 30 * 24 * 60 * 60,  # Seconds a refresh token can mint access tokens
+    'REVOCATION_SYNC_INTERVAL': 5,  # Seconds between reads of other processes' revocations (one query each)
+}
+
+# Token -> user lookups of CachedTokenAuthentication (see authentication/token_cache.py)
+TOKEN_AUTH_CACHE = {
+    'ENABLED': True,
+    'ALIAS': None,  # None: per-process LRU; an entry of CACHES: shared by every process
+    'MAX_ENTRIES': 10000,  # Size of the per-process LRU
+    'TIMEOUT': 60,  # Seconds an entry is trusted (logouts and user updates invalidate it earlier)
+}
+
+# Response cache for the public item reads (see item_management/cache.py)
+ITEM_RESPONSE_CACHE = {
+    'ENABLED': True,
+    'ALIAS': 'default',  # Entry of CACHES to use
+    'TIMEOUT': 300,  # Seconds a cached response is kept (invalidation does not wait for it)
 }
 
 
 MIDDLEWARE = [
+    'sellegate_project.server_timing.ServerTimingMiddleware',  # First, so `total` covers the other middleware
+    'sellegate_project.metrics.MetricsMiddleware',  # Request, latency and query counters for metrics/
+    'sellegate_project.query_inspector.QueryInspectorMiddleware',  # N+1 detection and query budgets (DEBUG only)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'sellegate_project.db_router.ReplicaRoutingMiddleware',  # Reads of safe requests go to the replicas
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -103,6 +188,13 @@ CORS_ALLOWED_ORIGINS = [
     'http://localhost:5173',
     # Add other origins as needed
 ]
+CORS_EXPOSE_HEADERS = [
+    # Pagination headers must be exposed for the front-end to read them
+    'Link',
+    'X-Next-Cursor',
+    'X-Prev-Cursor',
+    'X-Total-Count',
+]
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
@@ -110,13 +202,128 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    },
+    # Local read replica: a copy of db.sqlite3 refreshed by `manage.py sync_replicas`, the
+    # replication stand-in. Tests read the test database through it.
+    'replica': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.replica.sqlite3',
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    },
+}
+
+# Per-request timings in a Server-Timing header and a log line (see sellegate_project/server_timing.py)
+SERVER_TIMING = {
+    'ENABLED': True,
+    'SAMPLE_RATE': 1.0,  # Share of the requests measured, from 0 to 1
+    'PUBLIC_HEADER': False,  # Send the Server-Timing header to every client; False: staff users only (everyone with DEBUG)
+    'SLOW_THRESHOLDS': {  # Milliseconds per URL name; slower requests are logged as warnings
+        'default': 500,
+        'get-items-to-explore': 200,
+        'add_to_cart': 200,
+    },
+}
+
+# Prometheus counters served at metrics/ (see sellegate_project/metrics.py)
+METRICS = {
+    'ENABLED': True,
+    'MULTIPROCESS_DIR': None,  # Directory shared by the worker processes (emptied on start); None: this process only
+    'FLUSH_INTERVAL': 1,  # Seconds between writes of a process's counters to its file
+    'TOKEN': None,  # Scrapers send `Authorization: Bearer <TOKEN>`; None: nobody may scrape but ALLOWED_IPS with DEBUG
+    'ALLOWED_IPS': ['127.0.0.1', '::1'],
+}
+
+# N+1 detection and per-view query budgets in development and tests
+# (see sellegate_project/query_inspector.py)
+QUERY_INSPECTOR = {
+    'ENABLED': DEBUG,
+    'RAISE': True,  # False: log warnings instead of failing the request
+    'N_PLUS_ONE_THRESHOLD': 2,  # Lazy loads of the same relation in one request reported as an N+1
+    'IGNORE': [],  # Relations never reported, as 'app_label.Model.field'
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {
+            'class': 'logging.StreamHandler',
+        },
+    },
+    'loggers': {
+        'sellegate_project.server_timing': {
+            'handlers': ['console'],
+            'level': 'WARNING',  # Only the slow requests; INFO: a line per measured request
+            'propagate': False,
+        },
+        'authentication.throttling': {
+            'handlers': ['console'],
+            'level': 'WARNING',  # INFO: a line per refused login or registration attempt
+            'propagate': False,
+        },
+    },
+}
+
+# PRAGMAs run on every new SQLite connection (see sellegate_project/sqlite_tuning.py)
+SQLITE_TUNING = {
+    'PROFILE': 'production',  # 'production': WAL, synchronous=NORMAL, busy timeout, mmap; 'default': SQLite's own
+    'PRAGMAS': {},  # Overrides of the profile's values, e.g. {'busy_timeout': 10000}
+    # Database files whose journal mode is left alone: WAL is stored in the file, and in a
+    # checkout db.sqlite3 is tracked by git
+    'KEEP_JOURNAL_MODE': [BASE_DIR / 'db.sqlite3'] if DEBUG else [],
+    'OPTIMIZE_INTERVAL': 60 * 60,  # Seconds between `PRAGMA optimize` runs per process; None: never
+}
+
+# Safe-method requests read from the replicas, everything else uses 'default'
+# (see sellegate_project/db_router.py)
+DATABASE_ROUTERS = ['sellegate_project.db_router.ReplicaRouter']
+
+DATABASE_REPLICAS = {
+    'ALIASES': [],  # Entries of DATABASES serving reads, e.g. ['replica']; none: the primary serves everything
+    'PIN_SECONDS': 10,  # Clients read from the primary this long after a write (read-your-writes)
+    'ALIAS': 'default',  # Entry of CACHES holding the pins; use a shared cache with several processes
 }
 
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
+# Email + password login in one joined query (see authentication/backends.py);
+# ModelBackend stays for the admin's username login
+AUTHENTICATION_BACKENDS = [
+    'authentication.backends.EmailBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+# New passwords use scrypt (several times cheaper to verify than PBKDF2 at Django's default
+# cost). Older PBKDF2 hashes still verify and are rehashed with scrypt on the next login.
+# Argon2 verifies too when argon2-cffi is installed.
+PASSWORD_HASHERS = [
+    'django.contrib.auth.hashers.ScryptPasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2PasswordHasher',
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.Argon2PasswordHasher',
+]
+
+# Sliding-window limits of the login and registration attempts (see authentication/throttling.py)
+AUTH_THROTTLES = {
+    'ENABLED': True,
+    'ALIAS': 'default',  # Entry of CACHES holding the counters; use a shared cache with several processes
+    'RATES': {
+        'login_ip': '30/min',  # Attempts per client IP
+        'login_email': '5/min',  # Attempts per account
+        'register_ip': '10/hour',
+        'register_email': '5/hour',
+    },
+}
+
+# Thread pool hashing passwords for the async login (login/async/)
+LOGIN_HASHING = {
+    'MAX_WORKERS': 4,  # Concurrent hashes per process; scrypt uses ~16 MB of memory each
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -0,0 +1,119 @@
+# sellegate_project/sqlite_tuning.py
+
+"""
+SQLite connection profiles (SQLITE_TUNING).
+
+Every new SQLite connection gets the PRAGMAs of SQLITE_TUNING['PROFILE'] through the
+`connection_created` signal. With the 'production' profile:
+
+- journal_mode=WAL: readers no longer wait for writers (nor writers for readers); only writers
+  take turns. The mode is stored in the database file, so it persists: the databases of
+  SQLITE_TUNING['KEEP_JOURNAL_MODE'] (the development database tracked by git) keep theirs.
+- synchronous=NORMAL: no fsync per commit, only at checkpoints. A power loss can drop the
+  last commits but never corrupts the database.
+- busy_timeout: wait that long for another writer instead of failing with "database is locked".
+- mmap_size, cache_size, temp_store: reads served from memory mapped pages, a larger page
+  cache and in-memory temporary tables and indexes (sorting, GROUP BY).
+
+`PRAGMA optimize` (refreshing the planner statistics of the tables whose usage changed) runs
+when a connection opens, at most every SQLITE_TUNING['OPTIMIZE_INTERVAL'] seconds per process.
+
+The receiver is registered by the project's AppConfig.ready().
+"""
+
+import logging
+import os
+import threading
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+PROFILES = {
+    'default': {},  # SQLite's own settings: rollback journal, synchronous=FULL (and the 5 s lock wait of Python's sqlite3)
+    'production': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,  # Milliseconds
+        'mmap_size': 256 * 1024 * 1024,  # Bytes
+        'cache_size': -64 * 1024,  # Negative: KiB, so 64 MiB per connection
+        'temp_store': 'MEMORY',
+    },
+}
+
+
+def _config():
+    return getattr(settings, 'SQLITE_TUNING', {})
+
+
+def get_profile(database=None):
+    """
+    PRAGMAs of the configured profile, with SQLITE_TUNING['PRAGMAS'] overriding them. The
+    journal mode is left out for the database files of SQLITE_TUNING['KEEP_JOURNAL_MODE'].
+    """
+    name = _config().get('PROFILE', 'default')
+    if name not in PROFILES:
+        raise ValueError(f"Unknown SQLITE_TUNING profile {name!r}; choose one of {', '.join(PROFILES)}.")
+    pragmas = {**PROFILES[name], **_config().get('PRAGMAS', {})}
+    if database is not None and _is_kept(database):
+        pragmas.pop('journal_mode', None)
+    return pragmas
+
+
+def _is_kept(database):
+    kept = _config().get('KEEP_JOURNAL_MODE', [])
+    return os.path.abspath(str(database)) in {os.path.abspath(str(path)) for path in kept}
+
+
+class _OptimizeSchedule:
+    """
+    When `PRAGMA optimize` last ran in this process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_run = None
+
+    def due(self, now):
+        interval = _config().get('OPTIMIZE_INTERVAL')
+        if interval is None:
+            return False
+        with self._lock:
+            if self.last_run is not None and now - self.last_run < interval:
+                return False
+            self.last_run = now
+            return True
+
+
+optimize_schedule = _OptimizeSchedule()
+
+
+def apply_profile(connection, pragmas):
+    """
+    Run `pragmas` on a freshly opened SQLite connection.
+
+    They go straight to the sqlite3 connection, not through Django's cursor: execute wrappers
+    (Server-Timing, metrics, query budgets) would count them as queries of the request that
+    happened to open the connection.
+    """
+    raw = connection.connection
+    for name, value in pragmas.items():
+        raw.execute(f'PRAGMA {name} = {value}').close()
+    if optimize_schedule.due(time.monotonic()):
+        raw.execute('PRAGMA optimize').close()
+
+
+@receiver(connection_created)
+def tune_sqlite_connection(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = get_profile(connection.settings_dict['NAME'])  # A misconfigured profile is an error, not a warning
+    try:
+        apply_profile(connection, pragmas)
+    except Exception:
+        # e.g. WAL can't be enabled while another connection holds the database; the
+        # connection still works with the previous settings
+        logger.exception("Could not apply the SQLite tuning profile to %s", connection.alias)
@@ -0,0 +1,37 @@
+# sellegate_project/testing.py
+
+"""
+Helpers shared by the test cases of the apps.
+"""
+
+from decimal import Decimal
+
+from rest_framework.authtoken.models import Token
+
+from item_management.models import Item
+
+
+class MarketplaceTestMixin:
+    """
+    Items and tokens for API tests. `_create_item()` uses `self.seller` unless given a seller.
+    """
+
+    def _create_item(self, title, seller=None, **kwargs):
+        """
+        Helper function to create a visible, unsold item.
+        """
+        fields = {
+            'description': f'Description for {title}',
+            'price': Decimal('10.00'),
+            'delegation_state': 'Independent',
+            'is_visible': True,
+        }
+        fields.update(kwargs)
+        return Item.objects.create(title=title, seller=seller or self.seller, **fields)
+
+    def _get_user_token(self, user):
+        """
+        Helper function to retrieve or create a token for a given user.
+        """
+        token, _ = Token.objects.get_or_create(user=user)
+        return token.key
@@ -0,0 +1,415 @@
+# sellegate_project/tests.py
+
+"""
+Tests of the project-wide modules: database routing and tuning, middleware, JSON rendering.
+"""
+
+import io
+import os
+import sqlite3
+import tempfile
+import threading
+import uuid
+from contextlib import closing
+from datetime import date, datetime, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connection, connections
+from django.db.backends.signals import connection_created
+from django.test import SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient, APITestCase
+
+from item_management import cache as response_cache
+from item_management.models import Item, Payment
+from . import db_router, fast_json, metrics, query_inspector, server_timing
+from .management.commands.sync_replicas import copy_database
+from .testing import MarketplaceTestMixin
+
+User = get_user_model()
+
+
+class MarketplaceTestCase(MarketplaceTestMixin, APITestCase):
+    """
+    A seller and a buyer, with an empty response cache.
+    """
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', email='seller@example.com', password='SellerPass123')
+        self.buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='BuyerPass123')
+        self.client = APIClient()
+        cache.clear()
+        response_cache.stats.reset()
+
+
+class QueryInspectorTests(MarketplaceTestCase):
+
+    def test_n_plus_one_is_detected(self):
+        for i in range(3):
+            item = self._create_item(f'Paid Item {i}')
+            Payment.objects.create(item=item, buyer=self.buyer, total_price=item.price)
+
+        with self.assertRaisesMessage(query_inspector.NPlusOneError, 'item_management.Payment.item'):
+            with query_inspector.inspect_queries():
+                [payment.item.title for payment in Payment.objects.all()]
+
+        # Joined in: no lazy loads
+        with query_inspector.inspect_queries(budget=1) as inspection:
+            [payment.item.title for payment in Payment.objects.select_related('item')]
+        self.assertEqual(inspection.loads, {})
+
+        with self.assertRaises(query_inspector.QueryBudgetExceeded):
+            with query_inspector.inspect_queries(budget=1):
+                list(Payment.objects.all())
+                list(Item.objects.all())
+
+        # Logged instead of raised
+        with override_settings(QUERY_INSPECTOR={'RAISE': False}), self.assertLogs('sellegate_project.query_inspector', 'WARNING'):
+            with query_inspector.inspect_queries():
+                [payment.item.title for payment in Payment.objects.all()]
+
+    def test_connection_setup_is_not_counted(self):
+        # A request on a closed connection opens a new one: its setup statements (the SQLite
+        # tuning PRAGMAs, connection_created receivers) are not the view's queries
+        def setup(sender, connection, **kwargs):
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA foreign_keys')
+
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        with tempfile.TemporaryDirectory() as directory:
+            fresh = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')}, alias='fresh')
+            self.addCleanup(fresh.close)
+            fresh.ensure_connection()
+            fresh.close()
+
+            connection_created.connect(setup)
+            self.addCleanup(connection_created.disconnect, setup)
+            with query_inspector.inspect_queries(budget=1) as inspection:
+                with fresh.execute_wrapper(inspection.record_query), fresh.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+            self.assertEqual(inspection.queries, 1)
+            fresh.close()
+
+    def test_disabled_inspector_patches_nothing(self):
+        with override_settings(QUERY_INSPECTOR={'ENABLED': False}), mock.patch.object(query_inspector, 'instrument') as instrument:
+            with self.assertRaises(MiddlewareNotUsed):
+                query_inspector.QueryInspectorMiddleware(lambda request: None)
+
+            # Explicit blocks still count queries
+            with query_inspector.inspect_queries(budget=1) as inspection:
+                list(Item.objects.all())
+        instrument.assert_not_called()
+        self.assertEqual(inspection.queries, 1)
+
+
+class ServerTimingTests(MarketplaceTestCase):
+
+    @override_settings(TOKEN_AUTH_CACHE={'ENABLED': False})  # Count the token lookup
+    def test_server_timing_header_and_log(self):
+        self._create_item('Timed Item')
+        self.buyer.is_staff = True
+        self.buyer.save()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.buyer))
+
+        with self.assertLogs('sellegate_project.server_timing', 'INFO') as logs:
+            response = self.client.get(reverse('get-items-to-explore'), HTTP_X_REQUEST_ID='explore-1')
+
+        timing = response['Server-Timing']
+        self.assertTrue(timing.startswith('db;desc="2 queries";dur='))  # Token + items
+        for metric in ('view;dur=', 'serializer;dur=', 'render;dur=', 'total;dur='):
+            self.assertIn(metric, timing)
+        self.assertEqual(response['X-Request-ID'], 'explore-1')
+
+        self.assertEqual(logs.records[0].levelname, 'INFO')
+        self.assertEqual(logs.records[0].timing['request_id'], 'explore-1')
+        self.assertEqual(logs.records[0].timing['view'], 'get-items-to-explore')
+        self.assertEqual(logs.records[0].timing['queries'], 2)
+
+    def test_malformed_request_ids_are_replaced(self):
+        for request_id in ('abc status=500 slow=False', 'x' * 65, 'caf\u00e9'):
+            with self.subTest(request_id=request_id):
+                response = self.client.get(reverse('get-all-items'), HTTP_X_REQUEST_ID=request_id)
+                self.assertRegex(response['X-Request-ID'], r'^[0-9a-f]{32}$')
+
+    def test_server_timing_header_only_for_staff(self):
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.buyer))
+        for settings_override, shown in (
+            ({}, False),
+            ({'DEBUG': True}, True),
+            ({'SERVER_TIMING': {'ENABLED': True, 'PUBLIC_HEADER': True}}, True),
+        ):
+            with self.subTest(settings=settings_override), override_settings(**settings_override):
+                response = self.client.get(reverse('get-items-to-explore'))
+                self.assertEqual('Server-Timing' in response, shown)
+                self.assertIn('X-Request-ID', response)
+
+    def test_logged_path_is_escaped(self):
+        with self.assertLogs('sellegate_project.server_timing', 'INFO') as logs:
+            self.client.get('/items/%0Astatus=200%20slow=False/')
+
+        message = logs.records[0].getMessage()
+        self.assertNotIn('\n', message)
+        self.assertIn("path='/items/\\nstatus=200 slow=False/'", message)
+        self.assertEqual(logs.records[0].timing['status'], 404)
+
+    def test_slow_requests_are_flagged(self):
+        thresholds = {'default': 10_000, 'get-all-items': 0}
+        with override_settings(SERVER_TIMING={'ENABLED': True, 'SLOW_THRESHOLDS': thresholds}):
+            with self.assertLogs('sellegate_project.server_timing', 'INFO') as logs:
+                self.client.get(reverse('get-all-items'))
+                self.client.get(reverse('item-search'), {'query': 'lamp'})
+
+        self.assertEqual([record.levelname for record in logs.records], ['WARNING', 'INFO'])
+        self.assertTrue(logs.records[0].timing['slow'])
+        self.assertIsNotNone(logs.records[0].timing['request_id'])
+
+    def test_server_timing_off(self):
+        for config in ({'ENABLED': False}, {'ENABLED': True, 'SAMPLE_RATE': 0}):
+            with self.subTest(config=config), override_settings(SERVER_TIMING=config):
+                response = self.client.get(reverse('get-all-items'))
+                self.assertNotIn('Server-Timing', response)
+                self.assertNotIn('X-Request-ID', response)
+
+        # Off at startup: the middleware removes itself, serializers are not instrumented
+        with override_settings(SERVER_TIMING={'ENABLED': False}), mock.patch.object(server_timing, 'instrument_serializers') as instrument:
+            with self.assertRaises(MiddlewareNotUsed):
+                server_timing.ServerTimingMiddleware(lambda request: None)
+        instrument.assert_not_called()
+
+
+@override_settings(METRICS={'ENABLED': True, 'TOKEN': 'scrape-secret'})
+class MetricsTests(MarketplaceTestCase):
+
+    def scrape(self, **extra):
+        return self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer scrape-secret', **extra)
+
+    def test_metrics_endpoint(self):
+        metrics.registry.reset()
+        self._create_item('Counted Item')
+        self.client.get(reverse('get-all-items'))
+        self.client.get(reverse('get-all-items'))
+
+        response = self.scrape()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = response.content.decode().splitlines()
+        self.assertIn('# TYPE sellegate_http_request_duration_seconds histogram', lines)
+        self.assertIn('sellegate_http_requests_total{view="get-all-items",method="GET",status="200"} 2', lines)
+        self.assertIn('sellegate_http_request_duration_seconds_bucket{view="get-all-items",le="+Inf"} 2', lines)
+        self.assertIn('sellegate_http_request_duration_seconds_count{view="get-all-items"} 2', lines)
+        self.assertIn('sellegate_db_queries_total{view="get-all-items"} 1', lines)  # Second request cached
+        self.assertIn('sellegate_cache_events_total{cache="item_response",event="hits"} 1', lines)
+
+    def test_metrics_scrapers_must_be_allowed(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.scrape(REMOTE_ADDR='10.0.0.9').status_code, status.HTTP_200_OK)
+
+        # Without a token, local clients may only scrape in development: behind a local reverse
+        # proxy, every request would come from 127.0.0.1
+        with override_settings(METRICS={'ENABLED': True}):
+            self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_403_FORBIDDEN)
+            with override_settings(DEBUG=True):
+                self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_200_OK)
+                response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.0.0.9')
+                self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_shards_of_ended_threads_are_folded(self):
+        registry = metrics.Registry()
+        labels = (('view', 'get-all-items'),)
+
+        def record():
+            registry.inc('sellegate_http_requests_total', labels)
+
+        for _ in range(5):
+            thread = threading.Thread(target=record)
+            thread.start()
+            thread.join()
+        record()
+
+        self.assertEqual(len(registry), 1)  # This thread's
+        self.assertEqual(registry.collect(), {('sellegate_http_requests_total', '', labels): 6})
+
+    def test_metrics_of_worker_processes_are_summed(self):
+        metrics.registry.reset()
+        self._create_item('Counted Item')
+        with tempfile.TemporaryDirectory() as directory:
+            # Another worker's file, with more keys than fit in the initial mapping
+            other = metrics.MmapValues(os.path.join(directory, 'metrics_1.db'))
+            key = ('sellegate_http_requests_total', '', (('view', 'get-all-items'), ('method', 'GET'), ('status', '200')))
+            other.write(metrics._encode(key), 5)
+            for n in range(2000):
+                other.write(metrics._encode(('sellegate_db_queries_total', '', (('view', f'view-{n}'),))), n)
+            other.close()
+
+            with override_settings(METRICS={'ENABLED': True, 'TOKEN': 'scrape-secret', 'MULTIPROCESS_DIR': directory}):
+                self.client.get(reverse('get-all-items'))
+                response = self.scrape()
+            metrics.store.close()
+
+        lines = response.content.decode().splitlines()
+        self.assertIn('sellegate_http_requests_total{view="get-all-items",method="GET",status="200"} 6', lines)
+        self.assertIn('sellegate_db_queries_total{view="view-1999"} 1999', lines)
+
+
+@override_settings(DATABASE_REPLICAS={'ALIASES': ['replica'], 'PIN_SECONDS': 10, 'ALIAS': 'default'})
+class ReplicaRoutingTests(MarketplaceTestMixin, TransactionTestCase):
+    # The replica mirrors the test database; TransactionTestCase commits, so it sees the rows
+    databases = {'default', 'replica'}
+
+    def setUp(self):
+        self.seller = User.objects.create_user(username='seller', email='seller@example.com', password='SellerPass123')
+        Item.objects.create(title='Lamp', description='Brass lamp', price=Decimal('20.00'), seller=self.seller, is_visible=True)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(self.seller))
+        cache.clear()
+
+    def get_products(self):
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            response = self.client.get(reverse('get-user-products'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(replica_queries)
+
+    def test_safe_requests_read_from_the_replica(self):
+        self.assertGreater(self.get_products(), 0)
+
+        # Outside of requests, reads use the primary
+        self.assertEqual(db_router.ReplicaRouter().db_for_read(Item), 'default')
+
+    def test_writers_are_pinned_to_the_primary(self):
+        response = self.client.post(reverse('post-item'), {
+            'title': 'Clock', 'description': 'Wall clock', 'price': '35.00', 'delegation_state': 'Independent', 'is_visible': True,
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        # The writer reads its own write from the primary...
+        self.assertEqual(self.get_products(), 0)
+
+        # ...while other clients keep using the replica
+        buyer = User.objects.create_user(username='buyer', email='buyer@example.com', password='BuyerPass123')
+        other = APIClient(REMOTE_ADDR='10.0.0.2')
+        other.credentials(HTTP_AUTHORIZATION='Token ' + self._get_user_token(buyer))
+        with CaptureQueriesContext(connections['replica']) as replica_queries:
+            other.get(reverse('get-user-products'))
+        self.assertGreater(len(replica_queries), 0)
+
+        cache.clear()  # Pin expired
+        self.assertGreater(self.get_products(), 0)
+
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            source, target = os.path.join(directory, 'primary.sqlite3'), os.path.join(directory, 'replica.sqlite3')
+            with closing(sqlite3.connect(source)) as db:
+                db.execute('CREATE TABLE item (title TEXT)')
+                db.execute("INSERT INTO item VALUES ('Lamp')")
+                db.commit()
+
+            copy_database(source, target)
+
+            with closing(sqlite3.connect(target)) as db:
+                self.assertEqual(db.execute('SELECT title FROM item').fetchall(), [('Lamp',)])
+
+
+class SQLiteTuningTests(SimpleTestCase):
+
+    def connect(self, directory):
+        """
+        Open a new connection to a database file in `directory`, as the app would.
+        """
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        tuned = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')}, alias='tuned')
+        tuned.ensure_connection()  # Sends connection_created
+        self.addCleanup(tuned.close)
+        return tuned
+
+    def pragmas(self, tuned, *names):
+        with tuned.cursor() as cursor:
+            return [cursor.execute(f'PRAGMA {name}').fetchone()[0] for name in names]
+
+    def test_profile_is_applied_with_overrides(self):
+        tuning = {'PROFILE': 'production', 'PRAGMAS': {'busy_timeout': 1234}, 'OPTIMIZE_INTERVAL': None}
+        with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_TUNING=tuning):
+            tuned = self.connect(directory)
+            self.assertEqual(
+                self.pragmas(tuned, 'journal_mode', 'synchronous', 'busy_timeout', 'temp_store'),
+                ['wal', 1, 1234, 2],  # synchronous=NORMAL, temp_store=MEMORY
+            )
+            tuned.close()
+
+    def test_profile_is_not_counted_as_queries(self):
+        tuning = {'PROFILE': 'production', 'OPTIMIZE_INTERVAL': 0}
+        executed = []
+
+        def record(execute, sql, params, many, context):
+            executed.append(sql)
+            return execute(sql, params, many, context)
+
+        from django.db.backends.sqlite3.base import DatabaseWrapper
+        with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_TUNING=tuning):
+            tuned = DatabaseWrapper({**connection.settings_dict, 'NAME': os.path.join(directory, 'db.sqlite3')}, alias='tuned')
+            self.addCleanup(tuned.close)
+            with tuned.execute_wrapper(record):
+                tuned.ensure_connection()
+            self.assertEqual(executed, [])
+            self.assertEqual(self.pragmas(tuned, 'journal_mode'), ['wal'])
+            tuned.close()
+
+    def test_kept_databases_keep_their_journal_mode(self):
+        with tempfile.TemporaryDirectory() as directory:
+            tuning = {'PROFILE': 'production', 'KEEP_JOURNAL_MODE': [os.path.join(directory, 'db.sqlite3')], 'OPTIMIZE_INTERVAL': None}
+            with override_settings(SQLITE_TUNING=tuning):
+                tuned = self.connect(directory)
+                self.assertEqual(self.pragmas(tuned, 'journal_mode', 'synchronous'), ['delete', 1])  # The rest still applies
+                tuned.close()
+            self.assertEqual(sorted(os.listdir(directory)), ['db.sqlite3'])  # No -wal/-shm files
+
+    def test_default_profile_keeps_sqlite_settings(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_TUNING={'PROFILE': 'default'}):
+            tuned = self.connect(directory)
+            self.assertEqual(self.pragmas(tuned, 'journal_mode', 'synchronous'), ['delete', 2])  # synchronous=FULL
+            tuned.close()
+
+    def test_unknown_profile_is_an_error(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(SQLITE_TUNING={'PROFILE': 'turbo'}):
+            with self.assertRaises(ValueError):
+                self.connect(directory)
+
+
+class FastJSONTests(SimpleTestCase):
+
+    payload = {
+        'price': Decimal('19.90'),  # Annotation, not coerced to a string by a serializer
+        'created_at': datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=dt_timezone.utc),
+        'day': date(2024, 5, 1),
+        'id': uuid.UUID('12345678-1234-5678-1234-567812345678'),
+        'title': 'Lamp\u2028with a line separator, café',
+        'counts': {404: 1, 'total': 2.5},
+        'items': [None, True, [1, 2]],
+    }
+
+    def test_renders_like_drf(self):
+        expected = JSONRenderer().render(self.payload)
+        self.assertEqual(fast_json.FastJSONRenderer().render(self.payload), expected)
+
+        # Indentations orjson doesn't support fall back to DRF's renderer
+        media_type = 'application/json; indent=4'
+        self.assertEqual(
+            fast_json.FastJSONRenderer().render(self.payload, media_type),
+            JSONRenderer().render(self.payload, media_type),
+        )
+        self.assertEqual(fast_json.FastJSONRenderer().render(None), b'')
+
+    def test_parses_like_drf(self):
+        parser = fast_json.FastJSONParser()
+        self.assertEqual(parser.parse(io.BytesIO(b'{"item_id": 3, "title": "caf\xc3\xa9"}')), {'item_id': 3, 'title': 'café'})
+
+        for body in (b'{"item_id": ', b'{"price": NaN}'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                parser.parse(io.BytesIO(body))
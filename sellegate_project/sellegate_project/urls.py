@@ -17,6 +17,8 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from .metrics import metrics_view
+
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/transaction/', include('transaction.urls')),
@@ -27,6 +29,8 @@ urlpatterns = [
 
     path('items/', include('item_management.urls')),
 
+    path('metrics/', metrics_view, name='metrics'),  # Prometheus scrape endpoint
+
     path('auth/', include('authentication.urls')), # this path is for the authentication urls, they all are prefixed with "auth/"
     # Add more app URLs as needed
 ]
\ No newline at end of file